@@ -0,0 +1,313 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from single_flight import SingleFlight
+from whois_scheduler import ThrottledError, WhoisScheduler
+
+WHOIS_PORT = 43
+IANA_WHOIS_SERVER = 'whois.iana.org'
+
+# 常用后缀的WHOIS服务器，其余后缀通过IANA查询
+WHOIS_SERVERS = {
+    'com': 'whois.verisign-grs.com',
+    'net': 'whois.verisign-grs.com',
+    'org': 'whois.pir.org',
+    'info': 'whois.nic.info',
+    'biz': 'whois.nic.biz',
+    'io': 'whois.nic.io',
+    'ai': 'whois.nic.ai',
+    'co': 'whois.nic.co',
+    'me': 'whois.nic.me',
+    'cc': 'ccwhois.verisign-grs.com',
+    'tv': 'tvwhois.verisign-grs.com',
+    'cn': 'whois.cnnic.cn',
+    'xyz': 'whois.nic.xyz',
+    'top': 'whois.nic.top',
+    'app': 'whois.nic.google',
+    'dev': 'whois.nic.google',
+}
+
+# 表示域名未注册的响应内容
+NOT_FOUND_PATTERNS = (
+    'no match for',
+    'not found',
+    'no data found',
+    'no entries found',
+    'no object found',
+    'no matching record',
+    'the queried object does not exist',
+    'status: free',
+    'status: available',
+)
+
+# 表示服务器限流的响应内容
+THROTTLE_PATTERNS = (
+    'limit exceeded',
+    'rate limit',
+    'too many',
+    'try again later',
+    'slow down',
+    'quota exceeded',
+)
+
+# 各字段在不同注册局响应中的名称
+REGISTRAR_FIELDS = ('registrar', 'sponsoring registrar')
+CREATION_FIELDS = ('creation date', 'registration time', 'created', 'registered on')
+EXPIRATION_FIELDS = (
+    'registry expiry date', 'registrar registration expiration date',
+    'expiration time', 'expiry date', 'expiration date', 'paid-till', 'expires'
+)
+STATUS_FIELDS = ('domain status', 'status')
+
+
+def parse_fields(text: str) -> Dict[str, str]:
+    """解析WHOIS响应中的 "字段: 值" 行，同名字段只保留第一个"""
+    fields = {}
+    for line in text.splitlines():
+        key, sep, value = line.strip().partition(':')
+        if not sep:
+            continue
+        key = key.strip().lower()
+        value = value.strip()
+        if value and key not in fields:
+            fields[key] = value
+    return fields
+
+
+def _first_field(fields: Dict[str, str], names) -> Optional[str]:
+    for name in names:
+        if name in fields:
+            return fields[name]
+    return None
+
+
+def format_date(value: Optional[str]) -> str:
+    """统一日期格式，无法解析时保留原文"""
+    if not value:
+        return 'Unknown'
+    try:
+        date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return date.strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return value
+
+
+def format_status(value: Optional[str]) -> str:
+    """移除状态中的URL部分"""
+    if not value:
+        return 'Unknown'
+    return value.split('https://')[0].strip() or 'Unknown'
+
+
+def is_throttled(text: str) -> bool:
+    """判断响应是否为限流提示"""
+    lowered = text.lower()
+    return 'domain name:' not in lowered and any(pattern in lowered for pattern in THROTTLE_PATTERNS)
+
+
+def parse_whois_response(text: str) -> dict:
+    """将WHOIS原始响应转换为与 get_whois_info 相同格式的结果"""
+    if not text.strip():
+        return {'success': False, 'error': '查询失败'}
+
+    fields = parse_fields(text)
+    registrar = _first_field(fields, REGISTRAR_FIELDS)
+    # 已注册域名的响应中一定包含域名字段，避免免责声明中的文字被误判为未注册
+    if 'domain name' not in fields:
+        lowered = text.lower()
+        if any(pattern in lowered for pattern in NOT_FOUND_PATTERNS):
+            return {'success': False, 'error': '未注册'}
+        if not registrar:
+            return {'success': False, 'error': '查询失败'}
+
+    return {
+        'registrar': registrar or 'Unknown',
+        'creation_date': format_date(_first_field(fields, CREATION_FIELDS)),
+        'expiration_date': format_date(_first_field(fields, EXPIRATION_FIELDS)),
+        'status': format_status(_first_field(fields, STATUS_FIELDS)),
+        'success': True
+    }
+
+
+class AsyncWhoisClient:
+    """基于asyncio的WHOIS客户端
+
+    直接通过43端口连接各后缀的WHOIS服务器，每个连接单独设置超时，
+    可以同时进行大量查询。查询按WHOIS服务器分组限速（见 WhoisScheduler）。
+    客户端在独立的后台线程中运行事件循环，同步代码通过 submit / lookup_sync 调用。
+    """
+
+    def __init__(
+        self,
+        timeout: float = 5.0,
+        max_concurrency: int = 200,
+        servers: Dict[str, str] = None,
+        port: int = WHOIS_PORT,
+        scheduler: WhoisScheduler = None,
+        max_discovered: int = 1000,
+        server_retry: float = 60.0
+    ):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.servers = dict(WHOIS_SERVERS, **(servers or {}))
+        self.port = port
+        self.scheduler = scheduler or WhoisScheduler()
+        # 向IANA查询到的后缀WHOIS服务器：后缀 -> (服务器, 失效时间)，按最近使用淘汰。
+        # IANA明确没有WHOIS服务器的后缀一直保留（服务器为None）；查询超时、受限或连接失败时
+        # 只保留 server_retry 秒，之后重新查询。后缀来自用户输入，最多保留 max_discovered 个
+        self.max_discovered = max_discovered
+        self.server_retry = server_retry
+        self._discovered: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+        # 合并同一后缀的并发IANA查询（只在事件循环线程中使用）
+        self._server_flight = SingleFlight()
+        # 进行中的查询数和正在连接WHOIS服务器的查询数（只在事件循环线程中修改）
+        self.pending = 0
+        self.active = 0
+
+    async def query(self, server: str, query: str) -> str:
+        """向WHOIS服务器发送查询并读取完整响应"""
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(server, self.port), timeout=self.timeout
+        )
+        try:
+            writer.write(query.encode('idna') + b'\r\n')
+            await writer.drain()
+            data = await asyncio.wait_for(reader.read(), timeout=self.timeout)
+            return data.decode('utf-8', errors='replace')
+        finally:
+            writer.close()
+
+    async def get_server(self, tld: str) -> Optional[str]:
+        """获取后缀对应的WHOIS服务器，未知后缀向IANA查询"""
+        if tld in self.servers:
+            return self.servers[tld]
+        entry = self._discovered.get(tld)
+        if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+            self._discovered.move_to_end(tld)
+            return entry[0]
+        task = self._server_flight.submit(tld, lambda: asyncio.ensure_future(self._lookup_server(tld)))
+        # 某个调用方取消时不影响共享同一查询的其他调用方
+        return await asyncio.shield(task)
+
+    async def _lookup_server(self, tld: str) -> Optional[str]:
+        """向IANA查询后缀的WHOIS服务器，查询失败时在 server_retry 秒内视为没有WHOIS服务器"""
+        try:
+            text = await self.scheduler.run(
+                IANA_WHOIS_SERVER, lambda: self._query_domain(IANA_WHOIS_SERVER, tld)
+            )
+        except (asyncio.TimeoutError, ThrottledError, OSError, UnicodeError):
+            server, expires = None, time.monotonic() + self.server_retry
+        else:
+            fields = parse_fields(text)
+            server, expires = fields.get('whois') or fields.get('refer'), None
+        self._discovered[tld] = (server, expires)
+        self._discovered.move_to_end(tld)
+        while len(self._discovered) > self.max_discovered:
+            self._discovered.popitem(last=False)
+        return server
+    async def _query_domain(self, server: str, domain: str) -> str:
+        """在全局并发限制下查询域名，限流响应抛出 ThrottledError"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self.active += 1
+            try:
+                text = await self.query(server, domain)
+            finally:
+                self.active -= 1
+        if is_throttled(text):
+            raise ThrottledError(server)
+        return text
+
+    async def lookup(self, domain: str, info: dict = None) -> dict:
+        """查询单个域名的WHOIS信息
+
+        info 不为None时写入查询详情：WHOIS服务器(server)、连接次数(attempts，含限流重试)、
+        连接耗时(query_ms，含等待全局并发名额)和响应字节数(bytes)。
+        """
+        self.pending += 1
+        try:
+            tld = domain.rsplit('.', 1)[-1].lower()
+            server = await self.get_server(tld)
+            if info is not None:
+                info['server'] = server
+            if not server:
+                return {'success': False, 'error': '查询失败'}
+
+            async def attempt():
+                if info is None:
+                    return await self._query_domain(server, domain)
+                info['attempts'] = info.get('attempts', 0) + 1
+                started = time.monotonic()
+                try:
+                    return await self._query_domain(server, domain)
+                finally:
+                    info['query_ms'] = round(info.get('query_ms', 0) + (time.monotonic() - started) * 1000, 2)
+
+            text = await self.scheduler.run(server, attempt)
+            if info is not None:
+                info['bytes'] = len(text.encode('utf-8'))
+            return parse_whois_response(text)
+        except asyncio.TimeoutError:
+            return {'success': False, 'error': '查询超时'}
+        except ThrottledError:
+            return {'success': False, 'error': '查询受限'}
+        except (OSError, UnicodeError):
+            return {'success': False, 'error': '查询失败'}
+        finally:
+            self.pending -= 1
+
+    def queue_depth(self) -> int:
+        """等待中的查询数（等待限速、并发名额或服务器退避）"""
+        return max(0, self.pending - self.active)
+
+    async def lookup_many(self, domains: List[str]) -> Dict[str, dict]:
+        """并发查询多个域名"""
+        results = await asyncio.gather(*(self.lookup(domain) for domain in domains))
+        return dict(zip(domains, results))
+
+    def start(self) -> None:
+        """启动后台事件循环线程"""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=loop.run_forever, name='async-whois', daemon=True
+            )
+            self._thread.start()
+            self._loop = loop
+
+    def stop(self) -> None:
+        """停止后台事件循环"""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            self._semaphore = None
+
+    def run(self, coro) -> Future:
+        """在后台事件循环中运行协程，返回 concurrent.futures.Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def submit(self, domain: str, info: dict = None) -> Future:
+        """在后台事件循环中发起查询，返回 concurrent.futures.Future"""
+        return self.run(self.lookup(domain, info))
+
+    def lookup_sync(self, domain: str) -> dict:
+        """同步查询单个域名"""
+        return self.submit(domain).result()
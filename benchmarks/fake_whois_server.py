@@ -0,0 +1,127 @@
+"""本地模拟WHOIS服务器（用于基准测试）
+
+按查询的域名确定性地返回"已注册"或"未注册"响应，可以配置响应延迟、
+错误率（直接断开连接）和限流率（返回限流提示）。
+
+单独运行：python benchmarks/fake_whois_server.py --port 4343 --latency 0.05
+"""
+import argparse
+import asyncio
+import random
+import threading
+import zlib
+from typing import Optional
+
+REGISTERED_TEMPLATE = (
+    'Domain Name: {domain}\r\n'
+    'Registrar: Example Registrar, Inc.\r\n'
+    'Creation Date: 2015-03-01T00:00:00Z\r\n'
+    'Registry Expiry Date: 2030-03-01T00:00:00Z\r\n'
+    'Domain Status: clientTransferProhibited https://icann.org/epp#clientTransferProhibited\r\n'
+)
+NOT_FOUND_TEMPLATE = 'No match for "{domain}".\r\n'
+THROTTLED_RESPONSE = 'Query rate limit exceeded. Please try again later.\r\n'
+
+
+class FakeWhoisServer:
+    """模拟WHOIS服务器
+
+    registered_ratio 为已注册域名的比例（按域名哈希确定，同一域名结果固定）；
+    latency 和 jitter 为响应延迟的均值和浮动范围（秒）；
+    error_rate 为直接断开连接的比例，throttle_rate 为返回限流提示的比例。
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.05,
+        jitter: float = 0.02,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        registered_ratio: float = 0.7,
+        seed: int = 0
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.registered_ratio = registered_ratio
+        self.random = random.Random(seed)
+        self.queries = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def is_registered(self, domain: str) -> bool:
+        return zlib.crc32(domain.encode('utf-8')) % 1000 < self.registered_ratio * 1000
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line = await reader.readline()
+            domain = line.decode('utf-8', errors='replace').strip().lower()
+            self.queries += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            await asyncio.sleep(delay)
+
+            roll = self.random.random()
+            if roll < self.error_rate:
+                return
+            if roll < self.error_rate + self.throttle_rate:
+                response = THROTTLED_RESPONSE
+            elif self.is_registered(domain):
+                response = REGISTERED_TEMPLATE.format(domain=domain.upper())
+            else:
+                response = NOT_FOUND_TEMPLATE.format(domain=domain)
+            writer.write(response.encode('utf-8'))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _start(self) -> None:
+        self._server = await asyncio.start_server(self.handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def start(self) -> int:
+        """在后台线程中启动服务器，返回监听端口"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fake-whois', daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self.port
+
+    def stop(self) -> None:
+        """停止服务器"""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake WHOIS server for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4343)
+    parser.add_argument('--latency', type=float, default=0.05, help='Mean response latency (seconds)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Latency jitter (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of dropped connections')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of rate-limit responses')
+    parser.add_argument('--registered-ratio', type=float, default=0.7)
+    args = parser.parse_args()
+
+    server = FakeWhoisServer(
+        args.host, args.port, args.latency, args.jitter,
+        args.error_rate, args.throttle_rate, args.registered_ratio
+    )
+    print(f"模拟WHOIS服务器监听: {args.host}:{server.start()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
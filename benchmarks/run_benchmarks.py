@@ -0,0 +1,328 @@
+"""端到端基准测试
+
+覆盖域名生成、敏感词检测、WHOIS查询阶段（本地模拟WHOIS服务器）和并发的 /generate 请求，
+记录吞吐量、p50/p95/p99 延迟和内存峰值，并可与保存的基线比较。
+
+  python benchmarks/run_benchmarks.py                          # 运行全部场景
+  python benchmarks/run_benchmarks.py --quick --only whois     # 缩小规模，只运行部分场景
+  python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+  python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json > bench_output.txt
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_whois_server import FakeWhoisServer  # noqa: E402
+
+SEED = 20240601
+KEYWORDS = [
+    'web', 'app', 'cloud', 'shop', 'data', 'smart', 'tech', 'hub', 'zhongguo', 'beijing',
+    'kuaile', 'pay', 'game', 'music', 'food', 'travel', 'home', 'auto', 'health', 'news'
+]
+TLDS = ['.com', '.net', '.org', '.io']
+
+# 场景函数返回 (每次操作的延迟列表, 处理的条目数, 附加信息)
+ScenarioResult = Tuple[List[float], int, Dict]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def keyword_sets(count: int, rng: random.Random) -> List[List[str]]:
+    return [rng.sample(KEYWORDS, rng.randint(1, 3)) for _ in range(count)]
+
+
+def bench_generate(scale: float, options) -> ScenarioResult:
+    """DomainGenerator.generate_domains"""
+    from domain_generator import DomainGenerator
+
+    generator = DomainGenerator()
+    rng = random.Random(SEED)
+    latencies, items = [], 0
+    for index, keywords in enumerate(keyword_sets(int(200 * scale), rng)):
+        start = time.perf_counter()
+        domains = generator.generate_domains(keywords, (3, 15), TLDS, seed=index)
+        latencies.append(time.perf_counter() - start)
+        items += len(domains)
+    return latencies, items, {}
+
+
+def bench_sensitive(scale: float, options) -> ScenarioResult:
+    """SensitiveWordChecker.check_domains，每批1000个域名"""
+    from domain_generator import DomainGenerator
+    from sensitive_word_checker import SensitiveWordChecker
+
+    checker = SensitiveWordChecker()
+    generator = DomainGenerator()
+    rng = random.Random(SEED)
+    domains = []
+    for index, keywords in enumerate(keyword_sets(100, rng)):
+        domains.extend(itertools.islice(generator.iter_domains(keywords, (3, 15), TLDS, seed=index, combine=True), 200))
+    batches = [domains[i:i + 1000] for i in range(0, len(domains), 1000)]
+    batches = (batches * (int(50 * scale) // max(1, len(batches)) + 1))[:max(1, int(50 * scale))]
+
+    latencies, items = [], 0
+    for batch in batches:
+        start = time.perf_counter()
+        checker.check_domains(batch)
+        latencies.append(time.perf_counter() - start)
+        items += len(batch)
+    return latencies, items, {}
+
+
+def _whois_server(options) -> FakeWhoisServer:
+    return FakeWhoisServer(
+        latency=options.latency,
+        jitter=options.latency / 2,
+        error_rate=options.error_rate,
+        throttle_rate=options.throttle_rate,
+        seed=SEED
+    )
+
+
+def bench_whois(scale: float, options) -> ScenarioResult:
+    """AsyncWhoisClient 查询本地模拟WHOIS服务器"""
+    from async_whois import AsyncWhoisClient
+    from whois_scheduler import ServerLimit, WhoisScheduler
+
+    server = _whois_server(options)
+    port = server.start()
+    client = AsyncWhoisClient(
+        timeout=5.0,
+        max_concurrency=options.whois_concurrency,
+        servers={tld.lstrip('.'): '127.0.0.1' for tld in TLDS},
+        port=port,
+        scheduler=WhoisScheduler(
+            ServerLimit(rate=options.whois_rate, burst=int(options.whois_rate), max_in_flight=options.whois_concurrency),
+            base_backoff=0.1,
+            max_backoff=1.0
+        )
+    )
+    domains = [f'bench{i}{TLDS[i % len(TLDS)]}' for i in range(int(1000 * scale))]
+    outcomes: Dict[str, int] = {}
+    latencies: List[float] = []
+
+    async def timed(domain):
+        start = time.perf_counter()
+        result = await client.lookup(domain)
+        latencies.append(time.perf_counter() - start)
+        outcome = 'registered' if result.get('success') else result.get('error')
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    async def run_all():
+        await asyncio.gather(*(timed(domain) for domain in domains))
+
+    try:
+        client.run(run_all()).result()
+    finally:
+        client.stop()
+        server.stop()
+    return latencies, len(domains), {'outcomes': outcomes, 'server_queries': server.queries}
+
+
+def bench_endpoint(scale: float, options) -> ScenarioResult:
+    """并发 POST /generate（真实HTTP服务器 + 模拟WHOIS服务器）"""
+    from werkzeug.serving import make_server
+
+    # 服务端每个请求都会打印日志，测试期间不输出
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+
+    server = _whois_server(options)
+    port = server.start()
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    os.environ.update({
+        'WHOIS_CACHE_FILE': os.path.join(workdir, 'whois_cache.db'),
+        'JOBS_FILE': os.path.join(workdir, 'jobs.db'),
+        'REGISTERED_INDEX_FILE': '',
+        'DNS_PRESCREEN': '0',
+        'WHOIS_CACHE_REFRESH': '0',
+        'WHOIS_SERVER_RATE': str(options.whois_rate),
+        'WHOIS_SERVER_BURST': str(int(options.whois_rate)),
+        'WHOIS_SERVER_MAX_IN_FLIGHT': str(options.whois_concurrency),
+    })
+    # 请求日志输出到 stderr，默认只保留错误，可通过 LOG_LEVEL 覆盖
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    import main
+
+    main.whois_client.port = port
+    main.whois_client.servers.update({tld.lstrip('.'): '127.0.0.1' for tld in TLDS})
+    http_server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{http_server.server_port}/generate'
+
+    rng = random.Random(SEED)
+    payloads = [
+        {
+            'keywords': keywords + [f'b{index}'],
+            'min_length': 3,
+            'max_length': 15,
+            'tlds': TLDS,
+            'count': 20,
+            'seed': index
+        }
+        for index, keywords in enumerate(keyword_sets(int(100 * scale), rng))
+    ]
+
+    def post(payload):
+        request = urllib.request.Request(
+            url, data=json.dumps(payload).encode('utf-8'), headers={'Content-Type': 'application/json'}
+        )
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=60) as response:
+            body = json.loads(response.read())
+        return time.perf_counter() - start, len(body.get('results', []))
+
+    try:
+        with ThreadPoolExecutor(max_workers=options.concurrency) as executor:
+            responses = list(executor.map(post, payloads))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        http_server.shutdown()
+        server.stop()
+    latencies = [latency for latency, _ in responses]
+    return latencies, sum(count for _, count in responses), {'concurrency': options.concurrency}
+
+
+SCENARIOS: Dict[str, Callable[[float, argparse.Namespace], ScenarioResult]] = {
+    'generate': bench_generate,
+    'sensitive': bench_sensitive,
+    'whois': bench_whois,
+    'endpoint': bench_endpoint,
+}
+
+
+def run_scenario(name: str, scale: float, options) -> Dict:
+    """运行场景并计算统计值；内存峰值在单独的一轮中用 tracemalloc 测量，不影响计时"""
+    scenario = SCENARIOS[name]
+    start = time.perf_counter()
+    latencies, items, extra = scenario(scale, options)
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'operations': len(latencies),
+        'items': items,
+        'elapsed': round(elapsed, 4),
+        'ops_per_sec': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'items_per_sec': round(items / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+    if options.memory and name != 'endpoint':
+        tracemalloc.start()
+        scenario(scale, options)
+        result['peak_memory_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    result.update(extra)
+    return result
+
+
+# 比较基线时检查的指标：True 表示越大越好
+COMPARED_METRICS = {
+    'items_per_sec': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'peak_memory_kb': False,
+}
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """与基线比较，打印变化并返回退化的指标"""
+    regressions = []
+    print('\n与基线比较（变化超过 {:.0%} 视为退化）:'.format(threshold))
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in metrics or not base.get(metric):
+                continue
+            change = (metrics[metric] - base[metric]) / base[metric]
+            worse = -change if higher_is_better else change
+            flag = '  <-- 退化' if worse > threshold else ''
+            print(f'  {name:10s} {metric:15s} {base[metric]:>12} -> {metrics[metric]:>12} ({change:+.1%}){flag}')
+            if flag:
+                regressions.append(f'{name}.{metric}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Domain service benchmarks')
+    parser.add_argument('--only', nargs='+', choices=list(SCENARIOS), help='Scenarios to run')
+    parser.add_argument('--quick', action='store_true', help='Run at 1/4 scale')
+    parser.add_argument('--scale', type=float, default=1.0, help='Workload scale factor')
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake WHOIS mean latency (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fake WHOIS dropped connection rate')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fake WHOIS rate-limit response rate')
+    parser.add_argument('--whois-rate', type=float, default=1000.0, help='Per-server query rate limit')
+    parser.add_argument('--whois-concurrency', type=int, default=200, help='Max concurrent WHOIS queries')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent /generate clients')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='Skip memory measurement')
+    parser.add_argument('--json', metavar='FILE', help='Write results as JSON')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Save results as the new baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare against a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Regression threshold (fraction)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on regression')
+    options = parser.parse_args()
+
+    scale = options.scale * (0.25 if options.quick else 1.0)
+    # endpoint 场景会导入 main 并修改环境变量，放在最后运行
+    names = [name for name in SCENARIOS if not options.only or name in options.only]
+    results = {}
+    print(f'{"场景":10s} {"操作数":>8s} {"条目/秒":>12s} {"p50(ms)":>10s} {"p95(ms)":>10s} {"p99(ms)":>10s} {"内存(KB)":>10s}')
+    for name in names:
+        result = run_scenario(name, scale, options)
+        results[name] = result
+        print(
+            f'{name:10s} {result["operations"]:>8d} {result["items_per_sec"]:>12.1f} '
+            f'{result["p50_ms"]:>10.2f} {result["p95_ms"]:>10.2f} {result["p99_ms"]:>10.2f} '
+            f'{result.get("peak_memory_kb", "-"):>10}'
+        )
+        if 'outcomes' in result:
+            print(f'{"":10s} 查询结果: {result["outcomes"]}')
+
+    meta = {'scale': scale, 'latency': options.latency, 'error_rate': options.error_rate,
+            'throttle_rate': options.throttle_rate, 'python': sys.version.split()[0]}
+    for path in (options.json, options.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    if options.baseline:
+        with open(options.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('scale') != scale:
+            print(f'警告: 基线的规模 ({baseline.get("meta", {}).get("scale")}) 与本次 ({scale}) 不同')
+        regressions = compare(results, baseline.get('results', {}), options.threshold)
+        if regressions and options.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 待写入队列中表示"删除该域名"的标记
+_DELETED = None
+
+logger = logging.getLogger('domain_service.cache_persister')
+
+
+class CachePersister:
+    """WHOIS缓存的延迟写入（write-behind）
+
+    包装 SQLiteCacheStore / RedisCacheStore，接口与被包装的存储相同。写入和删除只进入
+    内存中的待写入队列（同一域名只保留最后一次修改），由后台线程在队列达到 max_batch
+    条或距上次写入超过 flush_interval 秒时批量写入存储；每批在存储的一个事务中提交
+    （SQLite 事务 / Redis MULTI），进程崩溃时存储中不会出现写了一半的批次，
+    最多丢失尚未写入的最近 flush_interval 秒的缓存。
+
+    读取时先查待写入队列和正在写入的批次，当前进程总能读到自己的写入；
+    其他进程共享存储时最多延迟 flush_interval 秒看到更新。
+    队列超过 max_pending 条时（例如存储长时间不可用）由写入方同步写入，避免内存无限增长。
+    """
+
+    def __init__(
+        self,
+        store,
+        flush_interval: float = 1.0,
+        max_batch: int = 500,
+        max_pending: int = 100000,
+        after_flush: Callable[[], None] = None
+    ):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.after_flush = after_flush
+        self._pending: Dict[str, Optional[Tuple[float, dict]]] = {}
+        self._flushing: Dict[str, Optional[Tuple[float, dict]]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+        # 统计计数
+        self.flushes = 0
+        self.written = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='cache-persister', daemon=True)
+        self._thread.start()
+
+    def _enqueue(self, changes: Dict[str, Optional[Tuple[float, dict]]]) -> None:
+        with self._lock:
+            self._pending.update(changes)
+            pending = len(self._pending)
+        if pending >= self.max_pending:
+            self.flush()
+        elif pending >= self.max_batch:
+            self._wakeup.set()
+
+    def get(self, domain: str) -> Optional[Tuple[float, dict]]:
+        """读取单个域名的缓存，返回 (时间戳, 查询结果)，优先返回尚未写入的修改"""
+        with self._lock:
+            for changes in (self._pending, self._flushing):
+                if domain in changes:
+                    return changes[domain]
+        return self.store.get(domain)
+
+    def set(self, domain: str, result: dict, timestamp: float = None) -> None:
+        """写入单个域名的缓存"""
+        self.set_many({domain: (timestamp or time.time(), result)})
+
+    def set_many(self, entries: Dict[str, Tuple[float, dict]], deletes: Iterable[str] = ()) -> None:
+        """批量写入缓存并删除 deletes 中的域名（进入待写入队列）"""
+        changes = dict(entries)
+        changes.update((domain, _DELETED) for domain in deletes)
+        if changes:
+            self._enqueue(changes)
+
+    def delete(self, domain: str) -> None:
+        """删除单个域名的缓存"""
+        self._enqueue({domain: _DELETED})
+
+    def flush(self) -> int:
+        """立即写入所有待写入的修改，返回写入的条目数；写入失败时修改重新进入队列"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+
+            start = time.time()
+            try:
+                # 写入和删除在存储的同一个事务中提交
+                entries = {domain: entry for domain, entry in batch.items() if entry is not _DELETED}
+                deletes = [domain for domain, entry in batch.items() if entry is _DELETED]
+                self.store.set_many(entries, deletes)
+            except Exception:
+                with self._lock:
+                    # 写入期间的新修改优先；队列已满时丢弃这一批
+                    if len(self._pending) < self.max_pending:
+                        for domain, entry in batch.items():
+                            self._pending.setdefault(domain, entry)
+                    else:
+                        self.dropped += len(batch)
+                    self._flushing = {}
+                    self.failures += 1
+                raise
+            with self._lock:
+                self._flushing = {}
+                self.flushes += 1
+                self.written += len(batch)
+                self.last_flush_ms = round((time.time() - start) * 1000, 2)
+
+        if self.after_flush is not None:
+            self.after_flush()
+        return len(batch)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("写入缓存失败: %s", e)
+
+    def pending(self) -> int:
+        """待写入的修改数量"""
+        with self._lock:
+            return len(self._pending) + len(self._flushing)
+
+    def purge_expired(self, expiry: int) -> int:
+        """清理存储中的过期条目"""
+        return self.store.purge_expired(expiry)
+
+    def add_hits(self, counts: Dict[str, int]) -> None:
+        """累加域名的访问次数（直接写入存储）"""
+        self.store.add_hits(counts)
+
+    def hot_domains(self, min_hits: float) -> List[str]:
+        return self.store.hot_domains(min_hits)
+
+    def decay_hits(self, max_tracked: int) -> int:
+        return self.store.decay_hits(max_tracked)
+
+    def items(self) -> Iterable[Tuple[str, float, dict]]:
+        """遍历所有缓存条目（先写入待写入的修改）"""
+        self.flush()
+        return self.store.items()
+
+    def __len__(self) -> int:
+        self.flush()
+        return len(self.store)
+
+    def import_json(self, json_path: str, expiry: int) -> int:
+        """从旧版JSON缓存文件导入"""
+        return self.store.import_json(json_path, expiry)
+
+    def close(self) -> None:
+        """停止后台线程，写入剩余的修改并关闭存储"""
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        try:
+            self.flush()
+        finally:
+            self.store.close()
+
+    def stats(self) -> Dict:
+        """延迟写入统计信息"""
+        with self._lock:
+            return {
+                'pending': len(self._pending) + len(self._flushing),
+                'flushes': self.flushes,
+                'written': self.written,
+                'failures': self.failures,
+                'dropped': self.dropped,
+                'last_flush_ms': self.last_flush_ms
+            }
@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from whois_cache import WhoisCache
+
+
+class HitCounter:
+    """记录域名的访问次数，定期累加到共享存储
+
+    每个工作进程各有一个计数器，访问次数先在内存中累计，每隔 flush_interval 秒
+    批量写入存储（SQLite 的 whois_hits 表 / Redis 有序集合），所有进程的访问都会被统计。
+    """
+
+    def __init__(self, store, flush_interval: float = 5.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def record(self, domain: str) -> None:
+        """记录一次访问"""
+        with self._lock:
+            self._counts[domain] = self._counts.get(domain, 0) + 1
+
+    def flush(self) -> None:
+        """把内存中累计的访问次数写入存储，写入失败时保留到下次"""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        try:
+            self.store.add_hits(counts)
+        except Exception:
+            with self._lock:
+                for domain, count in counts.items():
+                    self._counts[domain] = self._counts.get(domain, 0) + count
+            raise
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"写入访问次数失败: {e}")
+
+    def start(self) -> None:
+        """启动后台写入线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='hit-counter', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并写入剩余的访问次数"""
+        self._stopping.set()
+        self.flush()
+
+
+class CacheRefresher:
+    """热门域名的WHOIS缓存后台刷新
+
+    访问次数由各进程的 HitCounter 累加到共享存储，每个周期减半（近期访问多的域名
+    保持较高计数）；访问次数达到 min_hits 的域名在缓存剩余时间少于 refresh_ahead 秒时
+    在后台重新查询，避免热门域名过期后由用户请求承担查询延迟。
+    多个进程共享存储时只需在一个进程中运行。
+    """
+
+    def __init__(
+        self,
+        cache: WhoisCache,
+        lookup: Callable[[str], dict],
+        save: Callable[[Dict], None],
+        interval: float = 60.0,
+        refresh_ahead: float = 600.0,
+        min_hits: int = 3,
+        max_concurrency: int = 5,
+        max_tracked: int = 10000
+    ):
+        self.cache = cache
+        self.lookup = lookup
+        self.save = save
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.min_hits = min_hits
+        self.max_concurrency = max_concurrency
+        self.max_tracked = max_tracked
+        self._stopping = threading.Event()
+        self._thread = None
+        self.refreshed = 0
+        self.tracked = 0
+
+    def hot_domains(self) -> List[str]:
+        """访问次数达到阈值的域名，按访问次数从高到低排列"""
+        return self.cache.store.hot_domains(self.min_hits)
+
+    def _decay(self) -> None:
+        """访问次数减半，并只保留计数最高的 max_tracked 个域名"""
+        self.tracked = self.cache.store.decay_hits(self.max_tracked)
+
+    def _refresh(self, domain: str):
+        """重新查询单个域名，返回 (域名, (时间戳, 结果))，失败的查询不覆盖原有缓存"""
+        try:
+            result = self.lookup(domain)
+        except Exception as e:
+            print(f"后台刷新失败: {domain} - {e}")
+            return None
+        if not result.get('success') and result.get('error') != '未注册':
+            return None
+        return domain, (time.time(), result)
+
+    def refresh_once(self) -> int:
+        """刷新一轮即将过期的热门域名，返回刷新的数量"""
+        due = []
+        for domain in self.hot_domains():
+            try:
+                remaining = self.cache.expires_in(domain)
+            except Exception as e:
+                print(f"读取缓存失败: {e}")
+                continue
+            if remaining is not None and remaining < self.refresh_ahead:
+                due.append(domain)
+        if due:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                entries = dict(entry for entry in executor.map(self._refresh, due) if entry)
+            self.save(entries)
+            self.refreshed += len(entries)
+        self._decay()
+        return len(due)
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self.refresh_once()
+            except Exception as e:
+                print(f"后台刷新失败: {e}")
+
+    def start(self) -> None:
+        """启动后台刷新线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='cache-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台刷新线程"""
+        self._stopping.set()
+
+    def stats(self) -> dict:
+        """刷新统计信息"""
+        return {
+            'tracked': self.tracked,
+            'hot': len(self.hot_domains()),
+            'refreshed': self.refreshed
+        }
@@ -0,0 +1,147 @@
+import asyncio
+import random
+import struct
+from typing import Dict, List, Optional, Tuple
+
+DNS_PORT = 53
+DEFAULT_NAMESERVER = '8.8.8.8'
+
+QTYPE_NS = 2
+QCLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+
+# 预筛选结果
+REGISTERED = 'registered'   # 存在NS记录，域名已注册
+NXDOMAIN = 'nxdomain'       # 域名不存在，需要WHOIS确认
+UNKNOWN = 'unknown'         # 超时或其他响应，交给WHOIS判断
+
+
+def read_nameserver(resolv_conf: str = '/etc/resolv.conf') -> str:
+    """读取系统配置的第一个DNS服务器"""
+    try:
+        with open(resolv_conf, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver':
+                    return parts[1]
+    except OSError:
+        pass
+    return DEFAULT_NAMESERVER
+
+
+def build_query(domain: str, query_id: int, qtype: int = QTYPE_NS) -> bytes:
+    """构造DNS查询报文（递归查询）"""
+    header = struct.pack('>HHHHHH', query_id, 0x0100, 1, 0, 0, 0)
+    qname = b''.join(
+        bytes([len(label)]) + label
+        for label in domain.rstrip('.').encode('idna').split(b'.')
+    ) + b'\x00'
+    return header + qname + struct.pack('>HH', qtype, QCLASS_IN)
+
+
+def parse_response(data: bytes) -> Tuple[int, int, int]:
+    """解析DNS响应头，返回 (查询ID, 响应码, 应答记录数)"""
+    if len(data) < 12:
+        raise ValueError('DNS响应过短')
+    query_id, flags, _, ancount, _, _ = struct.unpack('>HHHHHH', data[:12])
+    return query_id, flags & 0x000F, ancount
+
+
+def classify_response(rcode: int, ancount: int) -> str:
+    """根据响应码和应答数判断预筛选结果"""
+    if rcode == RCODE_NXDOMAIN:
+        return NXDOMAIN
+    if rcode == RCODE_NOERROR and ancount > 0:
+        return REGISTERED
+    return UNKNOWN
+
+
+class _DnsQueryProtocol(asyncio.DatagramProtocol):
+    """发送单个DNS查询并等待对应ID的响应"""
+
+    def __init__(self, payload: bytes, query_id: int, future: asyncio.Future):
+        self.payload = payload
+        self.query_id = query_id
+        self.future = future
+
+    def connection_made(self, transport):
+        transport.sendto(self.payload)
+
+    def datagram_received(self, data, addr):
+        if self.future.done():
+            return
+        try:
+            query_id, rcode, ancount = parse_response(data)
+        except ValueError:
+            return
+        if query_id == self.query_id:
+            self.future.set_result((rcode, ancount))
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+class DnsPrescreener:
+    """WHOIS查询前的DNS预筛选
+
+    并发查询候选域名的NS记录：能解析的域名直接判定为已注册，
+    只有NXDOMAIN或无法判断的域名才需要进行WHOIS查询。
+    """
+
+    def __init__(
+        self,
+        nameserver: Optional[str] = None,
+        port: int = DNS_PORT,
+        timeout: float = 1.0,
+        max_concurrency: int = 100
+    ):
+        self.nameserver = nameserver or read_nameserver()
+        self.port = port
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+
+    async def query(self, domain: str) -> Tuple[int, int]:
+        """查询域名的NS记录，返回 (响应码, 应答记录数)"""
+        loop = asyncio.get_running_loop()
+        query_id = random.randint(0, 0xFFFF)
+        future = loop.create_future()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DnsQueryProtocol(build_query(domain, query_id), query_id, future),
+            remote_addr=(self.nameserver, self.port)
+        )
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            transport.close()
+
+    async def check(self, domain: str, semaphore: asyncio.Semaphore = None) -> str:
+        """检查单个域名，返回 REGISTERED / NXDOMAIN / UNKNOWN"""
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(1)
+        async with semaphore:
+            try:
+                rcode, ancount = await self.query(domain)
+            except (asyncio.TimeoutError, OSError, UnicodeError):
+                return UNKNOWN
+        return classify_response(rcode, ancount)
+
+    async def check_many(self, domains: List[str]) -> Dict[str, str]:
+        """并发检查多个域名"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(self.check(domain, semaphore) for domain in domains))
+        return dict(zip(domains, results))
+
+
+def registered_result() -> dict:
+    """DNS判定为已注册的域名使用的WHOIS格式结果"""
+    return {
+        'registrar': 'Unknown',
+        'creation_date': 'Unknown',
+        'expiration_date': 'Unknown',
+        'status': 'DNS已解析',
+        'source': 'dns',
+        'success': True
+    }
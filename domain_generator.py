@@ -1,11 +1,28 @@
 import random
 import string
+import heapq
 import itertools
-from typing import List, Tuple, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Iterator, List, Tuple, Optional
 import pypinyin
 
+# 拼音声调字符，移除声调时使用转换表一次完成
+TONE_MARKS = 'āáǎàēéěèīíǐìōóǒòūúǔùǖǘǚǜ'
+_TONE_SET = frozenset(TONE_MARKS)
+_STRIP_TONES = str.maketrans('', '', TONE_MARKS)
+
 class DomainGenerator:
-    def __init__(self):
+    # 品牌评分各项的权重（各项得分均在 0~1 之间）
+    BRAND_WEIGHTS = {
+        'length': 0.3,            # 越短越好
+        'pronounceability': 0.3,  # 辅音和元音交替，避免连续辅音
+        'digits': 0.2,            # 数字越少越好
+        'keyword_position': 0.2   # 关键词在开头最好，其次在结尾
+    }
+
+    def __init__(self, variation_cache_size: int = 1024):
         # 预定义的字典（可以根据需要扩展）
         self.dictionary = [
             'web', 'app', 'site', 'online', 'digital', 'tech', 'cloud', 'data',
@@ -28,12 +45,72 @@ class DomainGenerator:
             'zh': 'zh', 'ch': 'ch', 'sh': 'sh',
             'ng': 'n', 'r': 'r', 'y': 'y', 'w': 'w'
         }
+        
+        # 字符类别转换表（字节）：辅音 -> c，元音 -> v，数字 -> d
+        self._char_classes = bytes.maketrans(
+            (self.consonants + self.vowels + self.numbers).encode(),
+            b'c' * len(self.consonants) + b'v' * len(self.vowels) + b'd' * len(self.numbers)
+        )
+        
+        # 关键词变体缓存（LRU），热门关键词不再重复进行拼音转换
+        self.variation_cache_size = variation_cache_size
+        self._variation_cache = OrderedDict()
+        self._variation_cache_lock = threading.Lock()
+        self.variation_cache_hits = 0
+        self.variation_cache_misses = 0
+
+    def _cached(self, key: Hashable, compute) -> tuple:
+        """从变体缓存中读取，未命中时调用 compute() 计算并写入（缓存值为不可变的元组）"""
+        with self._variation_cache_lock:
+            value = self._variation_cache.get(key)
+            if value is not None:
+                self._variation_cache.move_to_end(key)
+                self.variation_cache_hits += 1
+                return value
+            self.variation_cache_misses += 1
+        
+        # 在锁外计算，避免拼音转换阻塞其他线程
+        value = compute()
+        if self.variation_cache_size <= 0:
+            return value
+        with self._variation_cache_lock:
+            self._variation_cache[key] = value
+            self._variation_cache.move_to_end(key)
+            while len(self._variation_cache) > self.variation_cache_size:
+                self._variation_cache.popitem(last=False)
+        return value
+
+    def warm_variation_cache(self, path: str) -> int:
+        """从文件预热变体缓存（每行一个关键词），返回预热的关键词数"""
+        count = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    keyword = line.strip()
+                    if keyword and not keyword.startswith('#'):
+                        self._generate_variations(keyword)
+                        count += 1
+        except OSError as e:
+            print(f"预热变体缓存失败: {e}")
+        return count
+
+    def variation_cache_stats(self) -> dict:
+        """变体缓存统计信息"""
+        with self._variation_cache_lock:
+            size = len(self._variation_cache)
+        lookups = self.variation_cache_hits + self.variation_cache_misses
+        return {
+            'size': size,
+            'max_size': self.variation_cache_size,
+            'hits': self.variation_cache_hits,
+            'misses': self.variation_cache_misses,
+            'hit_ratio': round(self.variation_cache_hits / lookups, 4) if lookups else 0.0
+        }
 
     def _is_pinyin(self, word: str) -> bool:
         """检查是否为拼音输入"""
         # 检查是否包含声调
-        tones = 'āáǎàēéěèīíǐìōóǒòūúǔùǖǘǚǜ'
-        if any(char in tones for char in word):
+        if not _TONE_SET.isdisjoint(word):
             return True
             
         # 检查是否包含拼音声母
@@ -48,90 +125,296 @@ class DomainGenerator:
             
         return False
 
+    def _normalize_pinyin(self, word: str) -> str:
+        """移除声调并处理特殊声母"""
+        word = word.translate(_STRIP_TONES)
+        for initial, replacement in self.pinyin_initials.items():
+            if word.startswith(initial):
+                return replacement + word[2:]
+        return word
+
     def _get_pinyin_variations(self, word: str) -> List[str]:
         """获取拼音变体"""
         variations = set()
         
         # 如果是拼音输入，直接处理
         if self._is_pinyin(word):
-            # 移除声调
-            word = ''.join(char for char in word if char not in 'āáǎàēéěèīíǐìōóǒòūúǔùǖǘǚǜ')
-            
-            # 处理特殊声母
-            for initial, replacement in self.pinyin_initials.items():
-                if word.startswith(initial):
-                    word = replacement + word[2:]
-                    break
+            # 移除声调并处理特殊声母
+            word = self._normalize_pinyin(word)
             
             # 添加完整拼音
             variations.add(word)
             
+            # 拼音转换只做一次
+            syllables = pypinyin.lazy_pinyin(word)
+            
             # 添加首字母
-            initials = ''.join(p[0] for p in pypinyin.lazy_pinyin(word))
+            initials = ''.join(p[0] for p in syllables)
             variations.add(initials)
             
             # 添加声母
-            shengmu = ''.join(p[0] for p in pypinyin.lazy_pinyin(word) if p[0] in self.consonants)
+            shengmu = ''.join(p[0] for p in syllables if p[0] in self.consonants)
             if shengmu:
                 variations.add(shengmu)
                 
             # 添加韵母
-            yunmu = ''.join(p[1:] for p in pypinyin.lazy_pinyin(word) if len(p) > 1)
+            yunmu = ''.join(p[1:] for p in syllables if len(p) > 1)
             if yunmu:
                 variations.add(yunmu)
         
         return list(variations)
     
     def _generate_variations(self, word: str) -> List[str]:
-        """生成关键词变体"""
-        variations = set()
-        
+        """生成关键词变体（使用变体缓存）"""
+        return list(self._iter_variations(word))
+
+    def _iter_variations(self, word: str) -> Iterator[str]:
+        """按固定顺序逐个生成不重复的关键词变体"""
+        return iter(self._cached(('variations', word), lambda: tuple(self._compute_variations(word))))
+
+    def _compute_variations(self, word: str) -> Iterator[str]:
+        """去除重复的关键词变体"""
+        seen = set()
+        for variation in self._iter_raw_variations(word):
+            if variation not in seen:
+                seen.add(variation)
+                yield variation
+
+    def _iter_raw_variations(self, word: str) -> Iterator[str]:
+        """逐个生成关键词变体（可能重复）"""
         # 添加原始词
-        variations.add(word)
+        yield word
         
         # 如果是拼音输入，添加拼音变体
         if self._is_pinyin(word):
-            # 移除声调
-            word = ''.join(char for char in word if char not in 'āáǎàēéěèīíǐìōóǒòūúǔùǖǘǚǜ')
-            
-            # 处理特殊声母
-            for initial, replacement in self.pinyin_initials.items():
-                if word.startswith(initial):
-                    word = replacement + word[2:]
-                    break
+            # 移除声调并处理特殊声母
+            word = self._normalize_pinyin(word)
             
             # 添加完整拼音
-            variations.add(word)
+            yield word
             
             # 添加首字母缩写
             initials = ''.join(p[0] for p in pypinyin.lazy_pinyin(word))
-            variations.add(initials)
+            yield initials
         
         # 添加数字变体
         for i in range(10):
-            variations.add(f"{word}{i}")
-            variations.add(f"{i}{word}")
+            yield f"{word}{i}"
+            yield f"{i}{word}"
         
         # 添加常见后缀
         suffixes = ['app', 'web', 'site', 'net', 'tech', 'pro', 'plus', 'hub']
         for suffix in suffixes:
-            variations.add(f"{word}{suffix}")
-            variations.add(f"{suffix}{word}")
+            yield f"{word}{suffix}"
+            yield f"{suffix}{word}"
         
         # 添加常见前缀
         prefixes = ['my', 'get', 'go', 'try', 'use', 'buy', 'shop', 'find']
         for prefix in prefixes:
-            variations.add(f"{prefix}{word}")
+            yield f"{prefix}{word}"
+
+    @staticmethod
+    def _rng(seed, *parts) -> random.Random:
+        """获取随机数生成器：未指定种子时使用全局 random，否则按种子和用途派生独立的生成器"""
+        if seed is None:
+            return random
+        return random.Random(':'.join(str(part) for part in (seed,) + parts))
+
+    def _iter_keyword_names(self, keyword: str, min_length: int, max_length: int, seed=None) -> Iterator[str]:
+        """逐个生成单个关键词满足长度要求的域名主体（不含后缀）"""
+        for variation in self._iter_variations(keyword):
+            # 如果变体长度已经满足要求，直接使用
+            if min_length <= len(variation) <= max_length:
+                yield variation
+            # 如果变体长度不足，添加随机字符
+            elif len(variation) < min_length:
+                # 随机字符只由种子和变体决定，与变体在序列中的位置无关
+                rng = self._rng(seed, 'pad', variation, min_length)
+                remaining_length = min_length - len(variation)
+                random_chars = ''.join(rng.choice(self.consonants + self.vowels + self.numbers) 
+                                     for _ in range(remaining_length))
+                name = variation + random_chars
+                if len(name) <= max_length:
+                    yield name
+
+    def sample_fill_names(
+        self,
+        keywords: List[str],
+        min_length: int,
+        max_length: int,
+        count: int,
+        exclude=frozenset(),
+        rng=random,
+        max_attempts: int = 1000,
+        time_budget: Optional[float] = 0.05
+    ) -> List[str]:
+        """在"关键词 + 随机字符"的候选空间中无放回地抽取域名主体
+
+        候选空间按 (关键词, 长度) 分段，每段大小为字符集大小的 (长度 - 关键词长度) 次方。
+        每次随机选择一个未抽完的段，再在段内抽取一个未用过的序号并解码为随机字符。
+        抽取次数和耗时都有上限，候选空间不足时返回能生成的部分（可能少于 count 个）。
+        time_budget 为 None 时只按 max_attempts 限制（结果只取决于 rng，指定种子时可复现）。
+        """
+        alphabet = self.consonants + self.vowels + self.numbers
+        segments = []
+        for keyword in dict.fromkeys(keywords):
+            # 确保域名包含完整的关键词，且至少补一个字符
+            for length in range(max(min_length, len(keyword) + 1), max_length + 1):
+                segments.append((keyword, length, len(alphabet) ** (length - len(keyword)), set()))
         
-        return list(variations)
+        names = []
+        seen = set(exclude)
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        attempts = 0
+        while len(names) < count and segments and attempts < max_attempts:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            attempts += 1
+            segment = rng.choice(segments)
+            keyword, length, size, used = segment
+            index = rng.randrange(size)
+            if index in used:
+                continue
+            used.add(index)
+            if len(used) >= size:
+                segments.remove(segment)
+            
+            # 将序号解码为固定长度的随机字符
+            chars = []
+            for _ in range(length - len(keyword)):
+                index, digit = divmod(index, len(alphabet))
+                chars.append(alphabet[digit])
+            name = keyword + ''.join(chars)
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+        return names
 
-    def generate_domains(
+    def _keyword_names(self, keyword: str, min_length: int, max_length: int, seed=None) -> Tuple[str, ...]:
+        """单个关键词的全部域名主体；指定种子时结果确定，按关键词和生成参数缓存"""
+        if seed is None:
+            return tuple(self._iter_keyword_names(keyword, min_length, max_length))
+        # 派生随机数生成器时种子按字符串使用，缓存键同样用字符串（列表等不可哈希的种子也可以使用）
+        return self._cached(
+            ('names', keyword, min_length, max_length, str(seed)),
+            lambda: tuple(self._iter_keyword_names(keyword, min_length, max_length, seed))
+        )
+
+    def _keyword_name_lists(self, keywords: List[str], min_length: int, max_length: int, seed=None) -> List[List[str]]:
+        """各关键词按排名顺序排列的域名主体，重复的主体只归属于第一个产生它的关键词"""
+        seen = set()
+        name_lists = []
+        for keyword in keywords:
+            names = []
+            for name in self._keyword_names(keyword, min_length, max_length, seed):
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+            name_lists.append(names)
+        return name_lists
+
+    @staticmethod
+    def _locate(lengths: List[int], position: int) -> Tuple[int, int]:
+        """计算轮流排列中第 position 个元素所在的轮次及其在该轮中的序号"""
+        def count_before(round_index):
+            return sum(min(length, round_index) for length in lengths)
+
+        # 二分查找满足 count_before(r) <= position 的最大轮次 r
+        low, high = 0, max(lengths, default=0)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_before(middle) <= position:
+                low = middle
+            else:
+                high = middle - 1
+        return low, position - count_before(low)
+
+    @staticmethod
+    def _iter_round_robin(name_lists: List[List[str]], start_round: int, skip: int) -> Iterator[str]:
+        """从指定轮次的第 skip 个元素开始轮流取出各列表的元素"""
+        for round_index in range(start_round, max((len(names) for names in name_lists), default=0)):
+            names = [names[round_index] for names in name_lists if len(names) > round_index]
+            yield from names[skip if round_index == start_round else 0:]
+
+    def iter_combinations(
+        self,
+        keywords: List[str],
+        length_range: Tuple[int, int],
+        max_parts: int = 3,
+        use_dictionary: bool = True
+    ) -> Iterator[str]:
+        """逐个生成由多个关键词（及字典词）拼接而成的域名主体
+
+        先生成两个词的组合，再生成三个词的组合，每个组合至少包含一个关键词，
+        同一个词在组合中只出现一次。词按长度分桶，选择每个位置的词时只遍历
+        剩余长度允许的桶，不满足 length_range 的组合不会被拼接成字符串。
+        """
+        min_length, max_length = length_range
+        keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords if keyword))
+        words = list(keywords)
+        if use_dictionary:
+            words += [word for word in self.dictionary if word not in keywords]
+        if not keywords:
+            return
+        
+        # 按长度分桶的词索引；最后一个位置还没有关键词时只从关键词桶中选择
+        word_buckets = {}
+        for word in words:
+            word_buckets.setdefault(len(word), []).append(word)
+        keyword_buckets = {}
+        for keyword in keywords:
+            keyword_buckets.setdefault(len(keyword), []).append(keyword)
+        shortest, longest = min(word_buckets), max(word_buckets)
+        keyword_set = set(keywords)
+
+        def extend(parts, length, remaining, has_keyword):
+            # 剩余位置至少需要 shortest、至多能提供 longest 个字符
+            low = min_length - length - longest * (remaining - 1)
+            high = max_length - length - shortest * (remaining - 1)
+            buckets = keyword_buckets if remaining == 1 and not has_keyword else word_buckets
+            for size in sorted(buckets):
+                if size < low or size > high:
+                    continue
+                for word in buckets[size]:
+                    if word in parts:
+                        continue
+                    if remaining == 1:
+                        yield ''.join(parts) + word
+                    else:
+                        yield from extend(parts + (word,), length + size, remaining - 1,
+                                          has_keyword or word in keyword_set)
+
+        for count in range(2, max_parts + 1):
+            yield from extend((), 0, count, False)
+
+    @staticmethod
+    def _iter_unique(names: Iterable[str], seen: set) -> Iterator[str]:
+        """过滤掉已经出现过的名称"""
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+    def iter_domains(
         self,
         keywords: List[str] = None,
         length_range: Tuple[int, int] = None,
-        tlds: List[str] = None
-    ) -> List[str]:
-        """生成域名"""
+        tlds: List[str] = None,
+        seed=None,
+        offset: int = 0,
+        combine: bool = False
+    ) -> Iterator[str]:
+        """按需逐个生成不重复的域名
+
+        排列顺序：各关键词按变体排名轮流产出域名主体，每个主体依次搭配所有后缀。
+        调用方取够所需数量（或满足过滤条件）后即可停止迭代，不会生成多余的域名。
+
+        指定 seed 后结果完全确定，与进程和哈希随机化无关；offset 可直接定位到
+        序列中的任意位置，无需生成之前的域名，用于稳定分页。
+
+        combine=True 时在单关键词域名之后继续产出多关键词组合（见 iter_combinations），
+        组合部分按需生成，offset 落在组合部分时需要跳过之前的组合。
+        """
         if not keywords:
             keywords = ['web', 'app', 'site']
         if not length_range:
@@ -139,43 +422,104 @@ class DomainGenerator:
         if not tlds:
             tlds = ['.com', '.net', '.org']
             
-        domains = set()
         min_length, max_length = length_range
+        name_lists = self._keyword_name_lists(keywords, min_length, max_length, seed)
+        total_names = sum(len(names) for names in name_lists)
+        name_offset, tld_offset = divmod(offset, len(tlds))
         
-        # 处理每个关键词
-        for keyword in keywords:
-            # 生成关键词变体
-            variations = self._generate_variations(keyword)
-            
-            # 为每个变体生成域名
-            for variation in variations:
-                # 如果变体长度已经满足要求，直接添加后缀
-                if min_length <= len(variation) <= max_length:
-                    for tld in tlds:
-                        domains.add(variation + tld)
-                # 如果变体长度不足，添加随机字符
-                elif len(variation) < min_length:
-                    remaining_length = min_length - len(variation)
-                    # 添加随机字符
-                    random_chars = ''.join(random.choice(self.consonants + self.vowels + self.numbers) 
-                                         for _ in range(remaining_length))
-                    domain = variation + random_chars
-                    if len(domain) <= max_length:
-                        for tld in tlds:
-                            domains.add(domain + tld)
+        # 各关键词轮流产出域名主体
+        start_round, skip = self._locate([len(names) for names in name_lists], name_offset)
+        names = self._iter_round_robin(name_lists, start_round, skip)
         
         # 如果生成的域名太少，添加一些基于关键词的随机域名
-        while len(domains) < 10:
-            keyword = random.choice(keywords)
-            length = random.randint(min_length, max_length)
-            # 确保域名包含完整的关键词
-            if len(keyword) < length:
-                remaining_length = length - len(keyword)
-                random_chars = ''.join(random.choice(self.consonants + self.vowels + self.numbers) 
-                                     for _ in range(remaining_length))
-                domain = keyword + random_chars
-                for tld in tlds:
-                    if min_length <= len(domain) <= max_length:
-                        domains.add(domain + tld)
+        seen = set(itertools.chain.from_iterable(name_lists))
+        fill_names = []
+        if total_names * len(tlds) < 10:
+            fill_names = self.sample_fill_names(
+                keywords, min_length, max_length,
+                count=-(-(10 - total_names * len(tlds)) // len(tlds)),
+                exclude=seen,
+                rng=self._rng(seed, 'fill'),
+                # 指定种子时不按耗时截断，结果不受机器负载影响
+                time_budget=None if seed is not None else 0.05
+            )
+            names = itertools.chain(names, fill_names[max(0, name_offset - total_names):])
+        
+        # 多关键词组合，按需生成
+        if combine:
+            seen.update(fill_names)
+            combinations = self._iter_unique(self.iter_combinations(keywords, length_range), seen)
+            skip = max(0, name_offset - total_names - len(fill_names))
+            names = itertools.chain(names, itertools.islice(combinations, skip, None))
         
-        return list(domains) 
\ No newline at end of file
+        for name in names:
+            for tld in tlds[tld_offset:]:
+                yield name + tld
+            tld_offset = 0
+
+    def score_name(self, name: str, keywords: List[str]) -> float:
+        """计算域名主体的品牌评分（0~1），综合长度、可读性、数字和关键词位置"""
+        if not name:
+            return 0.0
+        weights = self.BRAND_WEIGHTS
+        
+        # 长度：6个字符以内满分，之后逐渐降低
+        length_score = 1 / (1 + max(0, len(name) - 6) * 0.15)
+        
+        # 可读性：相邻字符中辅音和元音交替的比例，连续三个辅音额外扣分
+        # （cv / vc 不会自身重叠，str.count 即为准确的相邻对数量）
+        pattern = name.encode('ascii', 'replace').translate(self._char_classes)
+        if len(pattern) > 1:
+            pronounceability = (pattern.count(b'cv') + pattern.count(b'vc')) / (len(pattern) - 1)
+        else:
+            pronounceability = 1.0
+        pronounceability = max(0.0, pronounceability - 0.2 * pattern.count(b'ccc'))
+        
+        # 数字：每个数字扣 0.25 分
+        digits_score = max(0.0, 1 - 0.25 * pattern.count(b'd'))
+        
+        # 关键词位置：开头 1.0，结尾 0.7，中间 0.4，不包含完整关键词 0.2
+        keyword_score = 0.2
+        for keyword in keywords:
+            if name.startswith(keyword):
+                keyword_score = 1.0
+                break
+            if name.endswith(keyword):
+                keyword_score = max(keyword_score, 0.7)
+            elif keyword in name:
+                keyword_score = max(keyword_score, 0.4)
+        
+        return (
+            weights['length'] * length_score
+            + weights['pronounceability'] * pronounceability
+            + weights['digits'] * digits_score
+            + weights['keyword_position'] * keyword_score
+        )
+
+    def rank_domains(self, domains: Iterable[str], keywords: List[str], k: int) -> List[Tuple[str, float]]:
+        """按品牌评分选出前 k 个域名，返回 [(域名, 评分)]
+
+        使用堆只保留 k 个候选（O(n log k)），输入可以是生成器；
+        同一主体搭配不同后缀时只计算一次评分，评分相同时保持生成顺序。
+        """
+        keywords = [keyword.lower() for keyword in keywords or []]
+        scores = {}
+
+        def score(domain):
+            name = domain.split('.', 1)[0]
+            value = scores.get(name)
+            if value is None:
+                value = scores[name] = self.score_name(name, keywords)
+            return value
+
+        return [(domain, round(score(domain), 4)) for domain in heapq.nlargest(k, domains, key=score)]
+
+    def generate_domains(
+        self,
+        keywords: List[str] = None,
+        length_range: Tuple[int, int] = None,
+        tlds: List[str] = None,
+        seed=None
+    ) -> List[str]:
+        """生成域名"""
+        return list(self.iter_domains(keywords, length_range, tlds, seed))
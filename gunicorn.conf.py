@@ -0,0 +1,50 @@
+"""Gunicorn 生产环境配置
+
+启动方式：gunicorn -c gunicorn.conf.py main:app
+
+每个工作进程独立导入 main.py（不使用 preload_app），各自拥有WHOIS客户端的
+事件循环线程和SQLite连接；WHOIS缓存、批量任务和已注册域名索引都保存在共享的
+文件中（SQLite WAL / mmap），多个工作进程可以同时读写。
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8888')
+
+# 工作进程数和每个进程的线程数；WHOIS查询主要是等待网络，线程比进程更省资源
+workers = int(os.environ.get('GUNICORN_WORKERS', min(4, multiprocessing.cpu_count())))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_class = 'gthread'
+
+# WHOIS服务器限额（WHOIS_SERVER_RATE 等）是所有工作进程合计的限额，
+# 工作进程在 fork 后导入 main.py 时按进程数平分
+os.environ.setdefault('WHOIS_PROCESSES', str(workers))
+
+# 各工作进程把监控指标写入同一个目录，/metrics 汇总所有进程（每次启动使用新目录）
+_metrics_dir = None
+if 'METRICS_DIR' not in os.environ:
+    _metrics_dir = tempfile.mkdtemp(prefix='domain-service-metrics-')
+    os.environ['METRICS_DIR'] = _metrics_dir
+
+# 流式接口可能持续较长时间；收到停止信号后给进行中的请求留出完成时间
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """工作进程退出前停止后台任务并写回缓存"""
+    import main
+    main.shutdown()
+
+
+def on_exit(server):
+    """主进程退出时删除自动创建的指标目录"""
+    if _metrics_dir is not None:
+        shutil.rmtree(_metrics_dir, ignore_errors=True)
@@ -0,0 +1,303 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+# 任务状态
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class JobManager:
+    """批量域名检查任务管理
+
+    提交生成参数后在后台依次完成域名生成、敏感词检测和分批WHOIS查询，
+    结果按序号保存在SQLite中，可通过游标分页读取。任务状态持久化，
+    调用 resume() 后会从未完成的位置继续。
+
+    多个进程共享同一个任务数据库时，每个任务由持有租约的进程执行：进程通过原子的
+    UPDATE 认领租约已过期的任务，后台线程每 lease_seconds / 3 秒为本进程的任务续约，
+    并接管租约已过期（所属进程已退出或卡住）的未完成任务。写入结果时检查租约，
+    租约被其他进程接管后当前进程停止执行该任务，同一任务不会被两个进程同时执行。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        generate: Callable[[dict], List[dict]],
+        check_whois: Callable[[List[str]], Dict[str, dict]],
+        max_workers: int = 2,
+        batch_size: int = 50,
+        lease_seconds: float = 60.0
+    ):
+        self.path = path
+        self.generate = generate
+        self.check_whois = check_whois
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._slots = threading.Semaphore(max_workers)
+        self._stopping = threading.Event()
+        self._local = threading.local()
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接（每个线程一个连接）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        """创建任务表和结果表"""
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, '
+            'spec TEXT NOT NULL, '
+            'status TEXT NOT NULL, '
+            'total INTEGER NOT NULL DEFAULT 0, '
+            'checked INTEGER NOT NULL DEFAULT 0, '
+            'error TEXT, '
+            'created_at REAL NOT NULL, '
+            'updated_at REAL NOT NULL, '
+            'owner TEXT, '
+            'lease_until REAL NOT NULL DEFAULT 0)'
+        )
+        # 旧版任务数据库没有租约字段
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for column, definition in (('owner', 'TEXT'), ('lease_until', 'REAL NOT NULL DEFAULT 0')):
+            if column not in columns:
+                try:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {definition}')
+                except sqlite3.OperationalError:
+                    # 其他进程已同时添加
+                    pass
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_results ('
+            'job_id TEXT NOT NULL, '
+            'idx INTEGER NOT NULL, '
+            'domain TEXT NOT NULL, '
+            'sensitive_words TEXT NOT NULL, '
+            'is_safe INTEGER NOT NULL, '
+            'whois TEXT, '
+            'PRIMARY KEY (job_id, idx))'
+        )
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        self._connect().execute(
+            f'UPDATE jobs SET {columns} WHERE id = ?',
+            (*fields.values(), job_id)
+        )
+
+    def _claim(self, job_id: str) -> bool:
+        """认领租约已过期的未完成任务，多个进程同时认领时只有一个成功"""
+        now = time.time()
+        cursor = self._connect().execute(
+            'UPDATE jobs SET owner = ?, lease_until = ? '
+            'WHERE id = ? AND status IN (?, ?) AND lease_until < ?',
+            (self.owner, now + self.lease_seconds, job_id, PENDING, RUNNING, now)
+        )
+        return cursor.rowcount == 1
+
+    def _renew(self, conn: sqlite3.Connection, job_id: str, **fields) -> bool:
+        """续约并更新任务字段，租约已被其他进程接管时返回 False"""
+        now = time.time()
+        fields['updated_at'] = now
+        fields['lease_until'] = now + self.lease_seconds
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        cursor = conn.execute(
+            f'UPDATE jobs SET {columns} WHERE id = ? AND owner = ?',
+            (*fields.values(), job_id, self.owner)
+        )
+        return cursor.rowcount == 1
+
+    def submit(self, spec: dict) -> str:
+        """提交任务，返回任务ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            'INSERT INTO jobs (id, spec, status, created_at, updated_at, owner, lease_until) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job_id, json.dumps(spec, ensure_ascii=False), PENDING, now, now, self.owner, now + self.lease_seconds)
+        )
+        self._start(job_id)
+        self._start_monitor()
+        return job_id
+
+    def resume(self) -> List[str]:
+        """认领并重新启动租约已过期的未完成任务，并启动后台续约和接管线程"""
+        job_ids = self._resume_expired()
+        self._start_monitor()
+        return job_ids
+
+    def _resume_expired(self) -> List[str]:
+        rows = self._connect().execute(
+            'SELECT id FROM jobs WHERE status IN (?, ?) AND lease_until < ? ORDER BY created_at',
+            (PENDING, RUNNING, time.time())
+        ).fetchall()
+        job_ids = [row[0] for row in rows if self._claim(row[0])]
+        for job_id in job_ids:
+            self._start(job_id)
+        return job_ids
+
+    def _start_monitor(self) -> None:
+        with self._monitor_lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._monitor_leases, name='job-leases', daemon=True)
+                self._monitor.start()
+
+    def _monitor_leases(self) -> None:
+        """定期为本进程的任务（包括等待执行名额的任务）续约，并接管租约已过期的任务"""
+        while not self._stopping.wait(self.lease_seconds / 3):
+            try:
+                now = time.time()
+                self._connect().execute(
+                    'UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)',
+                    (now + self.lease_seconds, self.owner, PENDING, RUNNING)
+                )
+                resumed = self._resume_expired()
+                if resumed:
+                    print(f"接管租约已过期的任务: {len(resumed)} 个")
+            except Exception as e:
+                print(f"任务续约失败: {e}")
+
+    def _start(self, job_id: str) -> None:
+        """在后台线程中运行任务，同时运行的任务数受 max_workers 限制"""
+        def run():
+            with self._slots:
+                if not self._stopping.is_set():
+                    self._run(job_id)
+
+        # 守护线程不会阻止进程退出，中断的任务在下次启动时继续
+        threading.Thread(target=run, name=f'job-{job_id[:8]}', daemon=True).start()
+
+    def _run(self, job_id: str) -> None:
+        """执行任务：生成域名（仅首次）后分批查询WHOIS"""
+        conn = self._connect()
+        try:
+            spec_text, status = conn.execute(
+                'SELECT spec, status FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+
+            # 生成和敏感词检测只执行一次，结果与状态在同一事务中写入（写入前确认仍持有租约）
+            if status == PENDING:
+                results = self.generate(json.loads(spec_text))
+                with conn:
+                    conn.execute('BEGIN')
+                    if not self._renew(conn, job_id, status=RUNNING, total=len(results)):
+                        conn.execute('ROLLBACK')
+                        print(f"任务已被其他进程接管: {job_id}")
+                        return
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO job_results '
+                        '(job_id, idx, domain, sensitive_words, is_safe) VALUES (?, ?, ?, ?, ?)',
+                        [
+                            (job_id, idx, r['domain'], json.dumps(r['sensitive_words'], ensure_ascii=False), int(r['is_safe']))
+                            for idx, r in enumerate(results)
+                        ]
+                    )
+
+            # 分批查询尚未完成的域名
+            while not self._stopping.is_set():
+                rows = conn.execute(
+                    'SELECT idx, domain FROM job_results '
+                    'WHERE job_id = ? AND whois IS NULL ORDER BY idx LIMIT ?',
+                    (job_id, self.batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                whois_results = self.check_whois([domain for _, domain in rows])
+                with conn:
+                    conn.execute('BEGIN')
+                    if not self._renew(conn, job_id):
+                        conn.execute('ROLLBACK')
+                        print(f"任务已被其他进程接管: {job_id}")
+                        return
+                    conn.executemany(
+                        'UPDATE job_results SET whois = ? WHERE job_id = ? AND idx = ?',
+                        [
+                            (
+                                json.dumps(
+                                    whois_results.get(domain, {'success': False, 'error': '查询失败'}),
+                                    ensure_ascii=False
+                                ),
+                                job_id,
+                                idx
+                            )
+                            for idx, domain in rows
+                        ]
+                    )
+                    checked = conn.execute(
+                        'SELECT COUNT(*) FROM job_results WHERE job_id = ? AND whois IS NOT NULL',
+                        (job_id,)
+                    ).fetchone()[0]
+                    self._update(job_id, checked=checked)
+
+            if not self._stopping.is_set():
+                self._renew(conn, job_id, status=COMPLETED)
+        except Exception as e:
+            print(f"任务执行失败: {job_id} - {e}")
+            self._renew(conn, job_id, status=FAILED, error=str(e))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """获取任务状态"""
+        row = self._connect().execute(
+            'SELECT id, spec, status, total, checked, error, created_at, updated_at '
+            'FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'spec': json.loads(row[1]),
+            'status': row[2],
+            'total': row[3],
+            'checked': row[4],
+            'error': row[5],
+            'created_at': row[6],
+            'updated_at': row[7]
+        }
+
+    def results(self, job_id: str, cursor: int = -1, limit: int = 100) -> Dict:
+        """从游标之后读取一页结果，WHOIS未完成的条目 whois 为 None"""
+        rows = self._connect().execute(
+            'SELECT idx, domain, sensitive_words, is_safe, whois FROM job_results '
+            'WHERE job_id = ? AND idx > ? ORDER BY idx LIMIT ?',
+            (job_id, cursor, limit)
+        ).fetchall()
+        results = [
+            {
+                'domain': domain,
+                'sensitive_words': json.loads(sensitive_words),
+                'is_safe': bool(is_safe),
+                'whois': json.loads(whois) if whois is not None else None
+            }
+            for _, domain, sensitive_words, is_safe, whois in rows
+        ]
+        return {
+            'results': results,
+            'next_cursor': rows[-1][0] if len(rows) == limit else None
+        }
+
+    def shutdown(self) -> None:
+        """当前批次完成后停止所有任务，并释放租约，未完成的任务由其他进程或下次启动时继续"""
+        self._stopping.set()
+        # 正在执行的批次写入时租约已不属于本进程，结果会被丢弃，由接管的进程重新查询
+        self._connect().execute(
+            'UPDATE jobs SET owner = NULL, lease_until = 0 WHERE owner = ? AND status IN (?, ?)',
+            (self.owner, PENDING, RUNNING)
+        )
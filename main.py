@@ -1,8 +1,28 @@
 import argparse
-from typing import List, Tuple
+import atexit
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+import itertools
+from typing import Iterator, List, Tuple
 from domain_generator import DomainGenerator
 from sensitive_word_checker import SensitiveWordChecker
-from flask import Flask, render_template, request, jsonify
+from whois_cache import SQLiteCacheStore, WhoisCache
+from redis_cache import RedisCacheStore
+from async_whois import WHOIS_SERVERS, AsyncWhoisClient
+from whois_scheduler import ServerLimit, WhoisScheduler
+from single_flight import SingleFlight
+from cache_refresher import CacheRefresher, HitCounter
+from cache_persister import CachePersister
+from job_manager import JobManager
+from dns_prescreen import DnsPrescreener, REGISTERED, registered_result
+from registered_index import RegisteredIndex, iter_zone_domains
+from whois_cache import classify_result
+from metrics import CallbackMetric, MetricsRegistry, RateLimitFilter
+import tracing
+from tracing import SamplingProfiler, Trace, TraceStore
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 import whois
 import socket
 from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
@@ -13,45 +33,345 @@ import os
 from datetime import datetime, timedelta
 
 app = Flask(__name__)
-domain_generator = DomainGenerator()
+
+# 日志配置：请求处理过程中的日志按级别输出，同一消息模板限流
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_RATE_LIMIT = int(os.environ.get('LOG_RATE_LIMIT', 10))  # 同一消息每10秒最多输出的条数，0 表示不限流
+
+logger = logging.getLogger('domain_service')
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(process)d] %(message)s'))
+_log_handler.addFilter(RateLimitFilter(burst=LOG_RATE_LIMIT, interval=10))
+logger.addHandler(_log_handler)
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+
+# 关键词变体缓存配置
+VARIATION_CACHE_SIZE = int(os.environ.get('VARIATION_CACHE_SIZE', 1024))  # 缓存的关键词变体条目数
+VARIATION_CACHE_FILE = os.environ.get('VARIATION_CACHE_FILE')  # 启动时预热的热门关键词列表（每行一个）
+
+# 品牌评分排序配置：WHOIS查询前从候选池中选出评分最高的域名
+RANK_DOMAINS = os.environ.get('RANK_DOMAINS', '1') == '1'
+RANK_POOL_SIZE = int(os.environ.get('RANK_POOL_SIZE', 5000))  # 参与评分的候选域名数
+
+domain_generator = DomainGenerator(variation_cache_size=VARIATION_CACHE_SIZE)
+if VARIATION_CACHE_FILE:
+    print(f"预热关键词变体缓存: {domain_generator.warm_variation_cache(VARIATION_CACHE_FILE)} 个关键词")
 sensitive_checker = SensitiveWordChecker()
 
 # WHOIS缓存配置
-CACHE_FILE = 'whois_cache.json'
+CACHE_FILE = os.environ.get('WHOIS_CACHE_FILE', 'whois_cache.db')
+LEGACY_CACHE_FILE = 'whois_cache.json'  # 旧版整文件JSON缓存，启动时自动迁移
 CACHE_EXPIRY = 3600 * 24  # 24小时的缓存时间
+CACHE_MAX_SIZE = int(os.environ.get('WHOIS_CACHE_MAX_SIZE', 10000))  # 内存缓存最大条目数
+CACHE_STRIPES = int(os.environ.get('WHOIS_CACHE_STRIPES', 16))  # 内存缓存的分片数（每个分片一把锁）
+
+# 各类查询结果的缓存时间（秒）
+CACHE_TTLS = {
+    'registered': CACHE_EXPIRY,
+    'unregistered': 3600,
+    'timeout': 60 * 5,
+    'failed': 60 * 10,
+}
+
+# 缓存存储后端：sqlite（同一主机上的多个进程共享文件）或 redis（多个容器/主机共享）
+CACHE_BACKEND = os.environ.get('WHOIS_CACHE_BACKEND', 'sqlite')
+CACHE_REDIS_URL = os.environ.get('WHOIS_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_MEMORY_TTL = float(os.environ.get('WHOIS_CACHE_MEMORY_TTL', 60))  # 内存缓存条目重新从共享存储读取的间隔（秒）
+CACHE_TTL_JITTER = float(os.environ.get('WHOIS_CACHE_TTL_JITTER', 0.1))  # 缓存时间的随机浮动比例，避免同时过期
+
+# 延迟写入：请求中只更新内存，后台线程批量写入存储
+CACHE_WRITE_BEHIND = os.environ.get('WHOIS_CACHE_WRITE_BEHIND', '1') == '1'
+CACHE_FLUSH_INTERVAL = float(os.environ.get('WHOIS_CACHE_FLUSH_INTERVAL', 1))  # 最长写入间隔（秒）
+CACHE_FLUSH_BATCH = int(os.environ.get('WHOIS_CACHE_FLUSH_BATCH', 500))  # 待写入条目达到该数量时立即写入
+
+def create_cache_store():
+    """根据配置创建缓存存储"""
+    if CACHE_BACKEND == 'redis':
+        store = RedisCacheStore(CACHE_REDIS_URL, expiry=int(max(CACHE_TTLS.values()) * (1 + CACHE_TTL_JITTER)))
+    else:
+        store = SQLiteCacheStore(CACHE_FILE)
+    if CACHE_WRITE_BEHIND:
+        return CachePersister(store, flush_interval=CACHE_FLUSH_INTERVAL, max_batch=CACHE_FLUSH_BATCH)
+    return store
 
 # 初始化缓存
-WHOIS_CACHE = {}
+cache_store = create_cache_store()
+cache_persister = cache_store if isinstance(cache_store, CachePersister) else None
+WHOIS_CACHE = WhoisCache(
+    cache_store,
+    max_size=CACHE_MAX_SIZE,
+    ttls=CACHE_TTLS,
+    memory_ttl=CACHE_MEMORY_TTL,
+    jitter=CACHE_TTL_JITTER,
+    stripes=CACHE_STRIPES
+)
 
 def load_cache():
-    """从文件加载WHOIS缓存"""
-    global WHOIS_CACHE
+    """初始化WHOIS缓存：迁移旧版JSON缓存并清理过期条目"""
     try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-                # 过滤掉过期的缓存
-                current_time = time.time()
-                WHOIS_CACHE = {
-                    domain: (timestamp, data)
-                    for domain, (timestamp, data) in cache_data.items()
-                    if current_time - timestamp < CACHE_EXPIRY
-                }
+        if os.path.isfile(LEGACY_CACHE_FILE):
+            imported = WHOIS_CACHE.store.import_json(LEGACY_CACHE_FILE, CACHE_EXPIRY)
+            print(f"已迁移旧版缓存: {imported} 条")
+        WHOIS_CACHE.purge_expired()
     except Exception as e:
         print(f"加载缓存失败: {e}")
-        WHOIS_CACHE = {}
 
-def save_cache():
-    """保存WHOIS缓存到文件"""
+def get_cached_whois(domain: str) -> dict:
+    """读取未过期的缓存结果，未命中时返回None"""
+    if hit_counter is not None:
+        hit_counter.record(domain)
+    try:
+        return WHOIS_CACHE.get(domain)
+    except Exception as e:
+        logger.warning("读取缓存失败: %s", e)
+        return None
+
+def save_cache(entries: dict):
+    """保存WHOIS缓存，只写入发生变化的条目（开启延迟写入时由后台线程写入存储）"""
+    start = time.time()
     try:
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(WHOIS_CACHE, f, ensure_ascii=False, indent=2)
+        WHOIS_CACHE.set_many(entries)
     except Exception as e:
-        print(f"保存缓存失败: {e}")
+        logger.error("保存缓存失败: %s", e)
+    update_registered_index(entries)
+    if entries:
+        tracing.record('save_cache', start, entries=len(entries))
 
 # 启动时加载缓存
 load_cache()
 
+# 已知已注册域名索引配置（布隆过滤器，命中的域名不再查询WHOIS）
+REGISTERED_INDEX_FILE = os.environ.get('REGISTERED_INDEX_FILE', 'registered_index.bin')  # 设为空时关闭
+REGISTERED_INDEX_CAPACITY = int(os.environ.get('REGISTERED_INDEX_CAPACITY', 1000000))  # 设计容量
+REGISTERED_INDEX_ERROR_RATE = float(os.environ.get('REGISTERED_INDEX_ERROR_RATE', 0.001))  # 目标误判率
+
+def load_registered_index():
+    """打开已注册域名索引，新建索引时从WHOIS缓存历史中导入已注册的域名"""
+    if not REGISTERED_INDEX_FILE:
+        return None
+    try:
+        index = RegisteredIndex(REGISTERED_INDEX_FILE, REGISTERED_INDEX_CAPACITY, REGISTERED_INDEX_ERROR_RATE)
+        # 多个工作进程同时启动时只由创建索引文件的进程导入
+        if index.created:
+            imported = index.add_many(
+                domain for domain, _, result in WHOIS_CACHE.store.items()
+                if classify_result(result) == 'registered'
+            )
+            print(f"已从缓存历史导入已注册域名: {imported} 个")
+        return index
+    except Exception as e:
+        print(f"加载已注册域名索引失败: {e}")
+        return None
+
+registered_index = load_registered_index()
+
+def update_registered_index(entries: dict):
+    """将WHOIS查询确认已注册的域名加入索引（DNS和索引本身的判定不加入）"""
+    if registered_index is None:
+        return
+    try:
+        for domain, (_, result) in entries.items():
+            if classify_result(result) == 'registered' and result.get('source') is None:
+                registered_index.add(domain)
+        if cache_persister is None:
+            registered_index.flush()
+    except Exception as e:
+        logger.error("更新已注册域名索引失败: %s", e)
+
+def flush_registered_index():
+    """将已注册域名索引写回磁盘（延迟写入的缓存每批写入后调用）"""
+    if registered_index is not None:
+        registered_index.flush()
+
+if cache_persister is not None:
+    cache_persister.after_flush = flush_registered_index
+
+def known_registered(domains: List[str]) -> dict:
+    """查询已注册域名索引，返回索引中已知已注册的域名及其WHOIS格式结果"""
+    if registered_index is None:
+        return {}
+    known = {}
+    for domain in domains:
+        if domain in registered_index:
+            # 已有完整WHOIS缓存时优先使用缓存
+            cached = get_cached_whois(domain)
+            if cached and cached.get('success'):
+                known[domain] = cached
+            else:
+                known[domain] = dict(registered_result(), status='已知已注册', source='index')
+    return known
+
+# WHOIS查询配置
+WHOIS_ENGINE = os.environ.get('WHOIS_ENGINE', 'async')  # async: 直连43端口的asyncio客户端；thread: python-whois线程池
+WHOIS_TIMEOUT = float(os.environ.get('WHOIS_TIMEOUT', 5))  # 单个连接的超时时间（秒）
+WHOIS_MAX_CONCURRENCY = int(os.environ.get('WHOIS_MAX_CONCURRENCY', 200))  # 同时进行的最大查询数
+
+# 以下限额为所有工作进程合计的限额，每个进程使用其中的 1/WHOIS_PROCESSES
+# （gunicorn.conf.py 自动设为工作进程数，单进程运行时为1）
+WHOIS_PROCESSES = max(1, int(os.environ.get('WHOIS_PROCESSES', 1)))
+WHOIS_SERVER_LIMIT = ServerLimit(
+    rate=float(os.environ.get('WHOIS_SERVER_RATE', 10)) / WHOIS_PROCESSES,  # 每个WHOIS服务器每秒查询数
+    burst=max(1, int(os.environ.get('WHOIS_SERVER_BURST', 20)) // WHOIS_PROCESSES),
+    max_in_flight=max(1, int(os.environ.get('WHOIS_SERVER_MAX_IN_FLIGHT', 20)) // WHOIS_PROCESSES)  # 每个WHOIS服务器的最大并发数
+)
+
+whois_client = AsyncWhoisClient(
+    timeout=WHOIS_TIMEOUT,
+    max_concurrency=WHOIS_MAX_CONCURRENCY,
+    scheduler=WhoisScheduler(default_limit=WHOIS_SERVER_LIMIT)
+)
+
+# 同一域名的并发查询共享同一个进行中的查询
+whois_flight = SingleFlight()
+
+# 热门域名后台刷新配置
+CACHE_REFRESH = os.environ.get('WHOIS_CACHE_REFRESH', '1') == '1'
+CACHE_REFRESH_INTERVAL = float(os.environ.get('WHOIS_CACHE_REFRESH_INTERVAL', 60))  # 检查间隔（秒）
+CACHE_REFRESH_AHEAD = float(os.environ.get('WHOIS_CACHE_REFRESH_AHEAD', 600))  # 剩余时间少于该值时刷新（秒）
+CACHE_REFRESH_MIN_HITS = int(os.environ.get('WHOIS_CACHE_REFRESH_MIN_HITS', 3))  # 热门域名的最少访问次数（所有工作进程合计）
+CACHE_HIT_FLUSH_INTERVAL = float(os.environ.get('WHOIS_CACHE_HIT_FLUSH_INTERVAL', 5))  # 访问次数写入共享存储的间隔（秒）
+
+# 每个工作进程都记录访问次数并累加到共享存储，刷新线程读取所有进程的合计
+hit_counter = None
+if CACHE_REFRESH:
+    hit_counter = HitCounter(cache_store, flush_interval=CACHE_HIT_FLUSH_INTERVAL)
+    hit_counter.start()
+
+cache_refresher = None
+
+def start_cache_refresher():
+    """启动后台刷新（多个工作进程中只在持有任务文件锁的进程中运行，避免重复查询同一批域名）"""
+    global cache_refresher
+    if not CACHE_REFRESH or cache_refresher is not None:
+        return
+    cache_refresher = CacheRefresher(
+        WHOIS_CACHE,
+        lookup=lambda domain: lookup_whois(domain),
+        save=lambda entries: save_cache(entries),
+        interval=CACHE_REFRESH_INTERVAL,
+        refresh_ahead=CACHE_REFRESH_AHEAD,
+        min_hits=CACHE_REFRESH_MIN_HITS
+    )
+    cache_refresher.start()
+
+# 监控指标（/metrics，Prometheus 文本格式）；设置 METRICS_DIR 后汇总所有工作进程的指标
+# （gunicorn.conf.py 自动设置），各进程每 METRICS_SYNC_INTERVAL 秒把自己的指标写入该目录
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_SYNC_INTERVAL = float(os.environ.get('METRICS_SYNC_INTERVAL', 5))
+metrics = MetricsRegistry(METRICS_DIR, sync_interval=METRICS_SYNC_INTERVAL)
+metrics.start_sync()
+STAGE_SECONDS = metrics.histogram(
+    'domain_stage_duration_seconds', '各处理阶段耗时（generation/sensitive_check/dns/whois/total）', ['stage']
+)
+WHOIS_LOOKUPS = metrics.counter('whois_lookups_total', 'WHOIS查询结果（不含缓存命中）', ['outcome', 'tld'])
+
+# 线程池查询引擎正在使用的线程池，用于统计排队的查询数
+_whois_executors = weakref.WeakSet()
+
+def whois_queue_depth() -> int:
+    """等待中的WHOIS查询数：异步客户端中等待限速或并发名额的查询，加上线程池中排队的查询"""
+    return whois_client.queue_depth() + sum(executor._work_queue.qsize() for executor in list(_whois_executors))
+
+def cache_lookup_counts() -> dict:
+    stats = WHOIS_CACHE.stats()
+    return {('memory',): stats['memory_hits'], ('store',): stats['store_hits'], ('miss',): stats['misses']}
+
+metrics.gauge('whois_cache_entries', '内存缓存条目数', lambda: WHOIS_CACHE.stats()['size'])
+metrics.register(CallbackMetric(
+    'whois_cache_hit_ratio', '缓存命中率（内存和共享存储，多进程时为各进程的平均值）',
+    lambda: WHOIS_CACHE.stats()['hit_ratio'], aggregate='mean'
+))
+metrics.register(CallbackMetric(
+    'whois_cache_lookups_total', '缓存读取次数（memory/store 命中，miss 未命中）',
+    cache_lookup_counts, ['result'], kind='counter'
+))
+metrics.gauge(
+    'whois_cache_pending_writes', '等待写入存储的缓存修改数',
+    lambda: cache_persister.pending() if cache_persister is not None else None
+)
+metrics.gauge('whois_in_flight_lookups', '进行中的WHOIS查询数（合并后）', lambda: whois_flight.in_flight())
+metrics.gauge('whois_queue_depth', '等待中的WHOIS查询数', whois_queue_depth)
+metrics.gauge(
+    'whois_server_in_flight', '各WHOIS服务器正在进行的查询数',
+    lambda: {(server,): state['in_flight'] for server, state in whois_client.scheduler.stats().items()},
+    ['server']
+)
+metrics.gauge(
+    'whois_server_rate', '各WHOIS服务器当前的查询速率（每秒）',
+    lambda: {(server,): state['rate'] for server, state in whois_client.scheduler.stats().items()},
+    ['server']
+)
+
+def whois_outcome(result: dict) -> str:
+    """WHOIS查询结果的类别，用于统计"""
+    if result.get('error') == '查询受限':
+        return 'throttled'
+    return classify_result(result)
+
+def record_whois_result(domain: str, result: dict) -> None:
+    """统计一次WHOIS查询结果，内置WHOIS服务器列表以外的后缀归为 other，避免标签数量无限增长"""
+    tld = domain.rsplit('.', 1)[-1].lower()
+    if tld not in WHOIS_SERVERS:
+        tld = 'other'
+    WHOIS_LOOKUPS.inc(whois_outcome(result), tld)
+
+# 请求追踪配置：请求带 ?trace=1 或 X-Trace: 1 请求头时在响应中返回追踪记录；
+# 设置 TRACE_SLOW_MS 后追踪所有生成请求，耗时超过阈值的保存在 /debug/traces
+TRACE_SLOW_MS = float(os.environ.get('TRACE_SLOW_MS', 0))  # 慢请求阈值（毫秒），0 表示关闭
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', 100))  # 保存的慢请求数
+# 慢请求记录文件（SQLite，所有工作进程共享），默认与任务数据库在同一目录
+TRACE_FILE = os.environ.get(
+    'TRACE_FILE', os.path.join(os.path.dirname(os.environ.get('JOBS_FILE', 'jobs.db')), 'traces.db')
+)
+TRACE_PROFILE = os.environ.get('TRACE_PROFILE', '0') == '1'  # 被追踪的请求同时进行调用栈采样
+TRACE_PROFILE_INTERVAL = float(os.environ.get('TRACE_PROFILE_INTERVAL', 5))  # 采样间隔（毫秒）
+
+slow_traces = TraceStore(TRACE_FILE, TRACE_BUFFER_SIZE) if TRACE_SLOW_MS > 0 else None
+profiler = SamplingProfiler(TRACE_PROFILE_INTERVAL / 1000) if TRACE_PROFILE else None
+
+def start_trace(name: str, params: dict):
+    """按请求参数和配置决定是否追踪当前请求，不追踪时返回None"""
+    requested = request.args.get('trace') == '1' or request.headers.get('X-Trace') == '1'
+    if not requested and TRACE_SLOW_MS <= 0:
+        return None
+    trace = Trace(
+        name, keywords=params['keywords'], tlds=params['tlds'], count=params['count'],
+        seed=params['seed'], offset=params['offset']
+    )
+    trace.requested = requested
+    return trace
+
+@contextmanager
+def traced(trace):
+    """在当前线程中激活追踪（trace 为None时不做任何事），结束后慢请求写入缓冲区"""
+    if trace is None:
+        yield
+        return
+    if profiler is not None:
+        profiler.register(trace)
+    try:
+        with tracing.activate(trace):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.unregister(trace)
+        trace.finish()
+        if slow_traces is not None and TRACE_SLOW_MS <= trace.duration * 1000:
+            try:
+                slow_traces.add(trace)
+            except Exception as e:
+                logger.warning("保存追踪记录失败: %s", e)
+            logger.info("慢请求: %s %.0fms, 追踪记录 /debug/traces/%s", trace.name, trace.duration * 1000, trace.id)
+
+# DNS预筛选配置
+DNS_PRESCREEN = os.environ.get('DNS_PRESCREEN', '0') == '1'  # 是否默认启用DNS预筛选
+DNS_NAMESERVER = os.environ.get('DNS_NAMESERVER')  # 未设置时读取 /etc/resolv.conf
+DNS_PORT = int(os.environ.get('DNS_PORT', 53))
+DNS_TIMEOUT = float(os.environ.get('DNS_TIMEOUT', 1))
+
+dns_prescreener = DnsPrescreener(nameserver=DNS_NAMESERVER, port=DNS_PORT, timeout=DNS_TIMEOUT)
+
 def retry_on_failure(max_retries=3, delay=1):
     """重试装饰器"""
     def decorator(func):
@@ -63,7 +383,9 @@ def retry_on_failure(max_retries=3, delay=1):
                 except Exception as e:
                     if attempt == max_retries - 1:  # 最后一次尝试
                         raise
+                    sleep_start = time.time()
                     time.sleep(delay)
+                    tracing.record('retry', sleep_start, function=func.__name__, attempt=attempt + 1, error=str(e))
             return None
         return wrapper
     return decorator
@@ -124,180 +446,368 @@ def get_whois_info(domain: str) -> dict:
                 'error': '查询失败'
             }
 
+def lookup_whois(domain: str) -> dict:
+    """使用配置的查询引擎获取WHOIS信息（不经过缓存，合并并发查询）"""
+    if WHOIS_ENGINE == 'async':
+        result = whois_flight.submit(domain, lambda: whois_client.submit(domain)).result()
+    else:
+        result = whois_flight.do(domain, lambda: get_whois_info(domain))
+    record_whois_result(domain, result)
+    return result
+
 def get_whois_info_cached(domain: str) -> dict:
     """带缓存的WHOIS查询"""
     current_time = time.time()
     
     # 检查缓存
-    if domain in WHOIS_CACHE:
-        cache_time, result = WHOIS_CACHE[domain]
-        if current_time - cache_time < CACHE_EXPIRY:
-            print(f"命中缓存: {domain}")
-            return result
+    result = get_cached_whois(domain)
+    if result is not None:
+        logger.debug("命中缓存: %s", domain)
+        return result
     
     # 缓存未命中，执行查询
     try:
-        result = get_whois_info(domain)
+        result = lookup_whois(domain)
         # 更新缓存
-        WHOIS_CACHE[domain] = (current_time, result)
-        # 异步保存缓存
-        save_cache()
+        save_cache({domain: (current_time, result)})
         return result
     except Exception as e:
-        print(f"WHOIS查询失败: {domain} - {e}")
-        return {
+        logger.warning("WHOIS查询失败: %s - %s", domain, e)
+        result = {
             'success': False,
             'error': '查询失败'
         }
+        record_whois_result(domain, result)
+        return result
 
-def get_whois_info_parallel(domains: List[str], max_workers: int = 5, timeout: int = 5) -> List[dict]:
-    """并行执行WHOIS查询"""
-    results = []
-    completed_domains = set()
+def iter_whois_results(domains: List[str], max_workers: int = 5, timeout: int = 5) -> Iterator[Tuple[str, dict]]:
+    """并行执行WHOIS查询，按完成顺序逐个返回 (域名, 查询结果)"""
+    trace = tracing.current()
+    remaining_domains = []
     
-    # 首先检查缓存
+    # 首先检查缓存，命中的结果立即返回
     for domain in domains:
-        if domain in WHOIS_CACHE:
-            cache_time, result = WHOIS_CACHE[domain]
-            if time.time() - cache_time < CACHE_EXPIRY:
-                results.append({
-                    'domain': domain,
-                    'whois': result
-                })
-                completed_domains.add(domain)
-                print(f"缓存命中: {domain}")
+        lookup_start = time.time()
+        result = get_cached_whois(domain)
+        if result is not None:
+            logger.debug("缓存命中: %s", domain)
+            tracing.record('whois_lookup', lookup_start, domain=domain, cache='hit')
+            yield domain, result
+        else:
+            remaining_domains.append(domain)
     
-    # 获取未缓存的域名
-    remaining_domains = [d for d in domains if d not in completed_domains]
     if not remaining_domains:
-        return results
+        return
+    
+    logger.debug("需要查询的域名数量: %d", len(remaining_domains))
+    
+    # 追踪请求时记录每个查询的详情（服务器、重试、响应大小）；合并到进行中的查询时没有详情
+    lookup_info = {domain: {} for domain in remaining_domains} if trace is not None else {}
+    submitted = time.time()
     
-    print(f"需要查询的域名数量: {len(remaining_domains)}")
+    def record_lookup(domain: str, whois_info: dict, info: dict) -> None:
+        record_whois_result(domain, whois_info)
+        if trace is not None:
+            trace.record('whois_lookup', submitted, domain=domain, cache='miss', outcome=whois_outcome(whois_info), **info)
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    executor = None
+    if WHOIS_ENGINE == 'async':
+        # 所有查询同时在事件循环中进行，max_workers 仅用于线程池引擎
         future_to_domain = {
-            executor.submit(get_whois_info, domain): domain 
+            whois_flight.submit(
+                domain, lambda domain=domain: whois_client.submit(domain, lookup_info.get(domain))
+            ): domain
             for domain in remaining_domains
         }
-        
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        _whois_executors.add(executor)
+        future_to_domain = {
+            executor.submit(
+                whois_flight.do, domain, lambda domain=domain: tracing.run_in(trace, get_whois_info, domain)
+            ): domain 
+            for domain in remaining_domains
+        }
+    
+    completed_domains = set()
+    new_entries = {}
+    try:
         try:
             for future in as_completed(future_to_domain, timeout=timeout):
                 domain = future_to_domain[future]
+                completed_domains.add(domain)
                 try:
                     whois_info = future.result(timeout=0.005)  # 将单个查询超时改为5ms
-                    # 更新缓存
-                    WHOIS_CACHE[domain] = (time.time(), whois_info)
-                    results.append({
-                        'domain': domain,
-                        'whois': whois_info
-                    })
-                    print(f"查询成功: {domain}")
+                    # 记录新结果，查询结束后统一写入缓存
+                    new_entries[domain] = (time.time(), whois_info)
+                    logger.debug("查询成功: %s", domain)
                 except TimeoutError:
-                    print(f"查询超时: {domain}")
-                    results.append({
-                        'domain': domain,
-                        'whois': {
-                            'success': False,
-                            'error': '查询超时'
-                        }
-                    })
+                    logger.warning("查询超时: %s", domain)
+                    whois_info = {
+                        'success': False,
+                        'error': '查询超时'
+                    }
                 except Exception as e:
-                    print(f"查询失败: {domain} - {str(e)}")
-                    results.append({
-                        'domain': domain,
-                        'whois': {
-                            'success': False,
-                            'error': '查询失败'
-                        }
-                    })
+                    logger.warning("查询失败: %s - %s", domain, e)
+                    whois_info = {
+                        'success': False,
+                        'error': '查询失败'
+                    }
+                info = lookup_info.get(domain, {})
+                if trace is not None and WHOIS_ENGINE == 'async' and not info:
+                    info = {'shared': True}
+                record_lookup(domain, whois_info, info)
+                yield domain, whois_info
         except TimeoutError:
-            print("整体查询超时")
+            logger.warning("整体查询超时: %d 个域名未完成", len(remaining_domains) - len(completed_domains))
             # 处理未完成的查询
             for domain in remaining_domains:
-                if domain not in [r['domain'] for r in results]:
-                    results.append({
-                        'domain': domain,
-                        'whois': {
-                            'success': False,
-                            'error': '查询超时'
-                        }
-                    })
+                if domain not in completed_domains:
+                    whois_info = {
+                        'success': False,
+                        'error': '查询超时'
+                    }
+                    record_lookup(domain, whois_info, {'unfinished': True})
+                    yield domain, whois_info
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+        # 保存缓存（只写入本次新查询的条目）
+        save_cache(new_entries)
+
+def get_whois_info_parallel(domains: List[str], max_workers: int = 5, timeout: int = 5) -> List[dict]:
+    """并行执行WHOIS查询"""
+    whois_by_domain = dict(iter_whois_results(domains, max_workers=max_workers, timeout=timeout))
     
-    # 保存缓存
+    # 确保返回结果的顺序与输入域名顺序一致
+    return [
+        {
+            'domain': domain,
+            'whois': whois_by_domain[domain]
+        }
+        for domain in domains
+        if domain in whois_by_domain
+    ]
+
+def prescreen_domains(domains: List[str], timeout: int = 5) -> dict:
+    """DNS预筛选，返回能解析（已注册）的域名及其WHOIS格式结果"""
+    if not domains:
+        return {}
     try:
-        save_cache()
+        statuses = whois_client.run(dns_prescreener.check_many(domains)).result(timeout=timeout)
     except Exception as e:
-        print(f"保存缓存失败: {str(e)}")
+        logger.warning("DNS预筛选失败: %s", e)
+        return {}
     
-    # 确保返回结果的顺序与输入域名顺序一致
-    ordered_results = []
-    for domain in domains:
-        for result in results:
-            if result['domain'] == domain:
-                ordered_results.append(result)
-                break
+    registered = {}
+    for domain, status in statuses.items():
+        if status == REGISTERED:
+            # 已有完整WHOIS缓存时优先使用缓存
+            cached = get_cached_whois(domain)
+            registered[domain] = cached if cached and cached.get('success') else registered_result()
+    return registered
+
+def generate_candidates(
+    keywords: List[str] = None,
+    length_range: Tuple[int, int] = None,
+    tlds: List[str] = None,
+    count: int = 10,
+    max_count: int = 20,
+    seed=None,
+    offset: int = 0,
+    rank: bool = None,
+    combine: bool = False,
+    rank_pool: int = None
+) -> Tuple[List[str], List[dict], float, float]:
+    """生成域名并进行敏感词检测，返回 (域名, 检测结果, 生成时间, 敏感词检测时间)
+
+    开启品牌评分时只对生成序列的前 rank_pool 个（默认 RANK_POOL_SIZE）候选域名评分，
+    候选池与 offset 无关，各页都是同一个排序结果的不同位置，不会重复返回。
+    """
+    # 验证后缀格式
+    valid_tlds = []
+    for tld in tlds:
+        tld = tld.strip()
+        if tld.startswith('.'):
+            valid_tlds.append(tld)
     
-    return ordered_results
+    if not valid_tlds:
+        raise ValueError("没有有效的域名后缀")
+        
+    # 限制生成的域名数量
+    if count > max_count:
+        count = max_count
+    
+    # 测量域名生成时间，只生成需要的数量
+    generation_start = time.time()
+    if rank is None:
+        rank = RANK_DOMAINS
+    scores = {}
+    if rank:
+        # 从固定大小的候选池中按品牌评分选出前 offset + count 个，只有这些域名进入WHOIS查询
+        pool = itertools.islice(
+            domain_generator.iter_domains(keywords, length_range, valid_tlds, seed=seed, combine=combine),
+            rank_pool or RANK_POOL_SIZE
+        )
+        scores = dict(domain_generator.rank_domains(pool, keywords, offset + count)[offset:])
+        domains = list(scores)
+    else:
+        domains = list(itertools.islice(
+            domain_generator.iter_domains(
+                keywords, length_range, valid_tlds, seed=seed, offset=offset, combine=combine
+            ), count
+        ))
+    generation_time = time.time() - generation_start
+    STAGE_SECONDS.observe(generation_time, 'generation')
+    tracing.record('generation', generation_start, domains=len(domains), rank=rank)
+    logger.debug("域名生成时间: %.2f秒, 生成域名数量: %d", generation_time, len(domains))
+    if len(domains) < count:
+        logger.info("可生成的域名不足: 请求 %d 个, 实际 %d 个", count, len(domains))
+    
+    # 测量敏感词检测时间
+    sensitive_check_start = time.time()
+    results = sensitive_checker.check_domains(domains)
+    for result in results:
+        if result['domain'] in scores:
+            result['score'] = scores[result['domain']]
+    sensitive_check_time = time.time() - sensitive_check_start
+    STAGE_SECONDS.observe(sensitive_check_time, 'sensitive_check')
+    tracing.record('sensitive_check', sensitive_check_start)
+    logger.debug("敏感词检测时间: %.2f秒", sensitive_check_time)
+    
+    return domains, results, generation_time, sensitive_check_time
+
+def build_timing_info(generation_time: float, sensitive_check_time: float, dns_time: float, whois_time: float) -> dict:
+    """生成各阶段耗时统计（毫秒）"""
+    return {
+        'generation_time': round(generation_time * 1000, 2),  # 毫秒
+        'sensitive_check_time': round(sensitive_check_time * 1000, 2),  # 毫秒
+        'dns_time': round(dns_time * 1000, 2),  # 毫秒
+        'whois_time': round(whois_time * 1000, 2),  # 毫秒
+        'total_time': round((generation_time + sensitive_check_time + dns_time + whois_time) * 1000, 2)  # 毫秒
+    }
 
 def generate_and_check_domains(
     keywords: List[str] = None,
     length_range: Tuple[int, int] = None,
     tlds: List[str] = None,
-    count: int = 10  # 默认生成10个域名
+    count: int = 10,  # 默认生成10个域名
+    dns_prescreen: bool = None,  # 是否进行DNS预筛选，默认使用 DNS_PRESCREEN
+    seed=None,  # 随机种子，指定后结果可复现
+    offset: int = 0,  # 在生成序列中的起始位置，用于分页
+    rank: bool = None,  # 是否按品牌评分排序，默认使用 RANK_DOMAINS
+    combine: bool = False  # 是否生成多关键词组合
 ) -> List[dict]:
     """生成域名并进行敏感词检测"""
     try:
-        # 验证后缀格式
-        valid_tlds = []
-        for tld in tlds:
-            tld = tld.strip()
-            if tld.startswith('.'):
-                valid_tlds.append(tld)
-        
-        if not valid_tlds:
-            raise ValueError("没有有效的域名后缀")
-            
-        # 测量域名生成时间
-        generation_start = time.time()
-        domains = domain_generator.generate_domains(keywords, length_range, valid_tlds)
-        generation_time = time.time() - generation_start
-        print(f"域名生成时间: {generation_time:.2f}秒")
-        
-        # 限制生成的域名数量
-        if count > 20:
-            count = 20
-        domains = domains[:count]
-        print(f"生成域名数量: {len(domains)}")
+        domains, results, generation_time, sensitive_check_time = generate_candidates(
+            keywords, length_range, tlds, count, seed=seed, offset=offset, rank=rank, combine=combine
+        )
         
-        # 测量敏感词检测时间
-        sensitive_check_start = time.time()
-        results = sensitive_checker.check_domains(domains)
-        sensitive_check_time = time.time() - sensitive_check_start
-        print(f"敏感词检测时间: {sensitive_check_time:.2f}秒")
+        # 测量DNS预筛选时间，能解析的域名不再进行WHOIS查询
+        if dns_prescreen is None:
+            dns_prescreen = DNS_PRESCREEN
+        dns_start = time.time()
+        dns_results = known_registered(domains)
+        if dns_prescreen:
+            dns_results.update(prescreen_domains([domain for domain in domains if domain not in dns_results]))
+        dns_time = time.time() - dns_start
+        STAGE_SECONDS.observe(dns_time, 'dns')
+        tracing.record('dns', dns_start, known=len(dns_results))
+        logger.debug("DNS预筛选时间: %.2f秒, 已知已注册域名: %d", dns_time, len(dns_results))
         
         # 测量WHOIS并行查询时间
         whois_start = time.time()
-        whois_results = get_whois_info_parallel(domains, max_workers=5, timeout=5)
+        whois_domains = [domain for domain in domains if domain not in dns_results]
+        whois_results = get_whois_info_parallel(whois_domains, max_workers=5, timeout=5)
         whois_time = time.time() - whois_start
-        print(f"WHOIS查询总时间: {whois_time:.2f}秒")
+        STAGE_SECONDS.observe(whois_time, 'whois')
+        tracing.record('whois', whois_start, domains=len(whois_domains))
+        logger.debug("WHOIS查询总时间: %.2f秒", whois_time)
         
         # 合并结果
-        for result, whois_result in zip(results, whois_results):
-            result['whois'] = whois_result['whois']
+        whois_by_domain = {r['domain']: r['whois'] for r in whois_results}
+        whois_by_domain.update(dns_results)
+        for result in results:
+            result['whois'] = whois_by_domain.get(result['domain'], {
+                'success': False,
+                'error': '查询失败'
+            })
         
         # 添加时间统计信息
-        timing_info = {
-            'generation_time': round(generation_time * 1000, 2),  # 毫秒
-            'sensitive_check_time': round(sensitive_check_time * 1000, 2),  # 毫秒
-            'whois_time': round(whois_time * 1000, 2),  # 毫秒
-            'total_time': round((generation_time + sensitive_check_time + whois_time) * 1000, 2)  # 毫秒
-        }
+        timing_info = build_timing_info(generation_time, sensitive_check_time, dns_time, whois_time)
         
         return results, timing_info
     except Exception as e:
-        print(f"生成域名时发生错误: {str(e)}")
+        logger.error("生成域名时发生错误: %s", e)
         return [], {}
 
+def parse_generate_request(data: dict, max_count: int = 20) -> Tuple[dict, str]:
+    """解析域名生成请求参数，返回 (参数, 错误信息)"""
+    # 处理 keywords，支持字符串和列表类型
+    keywords_data = data.get('keywords', '')
+    if isinstance(keywords_data, str):
+        keywords = keywords_data.split()
+    elif isinstance(keywords_data, list):
+        keywords = keywords_data
+    else:
+        keywords = []
+        
+    # 如果没有提供关键词，使用默认关键词
+    if not keywords:
+        keywords = ['web', 'app', 'site']
+        
+    min_length = int(data.get('min_length', 3))  # 修改默认最小长度为3
+    max_length = int(data.get('max_length', 63))  # 修改默认最大长度为63
+    
+    # 处理 TLDs，支持字符串和列表类型
+    tlds_data = data.get('tlds', '.com,.net')
+    if isinstance(tlds_data, str):
+        tlds = tlds_data.split(',')
+    else:
+        tlds = tlds_data
+        
+    count = int(data.get('count', 10))  # 获取生成数量，默认为10
+    dns_prescreen = data.get('dns_prescreen')  # 未提供时使用服务端默认配置
+    seed = data.get('seed')  # 随机种子，相同的种子和参数生成相同的域名序列
+    offset = int(data.get('offset', 0))  # 分页偏移量
+    rank = data.get('rank')  # 是否按品牌评分排序，未提供时使用服务端默认配置
+    combine = bool(data.get('combine', False))  # 是否生成多关键词组合
+    
+    if count > max_count:
+        return None, f'生成数量不能超过{max_count}个'
+    
+    if offset < 0:
+        return None, '偏移量不能为负数'
+    
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, (str, int))):
+        return None, '随机种子必须是字符串或整数'
+        
+    if not tlds:
+        return None, '请至少选择一个域名后缀'
+    
+    return {
+        'keywords': keywords,
+        'length_range': (min_length, max_length),
+        'tlds': tlds,
+        'count': count,
+        'dns_prescreen': dns_prescreen,
+        'seed': seed,
+        'offset': offset,
+        'rank': rank,
+        'combine': combine
+    }, None
+
+def next_page_offset(params: dict, returned: int):
+    """下一页的偏移量，本页不足 count 个或已到达品牌评分候选池末尾时说明没有更多域名"""
+    if returned < params['count']:
+        return None
+    offset = params['offset'] + returned
+    rank = RANK_DOMAINS if params['rank'] is None else params['rank']
+    if rank and offset >= RANK_POOL_SIZE:
+        return None
+    return offset
+
 @app.route('/')
 def index():
     """Web界面主页"""
@@ -307,67 +817,201 @@ def index():
 def generate():
     """处理域名生成请求"""
     try:
-        data = request.get_json()
-        
-        # 处理 keywords，支持字符串和列表类型
-        keywords_data = data.get('keywords', '')
-        if isinstance(keywords_data, str):
-            keywords = keywords_data.split()
-        elif isinstance(keywords_data, list):
-            keywords = keywords_data
-        else:
-            keywords = []
-            
-        # 如果没有提供关键词，使用默认关键词
-        if not keywords:
-            keywords = ['web', 'app', 'site']
-            
-        min_length = int(data.get('min_length', 3))  # 修改默认最小长度为3
-        max_length = int(data.get('max_length', 63))  # 修改默认最大长度为63
-        
-        # 处理 TLDs，支持字符串和列表类型
-        tlds_data = data.get('tlds', '.com,.net')
-        if isinstance(tlds_data, str):
-            tlds = tlds_data.split(',')
-        else:
-            tlds = tlds_data
-            
-        count = int(data.get('count', 10))  # 获取生成数量，默认为10
-        
-        if count > 20:
-            return jsonify({
-                'success': False,
-                'error': '生成数量不能超过20个'
-            }), 400
-            
-        if not tlds:
+        params, error = parse_generate_request(request.get_json())
+        if error:
             return jsonify({
                 'success': False,
-                'error': '请至少选择一个域名后缀'
+                'error': error
             }), 400
         
         # 测量总开始时间
         start_time = time.time()
         
-        results, timing_info = generate_and_check_domains(
-            keywords=keywords,
-            length_range=(min_length, max_length),
-            tlds=tlds,
-            count=count
-        )
+        trace = start_trace('generate', params)
+        with traced(trace):
+            results, timing_info = generate_and_check_domains(**params)
         
         # 测量总结束时间
         end_time = time.time()
+        STAGE_SECONDS.observe(end_time - start_time, 'total')
         total_time = round((end_time - start_time) * 1000, 2)  # 转换为毫秒
         
         statistics = sensitive_checker.get_statistics(results)
         
-        return jsonify({
+        response = {
             'success': True,
             'results': results,
             'statistics': statistics,
             'timing_info': timing_info,
-            'total_time': total_time
+            'total_time': total_time,
+            'next_offset': next_page_offset(params, len(results))
+        }
+        if trace is not None and trace.requested:
+            response['trace'] = trace.to_dict()
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def ndjson_line(event: dict) -> str:
+    """将事件编码为一行NDJSON"""
+    return json.dumps(event, ensure_ascii=False) + '\n'
+
+@app.route('/generate_stream', methods=['POST'])
+def generate_stream():
+    """流式处理域名生成请求（NDJSON）
+
+    先推送生成并完成敏感词检测的域名，再在每个WHOIS查询完成时推送其结果：
+    {"type": "domains", ...} -> {"type": "whois", ...} * N -> {"type": "done", ...}
+    """
+    try:
+        params, error = parse_generate_request(request.get_json())
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+    
+    def stream():
+        start_time = time.time()
+        try:
+            domains, results, generation_time, sensitive_check_time = generate_candidates(
+                params['keywords'], params['length_range'], params['tlds'], params['count'],
+                seed=params['seed'], offset=params['offset'], rank=params['rank'], combine=params['combine']
+            )
+        except Exception as e:
+            logger.error("生成域名时发生错误: %s", e)
+            yield ndjson_line({'type': 'error', 'error': str(e)})
+            return
+        
+        yield ndjson_line({
+            'type': 'domains',
+            'results': results,
+            'statistics': sensitive_checker.get_statistics(results)
+        })
+        
+        # 已注册域名索引和DNS预筛选判定为已注册的域名直接推送
+        dns_prescreen = params['dns_prescreen']
+        if dns_prescreen is None:
+            dns_prescreen = DNS_PRESCREEN
+        dns_start = time.time()
+        dns_results = known_registered(domains)
+        if dns_prescreen:
+            dns_results.update(prescreen_domains([domain for domain in domains if domain not in dns_results]))
+        dns_time = time.time() - dns_start
+        STAGE_SECONDS.observe(dns_time, 'dns')
+        tracing.record('dns', dns_start, known=len(dns_results))
+        for domain, whois_info in dns_results.items():
+            yield ndjson_line({'type': 'whois', 'domain': domain, 'whois': whois_info})
+        
+        # 每个WHOIS查询完成后立即推送
+        whois_start = time.time()
+        whois_domains = [domain for domain in domains if domain not in dns_results]
+        for domain, whois_info in iter_whois_results(whois_domains, max_workers=5, timeout=5):
+            yield ndjson_line({'type': 'whois', 'domain': domain, 'whois': whois_info})
+        whois_time = time.time() - whois_start
+        STAGE_SECONDS.observe(whois_time, 'whois')
+        tracing.record('whois', whois_start, domains=len(whois_domains))
+        STAGE_SECONDS.observe(time.time() - start_time, 'total')
+        
+        done = {
+            'type': 'done',
+            'timing_info': build_timing_info(generation_time, sensitive_check_time, dns_time, whois_time),
+            'total_time': round((time.time() - start_time) * 1000, 2),
+            'next_offset': next_page_offset(params, len(domains))
+        }
+        if trace is not None and trace.requested:
+            done['trace'] = trace.to_dict()
+        yield ndjson_line(done)
+    
+    trace = start_trace('generate_stream', params)
+    
+    def traced_stream():
+        with traced(trace):
+            yield from stream()
+    
+    return Response(stream_with_context(traced_stream()), mimetype='application/x-ndjson')
+
+def run_job_generation(spec: dict) -> List[dict]:
+    """批量任务：生成域名并进行敏感词检测"""
+    _, results, _, _ = generate_candidates(
+        spec['keywords'], tuple(spec['length_range']), spec['tlds'], spec['count'],
+        max_count=JOB_MAX_COUNT, seed=spec.get('seed'), offset=spec.get('offset', 0), rank=spec.get('rank'),
+        combine=spec.get('combine', False), rank_pool=max(RANK_POOL_SIZE, JOB_MAX_COUNT)
+    )
+    return results
+
+def run_job_whois_batch(domains: List[str]) -> dict:
+    """批量任务：查询一批域名的WHOIS信息，已注册域名索引中的域名不再查询"""
+    results = known_registered(domains)
+    whois_domains = [domain for domain in domains if domain not in results]
+    results.update(iter_whois_results(whois_domains, max_workers=5, timeout=JOB_BATCH_TIMEOUT))
+    return results
+
+# 批量检查任务配置
+JOBS_FILE = os.environ.get('JOBS_FILE', 'jobs.db')
+JOB_MAX_COUNT = int(os.environ.get('JOB_MAX_COUNT', 10000))  # 单个任务最多检查的域名数
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # 同时运行的任务数
+JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', 50))  # 每批WHOIS查询的域名数
+JOB_BATCH_TIMEOUT = int(os.environ.get('JOB_BATCH_TIMEOUT', 60))  # 每批WHOIS查询的超时时间（秒）
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))  # 任务租约时间，进程退出后其他进程在租约过期后接管
+
+job_manager = JobManager(
+    JOBS_FILE,
+    generate=run_job_generation,
+    check_whois=run_job_whois_batch,
+    max_workers=JOB_WORKERS,
+    batch_size=JOB_BATCH_SIZE,
+    lease_seconds=JOB_LEASE_SECONDS
+)
+
+def claim_job_runner() -> bool:
+    """多个工作进程中只由一个进程运行后台刷新（持有任务文件锁的进程）"""
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    global job_runner_lock
+    try:
+        job_runner_lock = open(f'{JOBS_FILE}.lock', 'w')
+        fcntl.flock(job_runner_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+# 继续租约已过期的未完成任务（每个工作进程都会定期接管已退出进程的任务）
+resumed_jobs = job_manager.resume()
+if resumed_jobs:
+    print(f"继续未完成的任务: {len(resumed_jobs)} 个")
+
+# 启动热门域名后台刷新
+job_runner_lock = None
+if claim_job_runner():
+    start_cache_refresher()
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """提交批量域名检查任务"""
+    try:
+        params, error = parse_generate_request(request.get_json(), max_count=JOB_MAX_COUNT)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        params.pop('dns_prescreen')
+        job_id = job_manager.submit(params)
+        return jsonify({
+            'success': True,
+            'job_id': job_id
         })
     except Exception as e:
         return jsonify({
@@ -375,6 +1019,88 @@ def generate():
             'error': str(e)
         }), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询批量任务状态"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在'
+        }), 404
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """分页读取批量任务结果"""
+    if job_manager.get(job_id) is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在'
+        }), 404
+    try:
+        cursor = int(request.args.get('cursor', -1))
+        limit = min(int(request.args.get('limit', 100)), 1000)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': '分页参数无效'
+        }), 400
+    page = job_manager.results(job_id, cursor=cursor, limit=limit)
+    return jsonify({
+        'success': True,
+        'results': page['results'],
+        'next_cursor': page['next_cursor']
+    })
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """WHOIS缓存统计信息"""
+    return jsonify({
+        'success': True,
+        'stats': WHOIS_CACHE.stats(),
+        'variation_cache': domain_generator.variation_cache_stats(),
+        'registered_index': registered_index.stats() if registered_index is not None else None,
+        'refresher': cache_refresher.stats() if cache_refresher is not None else None,
+        'persister': cache_persister.stats() if cache_persister is not None else None,
+        'whois_servers': whois_client.scheduler.stats(),
+        'in_flight_lookups': whois_flight.in_flight(),
+        'shared_lookups': whois_flight.shared
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 格式的监控指标"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/traces', methods=['GET'])
+def list_traces():
+    """最近的慢请求追踪记录（不含 span 明细）"""
+    return jsonify({
+        'success': True,
+        'threshold_ms': TRACE_SLOW_MS,
+        'traces': slow_traces.list() if slow_traces is not None else []
+    })
+
+@app.route('/debug/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """单个慢请求的完整追踪记录"""
+    trace = None
+    if slow_traces is not None:
+        trace = slow_traces.get(trace_id, profile_limit=request.args.get('stacks', 20, type=int))
+    if trace is None:
+        return jsonify({
+            'success': False,
+            'error': '追踪记录不存在'
+        }), 404
+    return jsonify({
+        'success': True,
+        'trace': trace
+    })
+
 @app.route('/refresh_whois', methods=['POST'])
 def refresh_whois():
     """处理单个域名的WHOIS刷新请求"""
@@ -389,16 +1115,14 @@ def refresh_whois():
             }), 400
             
         # 从缓存中移除该域名
-        if domain in WHOIS_CACHE:
-            del WHOIS_CACHE[domain]
+        WHOIS_CACHE.delete(domain)
             
         # 重新查询
-        whois_info = get_whois_info(domain)
+        whois_info = lookup_whois(domain)
         
         # 更新缓存
         if whois_info['success']:
-            WHOIS_CACHE[domain] = (time.time(), whois_info)
-            save_cache()
+            save_cache({domain: (time.time(), whois_info)})
             
         return jsonify({
             'success': True,
@@ -411,12 +1135,81 @@ def refresh_whois():
             'error': str(e)
         }), 500
 
+_shutdown_done = False
+
+def shutdown():
+    """停止后台任务和WHOIS客户端，并将缓存和索引写回磁盘（可重复调用）"""
+    global _shutdown_done
+    if _shutdown_done:
+        return
+    _shutdown_done = True
+    job_manager.shutdown()
+    try:
+        metrics.stop_sync()
+    except Exception as e:
+        print(f"写入指标失败: {e}")
+    if cache_refresher is not None:
+        cache_refresher.stop()
+    if hit_counter is not None:
+        try:
+            hit_counter.stop()
+        except Exception as e:
+            print(f"写入访问次数失败: {e}")
+    whois_client.stop()
+    try:
+        # 延迟写入时先写入待写入的缓存
+        WHOIS_CACHE.store.close()
+        if registered_index is not None:
+            registered_index.flush()
+    except Exception as e:
+        print(f"关闭缓存失败: {e}")
+
+atexit.register(shutdown)
+
+def preload_cache(path: str, concurrency: int = 20) -> int:
+    """从域名列表预热WHOIS缓存，已有未过期缓存的域名跳过，返回查询的数量"""
+    slots = threading.Semaphore(concurrency)
+    queried = 0
+    start_time = time.time()
+
+    def run(domain):
+        try:
+            get_whois_info_cached(domain)
+        finally:
+            slots.release()
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for domain in iter_zone_domains(f):
+            if WHOIS_CACHE.get(domain) is not None:
+                continue
+            # 同时最多 concurrency 个查询，避免一次性提交整个列表
+            slots.acquire()
+            executor.submit(run, domain)
+            queried += 1
+            if queried % 100 == 0:
+                print(f"已预热: {queried} 个域名, 耗时 {time.time() - start_time:.1f}秒")
+    return queried
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Domain Generator Service')
     parser.add_argument('--web', action='store_true', help='Run web server')
+    parser.add_argument('--load-registered', metavar='FILE', help='Load a zone file or domain list into the registered index')
+    parser.add_argument('--preload', metavar='FILE', help='Preload the WHOIS cache from a domain list')
+    parser.add_argument('--preload-concurrency', type=int, default=20, help='Concurrent lookups while preloading')
     args = parser.parse_args()
 
+    if args.preload:
+        print(f"预热完成: 查询了 {preload_cache(args.preload, args.preload_concurrency)} 个域名")
+
+    if args.load_registered:
+        if registered_index is None:
+            print("已注册域名索引未启用，请设置 REGISTERED_INDEX_FILE")
+        else:
+            added = registered_index.load_zone_file(args.load_registered)
+            print(f"已导入已注册域名: {added} 个, 当前误判率估计: {registered_index.false_positive_rate():.4%}")
+
     if args.web:
         app.run(host='0.0.0.0', port=8888)
-    else:
+    elif not (args.load_registered or args.preload):
         print("Please use --web flag to run web server") 
\ No newline at end of file
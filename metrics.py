@@ -0,0 +1,387 @@
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 默认的耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class _Metric:
+    """指标基类：名称、说明和标签名
+
+    collect() 读取当前进程的值（{标签值元组: 值}），format() 将值转换为文本格式；
+    多进程汇总时用 merge() 合并各进程的值。cumulative 为 True 的指标（计数器、分桶统计）
+    保留已退出进程的值，其余指标只合并仍在运行的进程。
+    """
+    kind = 'untyped'
+    cumulative = True
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, label_values: Sequence[str]) -> Tuple[str, ...]:
+        if len(label_values) != len(self.labels):
+            raise ValueError(f'{self.name} 需要标签 {self.labels}')
+        return tuple(str(value) for value in label_values)
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def collect(self) -> Dict[Tuple[str, ...], object]:
+        raise NotImplementedError
+
+    def merge(self, values: Iterable[Dict[Tuple[str, ...], object]]) -> Dict[Tuple[str, ...], object]:
+        """合并多个进程的值（按标签求和）"""
+        merged = {}
+        for process_values in values:
+            for key, value in process_values.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def format(self, values: Dict[Tuple[str, ...], object]) -> List[str]:
+        return [
+            f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}'
+            for key, value in sorted(values.items())
+        ]
+
+    def samples(self) -> List[str]:
+        return self.format(self.collect())
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        key = self._key(label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(label_values), 0)
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram(_Metric):
+    """分桶统计（如耗时分布），输出累计分桶、总和与次数"""
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各分桶计数..., 超出最大分桶的计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        key = self._key(label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *label_values: str):
+        """统计代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            counts = self._values.get(self._key(label_values))
+            return int(sum(counts[:-1])) if counts else 0
+
+    def collect(self) -> Dict[Tuple[str, ...], List[float]]:
+        with self._lock:
+            return {key: list(counts) for key, counts in self._values.items()}
+
+    def merge(self, values: Iterable[Dict[Tuple[str, ...], List[float]]]) -> Dict[Tuple[str, ...], List[float]]:
+        """合并多个进程的分桶计数和总和"""
+        merged = {}
+        for process_values in values:
+            for key, counts in process_values.items():
+                if key in merged:
+                    merged[key] = [a + b for a, b in zip(merged[key], counts)]
+                else:
+                    merged[key] = list(counts)
+        return merged
+
+    def format(self, values: Dict[Tuple[str, ...], List[float]]) -> List[str]:
+        lines = []
+        label_names = self.labels + ('le',)
+        for key, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts[:-1]):
+                cumulative += count
+                labels = _format_labels(label_names, key + (_format_value(bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(counts[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """输出时调用函数读取当前值的指标（如缓存大小、队列长度）
+
+    函数返回单个数值，或 {标签值元组: 数值} 的字典。多进程汇总时 kind 为 counter 的指标
+    与计数器相同；gauge 按 aggregate 合并仍在运行的进程的值：sum（默认，如队列长度）或
+    mean（如命中率）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        read: Callable[[], object],
+        labels: Sequence[str] = (),
+        kind: str = 'gauge',
+        aggregate: str = 'sum'
+    ):
+        super().__init__(name, documentation, labels)
+        self.read = read
+        self.kind = kind
+        self.cumulative = kind == 'counter'
+        self.aggregate = aggregate
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        value = self.read()
+        if value is None:
+            return {}
+        if not isinstance(value, dict):
+            value = {(): value}
+        return {tuple(str(label) for label in key): sample for key, sample in value.items()}
+
+    def merge(self, values: Iterable[Dict[Tuple[str, ...], float]]) -> Dict[Tuple[str, ...], float]:
+        values = list(values)
+        merged = super().merge(values)
+        if self.aggregate == 'mean':
+            for key in merged:
+                merged[key] /= sum(1 for process_values in values if key in process_values)
+        return merged
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """指标注册表，按 Prometheus 文本格式输出全部指标
+
+    设置 shared_dir 后用于多进程部署（如 gunicorn 的多个工作进程）：每个进程每隔
+    sync_interval 秒把自己的指标值写入目录中的 metrics_<pid>.json，输出时合并目录中
+    所有进程的值，无论抓取请求由哪个进程处理，结果都是整个服务的汇总。
+    计数器和分桶统计包含已退出进程最后写入的值（重启工作进程后不会回退），
+    gauge 只合并仍在运行的进程。其他进程的值最多延迟 sync_interval 秒。
+    """
+
+    def __init__(self, shared_dir: Optional[str] = None, sync_interval: float = 5.0, process_id: int = None):
+        self._metrics: List[_Metric] = []
+        self.shared_dir = shared_dir
+        self.sync_interval = sync_interval
+        self.process_id = process_id or os.getpid()
+        self._sync_thread = None
+        self._stopping = threading.Event()
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        read: Callable[[], object],
+        labels: Sequence[str] = ()
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, read, labels))
+
+    def _path(self, process_id: int) -> str:
+        return os.path.join(self.shared_dir, f'metrics_{process_id}.json')
+
+    def _collect(self) -> Tuple[Dict[str, dict], List[str]]:
+        """读取当前进程的全部指标值，返回 ({指标名: 值}, 读取失败的说明)"""
+        values, errors = {}, []
+        for metric in self._metrics:
+            try:
+                values[metric.name] = metric.collect()
+            except Exception as e:
+                errors.append(f'# {metric.name} 读取失败: {_escape(e)}')
+        return values, errors
+
+    def write_snapshot(self, values: Dict[str, dict] = None) -> None:
+        """把当前进程的指标值写入共享目录（先写临时文件再替换，读取方不会读到写了一半的文件）"""
+        if not self.shared_dir:
+            return
+        if values is None:
+            values, _ = self._collect()
+        data = {
+            'pid': self.process_id,
+            'metrics': {name: [[list(key), value] for key, value in metric_values.items()]
+                        for name, metric_values in values.items()}
+        }
+        path = self._path(self.process_id)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    def _read_snapshots(self) -> List[Tuple[bool, Dict[str, dict]]]:
+        """读取其他进程写入的指标值，返回 [(进程是否仍在运行, {指标名: 值})]"""
+        snapshots = []
+        for path in glob.glob(os.path.join(self.shared_dir, 'metrics_*.json')):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data['pid'] == self.process_id:
+                continue
+            values = {
+                name: {tuple(key): value for key, value in entries}
+                for name, entries in data['metrics'].items()
+            }
+            snapshots.append((_process_alive(data['pid']), values))
+        return snapshots
+
+    def start_sync(self) -> None:
+        """启动定期写入指标值的后台线程（未设置 shared_dir 时不做任何事）"""
+        if not self.shared_dir or self._sync_thread is not None:
+            return
+        os.makedirs(self.shared_dir, exist_ok=True)
+        self._sync_thread = threading.Thread(target=self._run_sync, name='metrics-sync', daemon=True)
+        self._sync_thread.start()
+
+    def _run_sync(self) -> None:
+        while not self._stopping.wait(self.sync_interval):
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logging.getLogger('domain_service.metrics').warning("写入指标失败: %s", e)
+
+    def stop_sync(self) -> None:
+        """停止后台线程并写入最后一次指标值，进程退出后计数器的值仍会被汇总"""
+        self._stopping.set()
+        self.write_snapshot()
+
+    def render(self) -> str:
+        """生成 Prometheus 文本格式（text/plain; version=0.0.4），设置 shared_dir 时汇总所有进程"""
+        values, lines = self._collect()
+        snapshots = []
+        if self.shared_dir:
+            self.write_snapshot(values)
+            snapshots = self._read_snapshots()
+        for metric in self._metrics:
+            if metric.name not in values:
+                continue
+            if snapshots:
+                metric_values = metric.merge([values[metric.name]] + [
+                    snapshot[metric.name] for alive, snapshot in snapshots
+                    if metric.name in snapshot and (alive or metric.cumulative)
+                ])
+            else:
+                metric_values = values[metric.name]
+            lines.extend(metric.header())
+            lines.extend(metric.format(metric_values))
+        return '\n'.join(lines) + '\n'
+
+
+class RateLimitFilter(logging.Filter):
+    """日志限流：同一条消息模板在 interval 秒内最多输出 burst 条
+
+    超出的日志被丢弃，下一个时间窗口输出第一条时附带被丢弃的数量，
+    高负载下逐个域名的日志不会占满输出。
+    """
+
+    def __init__(self, burst: int = 10, interval: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, int], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+        key = (str(record.msg), record.levelno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if len(self._windows) > 1000:
+                    # 只保留仍在当前窗口内的消息模板
+                    self._windows = {k: w for k, w in self._windows.items() if now - w[0] < self.interval}
+                if suppressed:
+                    record.msg = f'{record.msg}（之前 {self.interval:g} 秒内省略了 {int(suppressed)} 条）'
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
@@ -0,0 +1,243 @@
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+
+class RedisError(Exception):
+    """Redis服务器返回的错误"""
+
+
+class RedisClient:
+    """最小化的Redis客户端（RESP2协议）
+
+    只实现缓存需要的命令，不依赖第三方库；任何兼容Redis协议的服务器
+    （Redis、KeyDB、本地测试用的替身服务器等）都可以使用。
+    每个线程使用独立的连接，连接断开后下次调用时自动重连。
+    """
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = (sock, sock.makefile('rb'))
+            setup = []
+            if self.password:
+                setup.append(('AUTH', self.password))
+            if self.db:
+                setup.append(('SELECT', self.db))
+            try:
+                # 认证或选择数据库失败时不保留连接，避免后续命令在错误的连接上执行
+                for reply in self._call(conn, setup):
+                    if isinstance(reply, RedisError):
+                        raise reply
+            except Exception:
+                conn[1].close()
+                sock.close()
+                raise
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+            self._local.conn = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Redis连接已断开')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode('utf-8')
+        if kind == b'-':
+            return RedisError(body.decode('utf-8'))
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(body)
+            if length < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(length)]
+        raise ConnectionError(f'无法解析的Redis响应: {line!r}')
+
+    def _call(self, conn, commands: List[tuple]) -> list:
+        """发送一批命令（管道）并读取全部响应"""
+        sock, reader = conn
+        sock.sendall(b''.join(self._encode(command) for command in commands))
+        return [self._read_reply(reader) for _ in commands]
+
+    def pipeline(self, commands: List[tuple]) -> list:
+        """以管道方式执行多条命令，连接出错时关闭连接并抛出异常"""
+        try:
+            replies = self._call(self._connection(), commands)
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+            # EXEC 的响应数组中包含事务内各命令的结果，其中的错误同样需要抛出
+            if isinstance(reply, list):
+                for item in reply:
+                    if isinstance(item, RedisError):
+                        raise item
+        return replies
+
+    def execute(self, *args):
+        """执行单条命令"""
+        return self.pipeline([args])[0]
+
+
+class RedisCacheStore:
+    """基于Redis的WHOIS缓存持久化存储，接口与 SQLiteCacheStore 相同
+
+    多个进程、多个容器共享同一个Redis时，所有实例看到同一份缓存。
+    每个域名一个键，值为 [时间戳, 查询结果] 的JSON；过期由Redis自动处理
+    （键的过期时间为最长缓存时间），批量写入使用 MULTI/EXEC 原子提交。
+    域名的访问次数保存在有序集合 hits_key 中（不以 prefix 开头，遍历缓存时不会读到）。
+    """
+
+    def __init__(self, url: str, expiry: int = 3600 * 24, prefix: str = 'whois:', timeout: float = 5.0):
+        self.client = RedisClient(url, timeout=timeout)
+        self.expiry = expiry
+        self.prefix = prefix
+        self.hits_key = prefix.rstrip(':') + '_hits'
+
+    def _key(self, domain: str) -> str:
+        return self.prefix + domain
+
+    def _ttl_ms(self, timestamp: float) -> int:
+        """键的剩余有效时间（毫秒），至少1毫秒"""
+        return max(1, int((timestamp + self.expiry - time.time()) * 1000))
+
+    def get(self, domain: str) -> Optional[Tuple[float, dict]]:
+        """读取单个域名的缓存，返回 (时间戳, 查询结果)"""
+        value = self.client.execute('GET', self._key(domain))
+        if value is None:
+            return None
+        timestamp, result = json.loads(value)
+        return timestamp, result
+
+    def set(self, domain: str, result: dict, timestamp: float = None) -> None:
+        """写入单个域名的缓存"""
+        self.set_many({domain: (timestamp or time.time(), result)})
+
+    def set_many(self, entries: Dict[str, Tuple[float, dict]], deletes: Iterable[str] = ()) -> None:
+        """在一个事务中批量写入缓存，并删除 deletes 中的域名"""
+        deletes = [self._key(domain) for domain in deletes]
+        if not entries and not deletes:
+            return
+        commands = [('MULTI',)]
+        for domain, (timestamp, result) in entries.items():
+            value = json.dumps([timestamp, result], ensure_ascii=False)
+            commands.append(('SET', self._key(domain), value, 'PX', self._ttl_ms(timestamp)))
+        if deletes:
+            commands.append(('DEL', *deletes))
+        commands.append(('EXEC',))
+        self.client.pipeline(commands)
+
+    def delete(self, domain: str) -> None:
+        """删除单个域名的缓存"""
+        self.client.execute('DEL', self._key(domain))
+
+    def purge_expired(self, expiry: int) -> int:
+        """过期的键由Redis自动删除，无需清理"""
+        return 0
+
+    def _scan_keys(self) -> Iterable[bytes]:
+        cursor = b'0'
+        while True:
+            cursor, keys = self.client.execute('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 1000)
+            yield from keys
+            if cursor == b'0':
+                break
+
+    def items(self) -> Iterable[Tuple[str, float, dict]]:
+        """遍历所有缓存条目"""
+        prefix_length = len(self.prefix)
+        for key in self._scan_keys():
+            value = self.client.execute('GET', key)
+            if value is not None:
+                timestamp, result = json.loads(value)
+                yield key.decode('utf-8')[prefix_length:], timestamp, result
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._scan_keys())
+
+    def add_hits(self, counts: Dict[str, int]) -> None:
+        """累加域名的访问次数"""
+        if counts:
+            self.client.pipeline([('ZINCRBY', self.hits_key, count, domain) for domain, count in counts.items()])
+
+    def hot_domains(self, min_hits: float) -> List[str]:
+        """访问次数达到 min_hits 的域名，按访问次数从高到低排列"""
+        domains = self.client.execute('ZREVRANGEBYSCORE', self.hits_key, '+inf', min_hits)
+        return [domain.decode('utf-8') for domain in domains]
+
+    def decay_hits(self, max_tracked: int) -> int:
+        """访问次数减半，只保留计数最高的 max_tracked 个域名，返回保留的域名数"""
+        replies = self.client.pipeline([
+            ('MULTI',),
+            ('ZREMRANGEBYSCORE', self.hits_key, '-inf', '(0.5'),
+            ('ZUNIONSTORE', self.hits_key, 1, self.hits_key, 'WEIGHTS', 0.5),
+            ('ZREMRANGEBYRANK', self.hits_key, 0, -(max_tracked + 1)),
+            ('ZCARD', self.hits_key),
+            ('EXEC',)
+        ])
+        return replies[-1][-1]
+
+    def import_json(self, json_path: str, expiry: int) -> int:
+        """从旧版JSON缓存文件导入未过期的条目（Redis中已有的条目不覆盖）"""
+        with open(json_path, 'r', encoding='utf-8') as f:
+            cache_data = json.load(f)
+
+        current_time = time.time()
+        commands = [
+            ('SET', self._key(domain), json.dumps([timestamp, data], ensure_ascii=False),
+             'PX', self._ttl_ms(timestamp), 'NX')
+            for domain, (timestamp, data) in cache_data.items()
+            if current_time - timestamp < expiry
+        ]
+        if commands:
+            self.client.pipeline(commands)
+
+        try:
+            os.replace(json_path, json_path + '.migrated')
+        except OSError:
+            pass
+        return len(commands)
+
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        self.client.close()
@@ -0,0 +1,209 @@
+import hashlib
+import itertools
+import math
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows：只有进程内的锁
+    fcntl = None
+
+# 文件头：魔数、版本、位数组长度（位）、哈希函数个数、设计容量、已添加数量
+_MAGIC = b'RIDX'
+_HEADER = struct.Struct('>4sIQIQQ')
+_VERSION = 1
+
+
+def optimal_parameters(capacity: int, error_rate: float):
+    """根据设计容量和目标误判率计算位数组长度 m 和哈希函数个数 k
+
+    m = -n * ln(p) / (ln 2)^2，k = m / n * ln 2。
+    例如 1000 万个域名、误判率 0.1% 约需 18 MB、10 个哈希函数。
+    """
+    capacity = max(1, capacity)
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def normalize_domain(domain: str) -> str:
+    """统一域名格式：小写、去掉末尾的点"""
+    return domain.strip().rstrip('.').lower()
+
+
+def iter_zone_domains(lines: Iterable[str]) -> Iterator[str]:
+    """从区域文件或域名列表中提取域名
+
+    支持每行一个域名的列表，以及区域文件格式（取每条记录的第一列，
+    相对名称按 $ORIGIN 补全）。以 ; 或 # 开头的行、空行和缩进的续行会被忽略；
+    同一个域名的连续多条记录只返回一次。
+    """
+    origin = ''
+    previous = None
+    for line in lines:
+        if not line.strip() or line[0] in ' \t;#':
+            continue
+        fields = line.split()
+        if fields[0].upper() == '$ORIGIN' and len(fields) > 1:
+            origin = normalize_domain(fields[1])
+            continue
+        if fields[0].startswith('$') or fields[0] == '@':
+            continue
+        name = fields[0]
+        if name.endswith('.') or not origin:
+            domain = normalize_domain(name)
+        else:
+            domain = f'{name.lower()}.{origin}'
+        if '.' in domain and domain != previous:
+            previous = domain
+            yield domain
+
+
+class RegisteredIndex:
+    """已知已注册域名的布隆过滤器（内存映射文件）
+
+    用于在WHOIS查询前快速排除已知已注册的域名。布隆过滤器不会漏判：
+    添加过的域名一定返回 True；未添加的域名以约 error_rate 的概率被误判为已注册
+    （添加数量超过设计容量后误判率会升高，可用 false_positive_rate() 查看当前估计值）。
+
+    位数组保存在文件中并通过 mmap 映射，多个进程可以共享同一个文件；
+    add() 直接修改映射的内存，支持增量更新，flush() 后写入磁盘。
+    修改时持有索引文件的文件锁（flock），多个进程同时添加不会丢失彼此写入的位。
+
+    多个进程同时打开不存在的索引文件时只有一个进程创建文件（created 为 True），
+    其余进程映射同一个文件。
+    """
+
+    def __init__(self, path: str, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.path = path
+        self._lock = threading.Lock()
+        self.created = not os.path.exists(path) and self._create(path, capacity, error_rate)
+        self._file = open(path, 'r+b')
+        if os.fstat(self._file.fileno()).st_size < _HEADER.size:
+            self._file.close()
+            raise ValueError(f'无效的索引文件: {path}')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, self.bits, self.hashes, self.capacity, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f'无效的索引文件: {path}')
+
+    @staticmethod
+    def _create(path: str, capacity: int, error_rate: float) -> bool:
+        """创建空的索引文件，返回是否由当前进程创建
+
+        先写完整的临时文件，再用硬链接发布到目标路径：目标已存在时链接失败
+        （其他进程先创建了），不会替换其他进程已经映射的文件。
+        """
+        bits, hashes = optimal_parameters(capacity, error_rate)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, bits, hashes, capacity, 0))
+                f.truncate(_HEADER.size + (bits + 7) // 8)
+            os.link(temp_path, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    @contextmanager
+    def _locked(self):
+        """修改位数组时持有线程锁和文件锁（跨进程）"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _positions(self, domain: str) -> Iterator[int]:
+        """计算域名在位数组中的 k 个位置（双重哈希）"""
+        digest = hashlib.blake2b(normalize_domain(domain).encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('>QQ', digest)
+        h2 |= 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    @property
+    def count(self) -> int:
+        """已添加的域名数（误判为已存在的域名不计入，为近似值）"""
+        return _HEADER.unpack_from(self._map, 0)[5]
+
+    def __contains__(self, domain: str) -> bool:
+        data = self._map
+        for position in self._positions(domain):
+            if not data[_HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def _add(self, domain: str) -> bool:
+        """添加域名，调用方需持有锁"""
+        added = False
+        data = self._map
+        for position in self._positions(domain):
+            offset = _HEADER.size + (position >> 3)
+            mask = 1 << (position & 7)
+            if not data[offset] & mask:
+                data[offset] |= mask
+                added = True
+        if added:
+            header = list(_HEADER.unpack_from(data, 0))
+            header[5] += 1
+            _HEADER.pack_into(data, 0, *header)
+        return added
+
+    def add(self, domain: str) -> bool:
+        """添加域名，返回是否为新域名（已存在或误判为已存在时返回 False）"""
+        with self._locked():
+            return self._add(domain)
+
+    def add_many(self, domains: Iterable[str], batch_size: int = 10000) -> int:
+        """批量添加域名，返回新添加的数量（每 batch_size 个域名获取一次锁）"""
+        added = 0
+        domains = iter(domains)
+        while True:
+            batch = list(itertools.islice(domains, batch_size))
+            if not batch:
+                break
+            with self._locked():
+                added += sum(1 for domain in batch if self._add(domain))
+        self.flush()
+        return added
+
+    def load_zone_file(self, path: str) -> int:
+        """从区域文件或域名列表导入域名，返回新添加的数量"""
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return self.add_many(iter_zone_domains(f))
+
+    def false_positive_rate(self) -> float:
+        """按当前添加数量估计的误判率：(1 - e^(-kn/m))^k"""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def stats(self) -> dict:
+        """索引统计信息"""
+        return {
+            'count': self.count,
+            'capacity': self.capacity,
+            'size_bytes': len(self._map),
+            'hashes': self.hashes,
+            'false_positive_rate': round(self.false_positive_rate(), 6)
+        }
+
+    def flush(self) -> None:
+        """将修改写入磁盘"""
+        self._map.flush()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
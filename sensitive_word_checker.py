@@ -1,4 +1,92 @@
-from typing import List, Dict, Set
+import itertools
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Optional, Set, Tuple
+
+class AhoCorasick:
+    """Aho–Corasick 多模式匹配自动机
+
+    新模式直接插入字典树，失败指针在下一次匹配前统一重建；
+    重建生成新的只读快照，匹配过程无需加锁。
+    """
+
+    def __init__(self):
+        self.patterns: List[str] = []
+        self._pattern_ids: Dict[str, int] = {}
+        # 字典树：每个状态的转移表，以及在该状态结束的模式编号
+        self._trie: List[Dict[str, int]] = [{}]
+        self._terminal: List[int] = [-1]
+        self._automaton: Tuple[List[Dict[str, int]], List[int], List[Tuple[int, ...]]] = ([{}], [0], [()])
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def add(self, pattern: str) -> int:
+        """添加模式，返回模式编号（重复添加返回已有编号）"""
+        with self._lock:
+            if pattern in self._pattern_ids:
+                return self._pattern_ids[pattern]
+            pattern_id = len(self.patterns)
+            self.patterns.append(pattern)
+            self._pattern_ids[pattern] = pattern_id
+
+            state = 0
+            for char in pattern:
+                next_state = self._trie[state].get(char)
+                if next_state is None:
+                    next_state = len(self._trie)
+                    self._trie.append({})
+                    self._terminal.append(-1)
+                    self._trie[state][char] = next_state
+                state = next_state
+            self._terminal[state] = pattern_id
+            self._dirty = True
+            return pattern_id
+
+    def _build(self) -> None:
+        """按广度优先顺序计算失败指针和输出集合，生成新的自动机快照"""
+        goto = [dict(transitions) for transitions in self._trie]
+        fail = [0] * len(goto)
+        output: List[Tuple[int, ...]] = [()] * len(goto)
+        if self._terminal[0] >= 0:
+            output[0] = (self._terminal[0],)
+
+        queue = deque()
+        for state in goto[0].values():
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            own = (self._terminal[state],) if self._terminal[state] >= 0 else ()
+            output[state] = own + output[fail[state]]
+            for char, next_state in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                queue.append(next_state)
+
+        self._automaton = (goto, fail, output)
+        self._dirty = False
+
+    def search(self, text: str) -> Set[int]:
+        """一次扫描文本，返回出现过的所有模式编号"""
+        if self._dirty:
+            with self._lock:
+                if self._dirty:
+                    self._build()
+        goto, fail, output = self._automaton
+
+        found = set(output[0])
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
 
 class SensitiveWordChecker:
     def __init__(self):
@@ -22,24 +110,65 @@ class SensitiveWordChecker:
             }
         }
 
+        self._reset_matcher()
+        for category, words in self.sensitive_words.items():
+            self._register_words(category, words)
+
+    def _reset_matcher(self) -> None:
+        """初始化敏感词自动机"""
+        # 模式为小写敏感词，每个模式对应若干 (分类序号, 敏感词编号)
+        self._matcher = AhoCorasick()
+        self._pattern_entries: Dict[int, List[Tuple[int, int]]] = {}
+        # 敏感词编号 -> (分类, 敏感词)
+        self.word_table: List[Tuple[str, str]] = []
+        self._word_ids: Dict[Tuple[str, str], int] = {}
+        self._category_order: Dict[str, int] = {}
+
+    @classmethod
+    def from_word_table(cls, word_table: List[Tuple[str, str]]) -> 'SensitiveWordChecker':
+        """按相同的敏感词编号重建检测器（用于子进程）"""
+        checker = cls()
+        checker.sensitive_words = {}
+        checker._reset_matcher()
+        for category, word in word_table:
+            checker.load_sensitive_words(category, [word])
+        return checker
+
+    def _register_words(self, category: str, words) -> None:
+        """把敏感词加入自动机，保留分类信息"""
+        category_index = self._category_order.setdefault(category, len(self._category_order))
+        for word in words:
+            if (category, word) in self._word_ids:
+                continue
+            word_id = len(self.word_table)
+            self.word_table.append((category, word))
+            self._word_ids[(category, word)] = word_id
+            pattern_id = self._matcher.add(word.lower())
+            self._pattern_entries.setdefault(pattern_id, []).append((category_index, word_id))
+
     def load_sensitive_words(self, category: str, words: List[str]) -> None:
         """加载自定义敏感词"""
         if category not in self.sensitive_words:
             self.sensitive_words[category] = set()
         self.sensitive_words[category].update(words)
+        self._register_words(category, words)
+
+    def match_word_ids(self, domain: str) -> List[int]:
+        """一次扫描找出域名中的所有敏感词编号，按分类顺序、再按加载顺序排列"""
+        entries = []
+        for pattern_id in self._matcher.search(domain.lower()):
+            entries.extend(self._pattern_entries[pattern_id])
+        entries.sort()
+        return [word_id for _, word_id in entries]
+
+    def match_categories(self, domain: str) -> List[Tuple[str, str]]:
+        """一次扫描找出域名中的所有敏感词，返回 (分类, 敏感词) 列表"""
+        return [self.word_table[word_id] for word_id in self.match_word_ids(domain)]
 
     def exact_match(self, domain: str) -> List[str]:
         """精确匹配检测"""
-        found_words = []
-        domain = domain.lower()
-        
-        # 检查所有分类中的敏感词
-        for category, words in self.sensitive_words.items():
-            for word in words:
-                if word.lower() in domain:
-                    found_words.append(word)
-        
-        return found_words
+        # 同一个敏感词属于多个分类时会出现多次，与逐个分类检查的结果一致
+        return [word for _, word in self.match_categories(domain)]
 
     def check_domain(self, domain: str) -> Dict:
         """检查单个域名"""
@@ -63,6 +192,39 @@ class SensitiveWordChecker:
             results.append(result)
         return results
 
+    def screen_domains(
+        self,
+        domains: Iterable[str],
+        chunk_size: int = 10000,
+        processes: int = 0
+    ) -> 'BulkScreenResult':
+        """大批量域名检测
+
+        按块处理列表或迭代器中的域名，可选使用多进程（同时在处理中的块不超过
+        2 * processes 个，迭代器不会被一次性读完）；结果以位图和命中下标的
+        紧凑形式保存，统计信息在同一次遍历中得出。
+        """
+        result = BulkScreenResult(self.word_table)
+        chunks = _iter_chunks(domains, chunk_size)
+        if processes and processes > 1:
+            with ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_screen_worker,
+                initargs=(list(self.word_table),)
+            ) as executor:
+                # 同时最多提交 2 * processes 个块，迭代器中的域名按需读取，按提交顺序合并结果
+                pending = deque()
+                for chunk in chunks:
+                    if len(pending) >= processes * 2:
+                        result.extend(*pending.popleft().result())
+                    pending.append(executor.submit(_screen_chunk, chunk))
+                while pending:
+                    result.extend(*pending.popleft().result())
+        else:
+            for chunk in chunks:
+                result.extend(*_screen_names(self, chunk))
+        return result
+
     def get_statistics(self, results: List[Dict]) -> Dict:
         """获取检测结果统计信息"""
         total_domains = len(results)
@@ -80,4 +242,105 @@ class SensitiveWordChecker:
             'safe_domains': safe_domains,
             'unsafe_domains': unsafe_domains,
             'word_frequency': word_frequency
-        } 
\ No newline at end of file
+        } 
+
+
+class BulkScreenResult:
+    """批量检测结果
+
+    flags 为不安全域名的位图（第 i 位对应第 i 个域名），
+    hit_offsets / hit_words 以CSR方式保存每个域名命中的敏感词编号。
+    """
+
+    def __init__(self, word_table: List[Tuple[str, str]]):
+        self.word_table = list(word_table)
+        self.count = 0
+        self.flags = bytearray()
+        self.hit_offsets = array('I', [0])
+        self.hit_words = array('I')
+        self._word_counts: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def extend(self, domain_count: int, hits: List[Tuple[int, Tuple[int, ...]]]) -> None:
+        """追加一块检测结果，hits 为该块内不安全域名的 (块内下标, 敏感词编号)"""
+        base = self.count
+        self.count += domain_count
+        self.flags.extend(b'\x00' * ((self.count + 7) // 8 - len(self.flags)))
+
+        next_local = 0
+        for local_index, word_ids in hits:
+            # 中间的安全域名没有命中
+            self.hit_offsets.extend([len(self.hit_words)] * (local_index - next_local))
+            index = base + local_index
+            self.flags[index >> 3] |= 1 << (index & 7)
+            self.hit_words.extend(word_ids)
+            self.hit_offsets.append(len(self.hit_words))
+            for word_id in word_ids:
+                self._word_counts[word_id] = self._word_counts.get(word_id, 0) + 1
+            next_local = local_index + 1
+        self.hit_offsets.extend([len(self.hit_words)] * (domain_count - next_local))
+
+    def is_safe(self, index: int) -> bool:
+        return not self.flags[index >> 3] & (1 << (index & 7))
+
+    def word_ids(self, index: int) -> array:
+        return self.hit_words[self.hit_offsets[index]:self.hit_offsets[index + 1]]
+
+    def sensitive_words(self, index: int) -> List[str]:
+        return [self.word_table[word_id][1] for word_id in self.word_ids(index)]
+
+    def unsafe_indices(self) -> Iterator[int]:
+        """遍历所有不安全域名的下标"""
+        for byte_index, byte in enumerate(self.flags):
+            while byte:
+                bit = byte & -byte
+                yield (byte_index << 3) + bit.bit_length() - 1
+                byte ^= bit
+
+    def statistics(self) -> Dict:
+        """统计信息，格式与 SensitiveWordChecker.get_statistics 相同"""
+        unsafe_domains = sum(bin(byte).count('1') for byte in self.flags)
+        word_frequency = {}
+        for word_id, frequency in self._word_counts.items():
+            word = self.word_table[word_id][1]
+            word_frequency[word] = word_frequency.get(word, 0) + frequency
+        return {
+            'total_domains': self.count,
+            'safe_domains': self.count - unsafe_domains,
+            'unsafe_domains': unsafe_domains,
+            'word_frequency': word_frequency
+        }
+
+
+def _iter_chunks(domains: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    iterator = iter(domains)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _screen_names(checker: SensitiveWordChecker, domains: List[str]) -> Tuple[int, List[Tuple[int, Tuple[int, ...]]]]:
+    """检测一块域名，只返回不安全域名的 (块内下标, 敏感词编号)"""
+    hits = []
+    for index, domain in enumerate(domains):
+        word_ids = checker.match_word_ids(domain.split('.')[0])
+        if word_ids:
+            hits.append((index, tuple(word_ids)))
+    return len(domains), hits
+
+
+# 子进程中的检测器
+_worker_checker: Optional[SensitiveWordChecker] = None
+
+
+def _init_screen_worker(word_table: List[Tuple[str, str]]) -> None:
+    global _worker_checker
+    _worker_checker = SensitiveWordChecker.from_word_table(word_table)
+
+
+def _screen_chunk(domains: List[str]) -> Tuple[int, List[Tuple[int, Tuple[int, ...]]]]:
+    return _screen_names(_worker_checker, domains)
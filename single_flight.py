@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """合并对同一个键的并发调用
+
+    同一时间对同一个键只执行一次查询，其余调用方共享正在进行的查询结果；
+    查询完成后立即移除记录，之后的调用会重新发起查询。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def submit(self, key: Hashable, start: Callable[[], Future]) -> Future:
+        """异步调用：没有进行中的查询时调用 start() 发起，返回共享的 Future"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future
+            future = start()
+            self._calls[key] = future
+            self.started += 1
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """同步调用：第一个调用方执行 fn()，其余调用方等待并共享结果"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.started += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._forget(key, future)
+
+    def in_flight(self) -> int:
+        """进行中的查询数量"""
+        with self._lock:
+            return len(self._calls)
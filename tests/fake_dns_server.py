@@ -0,0 +1,76 @@
+"""本地模拟DNS服务器（用于测试 dns_prescreen.py）
+
+按域名返回预设的应答：'ns' 返回 NOERROR 和一条NS记录，'nxdomain' 返回 NXDOMAIN，
+'empty' 返回没有应答记录的 NOERROR；未设置的域名不回复（模拟超时）。
+"""
+import socketserver
+import struct
+import threading
+from typing import Dict
+
+
+def _parse_qname(data: bytes, offset: int = 12):
+    labels = []
+    while data[offset]:
+        length = data[offset]
+        labels.append(data[offset + 1:offset + 1 + length].decode('ascii'))
+        offset += length + 1
+    return '.'.join(labels).lower(), offset + 1
+
+
+def _encode_name(name: str) -> bytes:
+    return b''.join(bytes([len(label)]) + label.encode('ascii') for label in name.split('.')) + b'\x00'
+
+
+def build_response(query: bytes, answer: str) -> bytes:
+    """根据查询报文和预设应答构造响应报文"""
+    query_id = struct.unpack('>H', query[:2])[0]
+    _, end = _parse_qname(query)
+    question = query[12:end + 4]
+    rcode = 3 if answer == 'nxdomain' else 0
+    records = b''
+    if answer == 'ns':
+        rdata = _encode_name('ns1.example-dns.com')
+        # 名称使用指向问题部分的压缩指针
+        records = struct.pack('>HHHIH', 0xC00C, 2, 1, 3600, len(rdata)) + rdata
+    header = struct.pack('>HHHHHH', query_id, 0x8180 | rcode, 1, 1 if records else 0, 0, 0)
+    return header + question + records
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def handle(self) -> None:
+        data, sock = self.request
+        server: FakeDnsServer = self.server.owner
+        try:
+            name, _ = _parse_qname(data)
+        except (IndexError, UnicodeDecodeError):
+            return
+        server.queries.append(name)
+        answer = server.answers.get(name)
+        if answer is not None:
+            sock.sendto(build_response(data, answer), self.client_address)
+
+
+class FakeDnsServer:
+    """模拟DNS服务器，在后台线程中运行"""
+
+    def __init__(self, answers: Dict[str, str], host: str = '127.0.0.1', port: int = 0):
+        self.answers = answers
+        self.queries = []
+        self._server = socketserver.ThreadingUDPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def start(self) -> int:
+        """在后台线程中启动服务器，返回监听端口"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-dns', daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self) -> None:
+        """停止服务器"""
+        self._server.shutdown()
+        self._server.server_close()
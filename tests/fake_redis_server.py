@@ -0,0 +1,184 @@
+"""本地模拟Redis服务器（用于测试 redis_cache.py）
+
+实现缓存用到的RESP2命令：AUTH、SELECT、GET、SET（PX/NX）、DEL、SCAN（MATCH）、
+MULTI/EXEC，以及访问次数使用的有序集合命令（ZINCRBY、ZREVRANGEBYSCORE、ZREMRANGEBYSCORE、
+ZUNIONSTORE（单个键）、ZREMRANGEBYRANK、ZCARD）。可以设置密码，也可以让指定键的写入在事务中返回错误，用于测试错误处理。
+"""
+import fnmatch
+import socketserver
+import threading
+import time
+from typing import Optional
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _write(self, value) -> None:
+        if value is None:
+            self.wfile.write(b'$-1\r\n')
+        elif isinstance(value, Exception):
+            self.wfile.write(f'-{value}\r\n'.encode('utf-8'))
+        elif isinstance(value, int):
+            self.wfile.write(b':%d\r\n' % value)
+        elif isinstance(value, str):
+            self.wfile.write(f'+{value}\r\n'.encode('utf-8'))
+        elif isinstance(value, bytes):
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(value), value))
+        else:
+            self.wfile.write(b'*%d\r\n' % len(value))
+            for item in value:
+                self._write(item)
+
+    def handle(self) -> None:
+        server: FakeRedisServer = self.server.owner
+        authenticated = server.password is None
+        queue = None
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            if command == b'AUTH':
+                authenticated = args[-1].decode('utf-8') == server.password
+                self._write('OK' if authenticated else Exception('WRONGPASS invalid username-password pair'))
+            elif not authenticated:
+                self._write(Exception('NOAUTH Authentication required.'))
+            elif command == b'MULTI':
+                queue = []
+                self._write('OK')
+            elif command == b'EXEC':
+                with server.lock:
+                    self._write([server.execute(queued) for queued in queue or []])
+                queue = None
+            elif queue is not None:
+                queue.append(args)
+                self._write('QUEUED')
+            else:
+                with server.lock:
+                    self._write(server.execute(args))
+
+
+class FakeRedisServer:
+    """模拟Redis服务器，在后台线程中运行
+
+    password 不为None时需要先 AUTH；fail_keys 中的键执行 SET 时返回错误
+    （模拟事务中部分命令失败）。
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, password: Optional[str] = None):
+        self.password = password
+        self.fail_keys = set()
+        self.data = {}
+        self.zsets = {}
+        self.lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), _Handler, bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self._server.server_bind()
+        self._server.server_activate()
+        self.port = self._server.server_address[1]
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        auth = f':{self.password}@' if self.password else ''
+        return f'redis://{auth}127.0.0.1:{self.port}/0'
+
+    def _live(self, key: bytes):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] < time.time():
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, args):
+        """执行一条命令，返回响应（异常对象表示错误响应）"""
+        command = args[0].upper()
+        if command == b'GET':
+            entry = self._live(args[1])
+            return entry[0] if entry else None
+        if command == b'SET':
+            key = args[1].decode('utf-8')
+            if key in self.fail_keys:
+                return Exception('OOM command not allowed when used memory > maxmemory')
+            options = [arg.upper() for arg in args[3:]]
+            expires = None
+            if b'PX' in options:
+                expires = time.time() + int(args[3 + options.index(b'PX') + 1]) / 1000
+            if b'NX' in options and self._live(args[1]):
+                return None
+            self.data[args[1]] = (args[2], expires)
+            return 'OK'
+        if command == b'DEL':
+            return sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+        if command.startswith(b'Z'):
+            return self._zset_command(command, args)
+        if command == b'SELECT':
+            return 'OK' if 0 <= int(args[1]) < 16 else Exception('ERR DB index is out of range')
+        if command == b'SCAN':
+            pattern = args[args.index(b'MATCH') + 1].decode('utf-8') if b'MATCH' in args else '*'
+            keys = [key for key in list(self.data) if fnmatch.fnmatchcase(key.decode('utf-8'), pattern) and self._live(key)]
+            return [b'0', keys]
+        return Exception(f"ERR unknown command '{command.decode('utf-8')}'")
+
+    @staticmethod
+    def _score_bound(value: bytes):
+        """解析分数范围，返回 (分数, 是否不含边界)"""
+        text = value.decode('utf-8')
+        exclusive = text.startswith('(')
+        return float(text.lstrip('(')), exclusive
+
+    def _in_range(self, score: float, low: bytes, high: bytes) -> bool:
+        low, low_exclusive = self._score_bound(low)
+        high, high_exclusive = self._score_bound(high)
+        return (score > low if low_exclusive else score >= low) and (score < high if high_exclusive else score <= high)
+
+    def _zset_command(self, command: bytes, args):
+        zset = self.zsets.setdefault(args[1], {})
+        if command == b'ZINCRBY':
+            zset[args[3]] = zset.get(args[3], 0.0) + float(args[2])
+            return repr(zset[args[3]]).encode('utf-8')
+        if command == b'ZREVRANGEBYSCORE':
+            members = [member for member, score in zset.items() if self._in_range(score, args[3], args[2])]
+            return sorted(members, key=lambda member: (zset[member], member), reverse=True)
+        if command == b'ZREMRANGEBYSCORE':
+            removed = [member for member, score in zset.items() if self._in_range(score, args[2], args[3])]
+            for member in removed:
+                del zset[member]
+            return len(removed)
+        if command == b'ZUNIONSTORE':
+            weight = float(args[args.index(b'WEIGHTS') + 1]) if b'WEIGHTS' in args else 1.0
+            self.zsets[args[1]] = {member: score * weight for member, score in self.zsets.get(args[3], {}).items()}
+            return len(self.zsets[args[1]])
+        if command == b'ZREMRANGEBYRANK':
+            ranked = sorted(zset, key=lambda member: (zset[member], member))
+            start, stop = int(args[2]), int(args[3])
+            removed = ranked[start:stop + 1 if stop != -1 else None]
+            for member in removed:
+                del zset[member]
+            return len(removed)
+        if command == b'ZCARD':
+            return len(zset)
+        return Exception(f"ERR unknown command '{command.decode('utf-8')}'")
+
+    def start(self) -> int:
+        """在后台线程中启动服务器，返回监听端口"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-redis', daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self) -> None:
+        """停止服务器"""
+        self._server.shutdown()
+        self._server.server_close()
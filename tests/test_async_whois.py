@@ -0,0 +1,135 @@
+"""AsyncWhoisClient 测试：响应解析和未知后缀WHOIS服务器查询（使用本地模拟服务器）"""
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+import async_whois
+from async_whois import WHOIS_SERVERS, AsyncWhoisClient, parse_whois_response
+
+# 各WHOIS服务器对未注册域名的实际响应
+NOT_FOUND_RESPONSES = {
+    'whois.verisign-grs.com': 'No match for "QWZXNOTREGISTERED.COM".\r\n>>> Last update of whois database: 2024-05-01T00:00:00Z <<<\r\n',
+    'ccwhois.verisign-grs.com': 'No match for "QWZXNOTREGISTERED.CC".\r\n>>> Last update of whois database: 2024-05-01T00:00:00Z <<<\r\n',
+    'tvwhois.verisign-grs.com': 'No match for "QWZXNOTREGISTERED.TV".\r\n>>> Last update of whois database: 2024-05-01T00:00:00Z <<<\r\n',
+    'whois.pir.org': 'Domain not found.\r\n>>> Last update of WHOIS database: 2024-05-01T00:00:00Z <<<\r\n',
+    'whois.nic.info': 'Domain not found.\r\n>>> Last update of WHOIS database: 2024-05-01T00:00:00Z <<<\r\n',
+    'whois.nic.biz': 'No Data Found\r\nURL of the ICANN Whois Inaccuracy Complaint Form: https://www.icann.org/wicf/\r\n',
+    'whois.nic.io': 'Domain not found.\r\n\r\nTerms of Use: Access to WHOIS information is provided to assist persons in determining the contents of a domain name registration record.\r\n',
+    'whois.nic.ai': 'Domain not found.\r\n>>> Last update of WHOIS database: 2024-05-01T00:00:00Z <<<\r\n',
+    'whois.nic.co': 'No Data Found\r\nURL of the ICANN Whois Inaccuracy Complaint Form: https://www.icann.org/wicf/\r\n',
+    'whois.nic.me': 'Domain not found.\r\n>>> Last update of WHOIS database: 2024-05-01T00:00:00Z <<<\r\n',
+    'whois.cnnic.cn': 'No matching record.\r\n',
+    'whois.nic.xyz': 'The queried object does not exist: DOMAIN NOT FOUND\r\n>>> Last update of WHOIS database: 2024-05-01T00:00:00Z <<<\r\n',
+    'whois.nic.top': 'The queried object does not exist: \r\n',
+    'whois.nic.google': 'Domain not found.\r\n>>> Last update of WHOIS database: 2024-05-01T00:00:00Z <<<\r\n',
+}
+
+
+class ParseWhoisResponseTest(unittest.TestCase):
+
+    def test_not_found_response_of_every_server(self):
+        self.assertEqual(set(NOT_FOUND_RESPONSES), set(WHOIS_SERVERS.values()))
+        for server, text in NOT_FOUND_RESPONSES.items():
+            with self.subTest(server=server):
+                self.assertEqual(parse_whois_response(text), {'success': False, 'error': '未注册'})
+
+    def test_registered_response(self):
+        text = (
+            'Domain Name: EXAMPLE.COM\r\n'
+            'Registrar: Example Registrar, Inc.\r\n'
+            'Creation Date: 1995-08-14T04:00:00Z\r\n'
+            'Registry Expiry Date: 2030-08-13T04:00:00Z\r\n'
+            'Domain Status: clientTransferProhibited https://icann.org/epp#clientTransferProhibited\r\n'
+        )
+        self.assertEqual(parse_whois_response(text), {
+            'registrar': 'Example Registrar, Inc.',
+            'creation_date': '1995-08-14 04:00:00',
+            'expiration_date': '2030-08-13 04:00:00',
+            'status': 'clientTransferProhibited',
+            'success': True
+        })
+
+
+class IanaLookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queries = []
+        patcher = mock.patch.object(async_whois, 'IANA_WHOIS_SERVER', '127.0.0.1')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _handle(self, reader, writer):
+        query = (await reader.readline()).decode('utf-8').strip()
+        self.queries.append(query)
+        await asyncio.sleep(0.05)
+        if '.' in query:
+            writer.write(f'No match for "{query}".\r\n'.encode('utf-8'))
+        elif query == 'nowhois':
+            # IANA 对没有WHOIS服务器的后缀的响应
+            writer.write(b'domain:       NOWHOIS\r\nstatus:       ACTIVE\r\n')
+        else:
+            # IANA 对后缀的响应
+            writer.write(f'domain:       {query.upper()}\r\nwhois:        127.0.0.1\r\n'.encode('utf-8'))
+        await writer.drain()
+        writer.close()
+
+    def _run(self, coro_fn, **options):
+        async def main():
+            server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await coro_fn(AsyncWhoisClient(timeout=1, port=port, **options))
+            finally:
+                server.close()
+                await server.wait_closed()
+        return asyncio.run(main())
+
+    def test_concurrent_lookups_share_iana_query(self):
+        async def lookups(client):
+            domains = [f'name{i}.zz' for i in range(20)]
+            return await client.lookup_many(domains), await client.get_server('zz')
+
+        results, server = self._run(lookups)
+        self.assertEqual(server, '127.0.0.1')
+        self.assertEqual(self.queries.count('zz'), 1)
+        self.assertTrue(all(result['error'] == '未注册' for result in results.values()))
+
+    def test_tld_without_whois_server_cached(self):
+        async def lookups(client):
+            first = await client.lookup('name.nowhois')
+            second = await client.lookup('other.nowhois')
+            return first, second
+
+        first, second = self._run(lookups)
+        self.assertEqual(first, {'success': False, 'error': '查询失败'})
+        self.assertEqual(second, first)
+        self.assertEqual(self.queries, ['nowhois'])
+
+    def test_failed_iana_query_retried_after_ttl(self):
+        async def lookups(client):
+            port, client.port = client.port, 1  # 没有服务在监听，连接失败
+            first = await client.lookup('name.zz')
+            client.port = port
+            # 失败结果只在 server_retry 秒内有效
+            second = await client.lookup('name.zz')
+            client._discovered['zz'] = (None, time.monotonic() - 1)
+            third = await client.lookup('name.zz')
+            return first, second, third
+
+        first, second, third = self._run(lookups, server_retry=60)
+        self.assertEqual(first, {'success': False, 'error': '查询失败'})
+        self.assertEqual(second, first)
+        self.assertEqual(third, {'success': False, 'error': '未注册'})
+        self.assertEqual(self.queries, ['zz', 'name.zz'])
+
+    def test_discovered_servers_bounded(self):
+        async def lookups(client):
+            for tld in ['aa', 'bb', 'cc1', 'dd', 'ee']:
+                await client.get_server(tld)
+            return list(client._discovered)
+
+        self.assertEqual(self._run(lookups, max_discovered=3), ['cc1', 'dd', 'ee'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""CachePersister 延迟写入测试"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from cache_persister import CachePersister
+from whois_cache import SQLiteCacheStore
+
+
+class RecordingStore:
+    """内存存储，记录每次 set_many 调用；on_write 可以在写入过程中执行操作或抛出异常"""
+
+    def __init__(self):
+        self.data = {}
+        self.batches = []
+        self.on_write = None
+
+    def get(self, domain):
+        return self.data.get(domain)
+
+    def set_many(self, entries, deletes=()):
+        if self.on_write is not None:
+            self.on_write(entries, deletes)
+        self.batches.append((dict(entries), list(deletes)))
+        self.data.update(entries)
+        for domain in deletes:
+            self.data.pop(domain, None)
+
+    def close(self):
+        pass
+
+
+class CachePersisterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = RecordingStore()
+        # 后台线程的写入间隔很长，测试中手动调用 flush
+        self.persister = CachePersister(self.store, flush_interval=3600)
+
+    def tearDown(self):
+        self.store.on_write = None
+        self.persister.close()
+
+    def test_reads_own_writes_before_flush(self):
+        self.store.data['b.com'] = (1.0, {'available': False})
+        self.persister.set('a.com', {'available': True}, timestamp=2.0)
+        self.persister.delete('b.com')
+
+        self.assertEqual(self.store.batches, [])
+        self.assertEqual(self.persister.get('a.com'), (2.0, {'available': True}))
+        # 尚未写入的删除同样可见，不会读到存储中的旧条目
+        self.assertIsNone(self.persister.get('b.com'))
+        self.assertEqual(self.persister.pending(), 2)
+
+    def test_reads_batch_being_written(self):
+        writing = threading.Event()
+        release = threading.Event()
+
+        def block(entries, deletes):
+            writing.set()
+            release.wait(5)
+
+        self.store.on_write = block
+        self.persister.set('a.com', {'available': True}, timestamp=2.0)
+        flusher = threading.Thread(target=self.persister.flush)
+        flusher.start()
+        try:
+            self.assertTrue(writing.wait(5))
+            self.assertEqual(self.persister.get('a.com'), (2.0, {'available': True}))
+        finally:
+            release.set()
+            flusher.join()
+        self.assertEqual(self.store.data['a.com'], (2.0, {'available': True}))
+
+    def test_writes_and_deletes_in_one_batch(self):
+        self.store.data['b.com'] = (1.0, {'available': False})
+        self.persister.set_many({'a.com': (2.0, {'available': True})}, deletes=['b.com'])
+        self.persister.set('c.com', {'available': True}, timestamp=3.0)
+        self.assertEqual(self.persister.flush(), 3)
+
+        self.assertEqual(
+            self.store.batches,
+            [({'a.com': (2.0, {'available': True}), 'c.com': (3.0, {'available': True})}, ['b.com'])]
+        )
+        self.assertEqual(self.persister.flush(), 0)
+
+    def test_failed_flush_requeues_without_overwriting_newer(self):
+        def fail(entries, deletes):
+            # 写入期间 a.com 有了更新的结果
+            self.persister.set('a.com', {'available': False}, timestamp=5.0)
+            raise OSError('database is locked')
+
+        self.persister.set('a.com', {'available': True}, timestamp=2.0)
+        self.persister.delete('b.com')
+        self.store.on_write = fail
+        with self.assertRaises(OSError):
+            self.persister.flush()
+
+        self.assertEqual(self.persister.get('a.com'), (5.0, {'available': False}))
+        self.assertIsNone(self.persister.get('b.com'))
+        self.assertEqual(self.persister.stats()['failures'], 1)
+
+        self.store.on_write = None
+        self.store.data['b.com'] = (1.0, {'available': False})
+        self.assertEqual(self.persister.flush(), 2)
+        self.assertEqual(self.store.data, {'a.com': (5.0, {'available': False})})
+
+    def test_failed_flush_dropped_when_queue_full(self):
+        self.persister.max_pending = 2
+
+        def fail(entries, deletes):
+            self.persister._pending.update({'x.com': None, 'y.com': None})
+            raise OSError('database is locked')
+
+        self.persister.set('a.com', {'available': True}, timestamp=2.0)
+        self.store.on_write = fail
+        with self.assertRaises(OSError):
+            self.persister.flush()
+        self.assertEqual(self.persister.stats()['dropped'], 1)
+        self.assertIsNone(self.persister.get('a.com'))
+
+
+class SQLiteBatchTest(unittest.TestCase):
+    """写入和删除在 SQLite 的同一个事务中提交"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = SQLiteCacheStore(os.path.join(self.tmpdir.name, 'whois_cache.db'))
+        self.persister = CachePersister(self.store, flush_interval=3600)
+
+    def tearDown(self):
+        self.persister.close()
+        self.tmpdir.cleanup()
+
+    def test_delete_and_write_committed_together(self):
+        self.store.set('b.com', {'available': False}, timestamp=1.0)
+        self.persister.set('a.com', {'available': True}, timestamp=2.0)
+        self.persister.delete('b.com')
+        self.persister.flush()
+        self.assertEqual(sorted(self.store.items()), [('a.com', 2.0, {'available': True})])
+
+    def test_failed_delete_rolls_back_writes(self):
+        self.store.set('a.com', {'available': True}, timestamp=2.0)
+        # 删除 a.com 时出错，同一批次中的写入也不能生效
+        self.store._connect().execute(
+            "CREATE TRIGGER fail_delete BEFORE DELETE ON whois_cache WHEN OLD.domain = 'a.com' "
+            "BEGIN SELECT RAISE(ABORT, 'delete failed'); END"
+        )
+        self.persister.set('c.com', {'available': True}, timestamp=3.0)
+        self.persister.delete('a.com')
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.persister.flush()
+        self.assertEqual(sorted(self.store.items()), [('a.com', 2.0, {'available': True})])
+        self.assertEqual(self.persister.pending(), 2)
+
+        self.store._connect().execute('DROP TRIGGER fail_delete')
+        self.persister.flush()
+        self.assertEqual(sorted(self.store.items()), [('c.com', 3.0, {'available': True})])
+
+
+if __name__ == '__main__':
+    unittest.main()
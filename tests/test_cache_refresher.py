@@ -0,0 +1,119 @@
+"""访问次数统计和后台刷新测试"""
+import os
+import tempfile
+import time
+import unittest
+
+from cache_refresher import CacheRefresher, HitCounter
+from fake_redis_server import FakeRedisServer
+from redis_cache import RedisCacheStore
+from whois_cache import SQLiteCacheStore, WhoisCache
+
+
+class HitCounterTest(unittest.TestCase):
+    """多个进程的访问次数累加到同一个存储"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, 'whois_cache.db')
+        # 两个存储对象打开同一个数据库文件，模拟两个工作进程
+        self.stores = [SQLiteCacheStore(path), SQLiteCacheStore(path)]
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.tmpdir.cleanup()
+
+    def test_hits_from_all_workers_reach_threshold(self):
+        counters = [HitCounter(store) for store in self.stores]
+        counters[0].record('a.com')
+        counters[0].record('b.com')
+        counters[1].record('a.com')
+        counters[1].record('a.com')
+        for counter in counters:
+            counter.flush()
+
+        # 每个进程单独都没有达到阈值，合计后达到
+        self.assertEqual(self.stores[0].hot_domains(3), ['a.com'])
+        self.assertEqual(self.stores[1].hot_domains(1), ['a.com', 'b.com'])
+
+    def test_failed_flush_keeps_counts(self):
+        class BrokenStore:
+            def add_hits(self, counts):
+                raise OSError('disk full')
+
+        counter = HitCounter(BrokenStore())
+        counter.record('a.com')
+        with self.assertRaises(OSError):
+            counter.flush()
+
+        counter.store = self.stores[0]
+        counter.record('a.com')
+        counter.flush()
+        self.assertEqual(self.stores[0].hot_domains(2), ['a.com'])
+
+    def test_decay_halves_and_trims(self):
+        store = self.stores[0]
+        store.add_hits({'a.com': 8, 'b.com': 4, 'c.com': 2})
+        self.assertEqual(store.decay_hits(max_tracked=2), 2)
+        self.assertEqual(store.hot_domains(2), ['a.com', 'b.com'])
+        self.assertEqual(store.hot_domains(3), ['a.com'])
+
+
+class RedisHitsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeRedisServer()
+        self.server.start()
+        self.store = RedisCacheStore(self.server.url, expiry=3600)
+
+    def tearDown(self):
+        self.store.close()
+        self.server.stop()
+
+    def test_hits_and_decay(self):
+        self.store.add_hits({'a.com': 6, 'b.com': 2})
+        self.store.add_hits({'b.com': 2, 'c.com': 1})
+        self.assertEqual(self.store.hot_domains(4), ['a.com', 'b.com'])
+
+        self.assertEqual(self.store.decay_hits(max_tracked=2), 2)
+        self.assertEqual(self.store.hot_domains(2), ['a.com', 'b.com'])
+        self.assertEqual(self.store.hot_domains(3), ['a.com'])
+        # 访问次数不会出现在缓存条目中
+        self.assertEqual(len(self.store), 0)
+
+
+class CacheRefresherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = SQLiteCacheStore(os.path.join(self.tmpdir.name, 'whois_cache.db'))
+        self.cache = WhoisCache(self.store, ttls={'registered': 1000})
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_refreshes_hot_domains_counted_by_other_workers(self):
+        registered = {'success': True, 'available': False}
+        old = time.time() - 900
+        self.store.set_many({'a.com': (old, registered), 'b.com': (old, registered)})
+
+        # 访问记录来自其他进程，刷新进程本身没有处理过请求
+        self.store.add_hits({'a.com': 5, 'b.com': 1})
+
+        lookups = []
+
+        def lookup(domain):
+            lookups.append(domain)
+            return registered
+
+        refresher = CacheRefresher(self.cache, lookup, self.cache.set_many, refresh_ahead=600, min_hits=3)
+        self.assertEqual(refresher.refresh_once(), 1)
+        self.assertEqual(lookups, ['a.com'])
+        self.assertGreater(self.cache.expires_in('a.com'), 900)
+        self.assertEqual(refresher.stats(), {'tracked': 2, 'hot': 0, 'refreshed': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
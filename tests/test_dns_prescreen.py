@@ -0,0 +1,84 @@
+"""DNS预筛选测试（使用本地模拟DNS服务器）"""
+import asyncio
+import importlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from dns_prescreen import NXDOMAIN, REGISTERED, UNKNOWN, DnsPrescreener
+from fake_dns_server import FakeDnsServer
+
+ANSWERS = {
+    'taken.com': 'ns',
+    'free.com': 'nxdomain',
+    'parked.com': 'empty',
+}
+
+
+class DnsPrescreenerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeDnsServer(ANSWERS)
+        self.server.start()
+        self.prescreener = DnsPrescreener(nameserver=self.server.host, port=self.server.port, timeout=0.2)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_check_many(self):
+        statuses = asyncio.run(self.prescreener.check_many(
+            ['taken.com', 'free.com', 'parked.com', 'silent.com']
+        ))
+        self.assertEqual(statuses, {
+            'taken.com': REGISTERED,     # NOERROR 且有NS记录
+            'free.com': NXDOMAIN,
+            'parked.com': UNKNOWN,       # NOERROR 但没有应答记录
+            'silent.com': UNKNOWN,       # 超时
+        })
+        self.assertCountEqual(self.server.queries, statuses.keys())
+
+
+class PrescreenDomainsTest(unittest.TestCase):
+    """main.prescreen_domains 只返回已注册的域名，其余（包括超时的）继续进行WHOIS查询"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        env = {
+            'WHOIS_CACHE_FILE': os.path.join(cls.tmpdir.name, 'whois_cache.db'),
+            'JOBS_FILE': os.path.join(cls.tmpdir.name, 'jobs.db'),
+            'REGISTERED_INDEX_FILE': '',
+            'WHOIS_CACHE_REFRESH': '0',
+        }
+        cwd = os.getcwd()
+        os.chdir(cls.tmpdir.name)
+        try:
+            with mock.patch.dict(os.environ, env):
+                cls.main = importlib.import_module('main')
+        finally:
+            os.chdir(cwd)
+
+    def setUp(self):
+        self.server = FakeDnsServer(ANSWERS)
+        self.server.start()
+        prescreener = DnsPrescreener(nameserver=self.server.host, port=self.server.port, timeout=0.2)
+        patcher = mock.patch.object(self.main, 'dns_prescreener', prescreener)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_only_registered_skip_whois(self):
+        registered = self.main.prescreen_domains(['taken.com', 'free.com', 'silent.com'])
+        self.assertEqual(list(registered), ['taken.com'])
+        self.assertEqual(registered['taken.com']['source'], 'dns')
+
+    def test_nameserver_down_falls_back_to_whois(self):
+        self.server.answers = {}
+        self.assertEqual(self.main.prescreen_domains(['taken.com', 'free.com']), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""JobManager 任务租约测试：多个进程（此处用多个 JobManager 模拟）共享同一个任务数据库"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from job_manager import COMPLETED, RUNNING, JobManager
+
+
+def generate(spec):
+    return [
+        {'domain': f'name{i}.com', 'sensitive_words': [], 'is_safe': True}
+        for i in range(spec['count'])
+    ]
+
+
+class JobLeaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'jobs.db')
+        self.checked = []
+        self.managers = []
+
+    def tearDown(self):
+        for manager in self.managers:
+            manager.shutdown()
+
+    def _manager(self, check_whois=None, lease_seconds=0.3):
+        def default_check(domains):
+            self.checked.extend(domains)
+            return {domain: {'success': False, 'error': '未注册'} for domain in domains}
+
+        manager = JobManager(
+            self.path, generate, check_whois or default_check, batch_size=5, lease_seconds=lease_seconds
+        )
+        self.managers.append(manager)
+        return manager
+
+    def _wait(self, manager, job_id, status, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if manager.get(job_id)['status'] == status:
+                return
+            time.sleep(0.02)
+        self.fail(f'任务状态未变为 {status}: {manager.get(job_id)}')
+
+    def test_live_lease_not_resumed(self):
+        blocked = threading.Event()
+        release = threading.Event()
+
+        def slow_check(domains):
+            blocked.set()
+            release.wait()
+            return {domain: {'success': True} for domain in domains}
+
+        first = self._manager(slow_check)
+        job_id = first.submit({'count': 10})
+        self.assertTrue(blocked.wait(5))
+        # 第一个进程仍在续约，其他进程启动时不会重复执行该任务
+        second = self._manager()
+        self.assertEqual(second.resume(), [])
+        time.sleep(0.5)
+        self.assertEqual(self.checked, [])
+        release.set()
+        self._wait(first, job_id, COMPLETED)
+
+    def test_dead_owner_taken_over(self):
+        stopped = threading.Event()
+
+        def stuck_check(domains):
+            # 模拟进程退出：不再续约也不再写入
+            first._stopping.set()
+            stopped.set()
+            time.sleep(1)
+            return {domain: {'success': True} for domain in domains}
+
+        first = self._manager(stuck_check)
+        job_id = first.submit({'count': 10})
+        self.assertTrue(stopped.wait(5))
+        self.assertEqual(first.get(job_id)['status'], RUNNING)
+
+        second = self._manager()
+        second.resume()
+        self._wait(second, job_id, COMPLETED)
+        self.assertEqual(sorted(self.checked), sorted(f'name{i}.com' for i in range(10)))
+        # 原进程的批次在租约被接管后写入被拒绝
+        time.sleep(1)
+        results = second.results(job_id)['results']
+        self.assertTrue(all(result['whois'] == {'success': False, 'error': '未注册'} for result in results))
+
+    def test_expired_job_claimed_once(self):
+        owner = self._manager()
+        owner._stopping.set()
+        job_id = owner.submit({'count': 10})
+        time.sleep(0.4)
+
+        managers = [self._manager() for _ in range(4)]
+        claimed = [manager._resume_expired() for manager in managers]
+        self.assertEqual(sum(len(job_ids) for job_ids in claimed), 1)
+        self._wait(managers[0], job_id, COMPLETED)
+        self.assertEqual(len(self.checked), 10)
+
+    def test_shutdown_releases_lease(self):
+        release = threading.Event()
+        first = self._manager(lambda domains: release.wait() and {}, lease_seconds=60)
+        job_id = first.submit({'count': 10})
+        time.sleep(0.2)
+        first.shutdown()
+        release.set()
+
+        second = self._manager(lease_seconds=60)
+        self.assertEqual(second.resume(), [job_id])
+        self._wait(second, job_id, COMPLETED)
+
+
+if __name__ == '__main__':
+    unittest.main()
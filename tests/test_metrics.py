@@ -0,0 +1,82 @@
+"""多进程指标汇总测试：多个 MetricsRegistry 共享同一个目录，模拟多个工作进程"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from metrics import CallbackMetric, MetricsRegistry
+
+
+def dead_pid() -> int:
+    """一个已退出进程的pid"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+class MultiProcessMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _registry(self, process_id, queue_depth=0, hit_ratio=0.0):
+        registry = MetricsRegistry(self.tmpdir.name, process_id=process_id)
+        registry.lookups = registry.counter('lookups_total', '查询次数', ['outcome'])
+        registry.stage = registry.histogram('stage_seconds', '耗时', buckets=(0.1, 1.0))
+        registry.gauge('queue_depth', '队列长度', lambda: queue_depth)
+        registry.register(CallbackMetric('hit_ratio', '命中率', lambda: hit_ratio, aggregate='mean'))
+        return registry
+
+    def _samples(self, registry):
+        return {
+            line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+            for line in registry.render().splitlines()
+            if line and not line.startswith('#')
+        }
+
+    def test_render_merges_all_processes(self):
+        first = self._registry(os.getpid(), queue_depth=3, hit_ratio=0.5)
+        second = self._registry(os.getppid(), queue_depth=4, hit_ratio=1.0)
+        first.lookups.inc('registered', amount=2)
+        second.lookups.inc('registered')
+        second.lookups.inc('timeout')
+        first.stage.observe(0.05)
+        second.stage.observe(0.5)
+        second.write_snapshot()
+
+        samples = self._samples(first)
+        self.assertEqual(samples['lookups_total{outcome="registered"}'], 3)
+        self.assertEqual(samples['lookups_total{outcome="timeout"}'], 1)
+        self.assertEqual(samples['stage_seconds_bucket{le="0.1"}'], 1)
+        self.assertEqual(samples['stage_seconds_bucket{le="1"}'], 2)
+        self.assertEqual(samples['stage_seconds_count'], 2)
+        self.assertAlmostEqual(samples['stage_seconds_sum'], 0.55)
+        self.assertEqual(samples['queue_depth'], 7)
+        self.assertEqual(samples['hit_ratio'], 0.75)
+        # 由哪个进程输出结果都相同
+        self.assertEqual(self._samples(second), samples)
+
+    def test_dead_process_keeps_counters_drops_gauges(self):
+        live = self._registry(os.getpid(), queue_depth=1)
+        dead = self._registry(dead_pid(), queue_depth=5)
+        dead.lookups.inc('registered', amount=10)
+        dead.write_snapshot()
+
+        samples = self._samples(live)
+        self.assertEqual(samples['lookups_total{outcome="registered"}'], 10)
+        self.assertEqual(samples['queue_depth'], 1)
+
+    def test_without_shared_dir(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('lookups_total', '查询次数', ['outcome'])
+        counter.inc('registered')
+        self.assertEqual(
+            registry.render(),
+            '# HELP lookups_total 查询次数\n# TYPE lookups_total counter\nlookups_total{outcome="registered"} 1\n'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
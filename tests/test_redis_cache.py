@@ -0,0 +1,69 @@
+"""RedisCacheStore 测试（使用本地模拟Redis服务器，无需真实Redis）"""
+import time
+import unittest
+
+from fake_redis_server import FakeRedisServer
+from redis_cache import RedisCacheStore, RedisError
+
+
+class RedisCacheStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeRedisServer(password='secret')
+        self.server.start()
+        self.store = RedisCacheStore(self.server.url, expiry=3600)
+
+    def tearDown(self):
+        self.store.close()
+        self.server.stop()
+
+    def test_round_trip(self):
+        now = time.time()
+        self.store.set_many({
+            'a.com': (now, {'available': True}),
+            'b.com': (now, {'available': False, 'whois_server': 'whois.verisign-grs.com'}),
+        })
+        self.assertEqual(self.store.get('a.com'), (now, {'available': True}))
+        self.assertIsNone(self.store.get('c.com'))
+        self.assertEqual(len(self.store), 2)
+
+        # 写入和删除在同一个事务中提交
+        self.store.set_many({'c.com': (now, {'available': True})}, deletes=['a.com'])
+        self.assertIsNone(self.store.get('a.com'))
+        self.assertEqual(
+            sorted(self.store.items()),
+            [('b.com', now, {'available': False, 'whois_server': 'whois.verisign-grs.com'}),
+             ('c.com', now, {'available': True})]
+        )
+
+        self.store.delete('b.com')
+        self.assertEqual([domain for domain, _, _ in self.store.items()], ['c.com'])
+
+    def test_expired_entry_not_returned(self):
+        self.store.set('old.com', {'available': True}, timestamp=time.time() - 3600)
+        time.sleep(0.01)
+        self.assertIsNone(self.store.get('old.com'))
+
+    def test_wrong_password_raises(self):
+        store = RedisCacheStore(f'redis://:wrong@127.0.0.1:{self.server.port}/0')
+        with self.assertRaises(RedisError):
+            store.get('a.com')
+        # 认证失败的连接不会被保留
+        self.assertIsNone(getattr(store.client._local, 'conn', None))
+
+    def test_invalid_db_raises(self):
+        store = RedisCacheStore(f'redis://:secret@127.0.0.1:{self.server.port}/99')
+        with self.assertRaises(RedisError):
+            store.get('a.com')
+
+    def test_exec_error_raises(self):
+        self.server.fail_keys.add('whois:bad.com')
+        with self.assertRaises(RedisError):
+            self.store.set_many({
+                'good.com': (time.time(), {'available': True}),
+                'bad.com': (time.time(), {'available': True}),
+            })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""敏感词检测测试：自动机的结果与逐个敏感词检查子串的结果一致"""
+import random
+import unittest
+
+from sensitive_word_checker import AhoCorasick, SensitiveWordChecker
+
+
+def baseline_match(checker: SensitiveWordChecker, domain: str):
+    """逐个分类、逐个敏感词检查子串（自动机之前的实现），返回 (分类, 敏感词) 列表"""
+    found = []
+    domain = domain.lower()
+    for category, words in checker.sensitive_words.items():
+        for word in words:
+            if word.lower() in domain:
+                found.append((category, word))
+    return found
+
+
+def random_text(rng: random.Random, alphabet: str, min_length: int, max_length: int) -> str:
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(min_length, max_length)))
+
+
+class AhoCorasickTest(unittest.TestCase):
+
+    def test_matches_substring_search(self):
+        rng = random.Random(20240601)
+        # 字母表很小，模式之间大量重叠（互为前缀、后缀和子串），覆盖失败指针的各种情况
+        for _ in range(200):
+            matcher = AhoCorasick()
+            patterns = {random_text(rng, 'abc', 1, 5) for _ in range(rng.randint(1, 12))}
+            ids = {pattern: matcher.add(pattern) for pattern in patterns}
+            for _ in range(20):
+                text = random_text(rng, 'abcd', 0, 20)
+                expected = {ids[pattern] for pattern in patterns if pattern in text}
+                self.assertEqual(matcher.search(text), expected, (sorted(patterns), text))
+
+    def test_patterns_added_after_search(self):
+        matcher = AhoCorasick()
+        she = matcher.add('she')
+        self.assertEqual(matcher.search('ushers'), {she})
+        he = matcher.add('he')
+        hers = matcher.add('hers')
+        self.assertEqual(matcher.add('he'), he)
+        self.assertEqual(matcher.search('ushers'), {she, he, hers})
+
+
+class SensitiveWordCheckerTest(unittest.TestCase):
+
+    def assert_same_as_baseline(self, checker: SensitiveWordChecker, domain: str):
+        matches = checker.match_categories(domain)
+        self.assertEqual(sorted(matches), sorted(baseline_match(checker, domain)), domain)
+        # 结果按分类的加载顺序排列
+        order = list(checker.sensitive_words)
+        positions = [order.index(category) for category, _ in matches]
+        self.assertEqual(positions, sorted(positions), domain)
+
+    def test_default_words_match_baseline(self):
+        checker = SensitiveWordChecker()
+        words = [word for words in checker.sensitive_words.values() for word in words]
+        rng = random.Random(7)
+        for _ in range(500):
+            # 随机拼接敏感词片段和普通字母，包括大写和跨词的组合
+            parts = [rng.choice(words) if rng.random() < 0.5 else random_text(rng, 'aeiostrnl', 1, 4) for _ in range(rng.randint(1, 4))]
+            domain = ''.join(part.upper() if rng.random() < 0.2 else part for part in parts)
+            self.assert_same_as_baseline(checker, domain)
+
+    def test_random_words_match_baseline(self):
+        rng = random.Random(42)
+        for _ in range(50):
+            checker = SensitiveWordChecker()
+            for category in ('alpha', 'beta', 'illegal'):
+                checker.load_sensitive_words(category, [random_text(rng, 'abcAB', 1, 4) for _ in range(rng.randint(1, 6))])
+            for _ in range(30):
+                self.assert_same_as_baseline(checker, random_text(rng, 'abcABd', 0, 16))
+
+    def test_word_in_several_categories(self):
+        # official 同时属于 political 和 commercial，与逐个分类检查一样出现两次
+        checker = SensitiveWordChecker()
+        self.assertEqual(
+            checker.match_categories('officialsite'),
+            [('political', 'official'), ('commercial', 'official')]
+        )
+        self.assertEqual(checker.exact_match('officialsite'), ['official', 'official'])
+        result = checker.check_domain('officialsite.com')
+        self.assertFalse(result['is_safe'])
+        self.assertEqual(result['sensitive_words'], ['official', 'official'])
+        self.assertEqual(checker.get_statistics([result])['word_frequency'], {'official': 2})
+
+    def test_bulk_screen_matches_check_domains(self):
+        checker = SensitiveWordChecker()
+        domains = ['officialcasino.com', 'example.com', 'Hackers.net', 'templelogo.org', 'safe.io']
+        expected = checker.check_domains(domains)
+        screened = checker.screen_domains(domains, chunk_size=2)
+        self.assertEqual(
+            [screened.sensitive_words(index) for index in range(len(screened))],
+            [result['sensitive_words'] for result in expected]
+        )
+        self.assertEqual(screened.statistics(), checker.get_statistics(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
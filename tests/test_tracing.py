@@ -0,0 +1,53 @@
+"""慢请求记录测试：多个 TraceStore 共享同一个文件，模拟多个工作进程"""
+import os
+import tempfile
+import time
+import unittest
+
+from tracing import Trace, TraceStore
+
+
+class TraceStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'traces.db')
+
+    def _trace(self, name='generate'):
+        trace = Trace(name, keywords=['shop'], count=10)
+        trace.record('whois', time.time(), domains=10)
+        trace.profile['main;handler'] = 5
+        trace.profile['main;other'] = 1
+        trace.finish()
+        return trace
+
+    def test_shared_between_processes(self):
+        writer = TraceStore(self.path)
+        reader = TraceStore(self.path)
+        trace = self._trace()
+        writer.add(trace)
+
+        stored = reader.get(trace.id)
+        self.assertEqual(stored['name'], 'generate')
+        self.assertEqual(stored['attrs'], {'keywords': ['shop'], 'count': 10})
+        self.assertEqual(stored['spans'][0]['name'], 'whois')
+        self.assertEqual(stored['profile']['samples'], 6)
+        self.assertEqual(len(reader.get(trace.id, profile_limit=1)['profile']['stacks']), 1)
+        self.assertIsNone(reader.get('missing'))
+
+        summary, = reader.list()
+        self.assertEqual(summary['id'], trace.id)
+        self.assertEqual(summary['spans'], 1)
+        self.assertNotIn('profile', summary)
+
+    def test_keeps_latest(self):
+        store = TraceStore(self.path, size=3)
+        traces = [self._trace(f'request{i}') for i in range(5)]
+        for trace in traces:
+            store.add(trace)
+        self.assertEqual([trace['id'] for trace in store.list()], [trace.id for trace in reversed(traces[2:])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""WhoisCache 分片内存缓存测试"""
+import random
+import threading
+import time
+import unittest
+
+from whois_cache import WhoisCache
+
+
+class DictStore:
+    """线程安全的内存存储"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, domain):
+        with self.lock:
+            return self.data.get(domain)
+
+    def set_many(self, entries, deletes=()):
+        with self.lock:
+            self.data.update(entries)
+            for domain in deletes:
+                self.data.pop(domain, None)
+
+    def delete(self, domain):
+        with self.lock:
+            self.data.pop(domain, None)
+
+
+REGISTERED = {'success': True, 'available': False}
+
+
+class WhoisCacheTest(unittest.TestCase):
+
+    def test_lru_eviction_within_shard(self):
+        cache = WhoisCache(DictStore(), max_size=2, stripes=1)
+        cache.set('a.com', REGISTERED)
+        cache.set('b.com', REGISTERED)
+        # 访问 a.com 后 b.com 成为最久未使用的条目
+        self.assertEqual(cache.get('a.com'), REGISTERED)
+        cache.set('c.com', REGISTERED)
+
+        self.assertEqual(len(cache), 2)
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['memory_hits'], 1)
+        # 被淘汰的条目仍可从存储读取
+        self.assertEqual(cache.get('b.com'), REGISTERED)
+        self.assertEqual(cache.stats()['store_hits'], 1)
+
+    def test_stripes_limited_by_max_size(self):
+        cache = WhoisCache(DictStore(), max_size=3, stripes=16)
+        self.assertEqual(cache.stats()['stripes'], 3)
+        for index in range(50):
+            cache.set(f'd{index}.com', REGISTERED)
+        self.assertLessEqual(len(cache), 3)
+
+    def test_concurrent_get_set_delete_stay_bounded(self):
+        store = DictStore()
+        cache = WhoisCache(store, max_size=64, stripes=8)
+        domains = [f'd{index}.com' for index in range(500)]
+        gets = [0] * 8
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(3000):
+                    domain = rng.choice(domains)
+                    action = rng.random()
+                    if action < 0.5:
+                        cache.get(domain)
+                        gets[seed] += 1
+                    elif action < 0.85:
+                        cache.set(domain, REGISTERED, timestamp=time.time())
+                    else:
+                        cache.delete(domain)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        for shard in cache._shards:
+            self.assertLessEqual(len(shard.entries), shard.max_size)
+        stats = cache.stats()
+        self.assertLessEqual(stats['size'], 64)
+        self.assertGreater(stats['evictions'], 0)
+        # 每次读取恰好计入一次命中或未命中
+        self.assertEqual(stats['memory_hits'] + stats['store_hits'] + stats['misses'], sum(gets))
+        # 并发结束后删除的域名在内存和存储中都不存在
+        for domain in domains[:50]:
+            cache.delete(domain)
+            self.assertIsNone(cache.get(domain))
+            self.assertIsNone(store.get(domain))
+
+
+if __name__ == '__main__':
+    unittest.main()
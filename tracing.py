@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_current: ContextVar[Optional['Trace']] = ContextVar('trace', default=None)
+
+
+class Trace:
+    """单个请求的追踪记录
+
+    span 为请求处理中的一个阶段或一次WHOIS查询，记录开始时间（相对请求开始的毫秒数）、
+    耗时和附加信息；事件是耗时为0的 span（如一次重试）。
+    开启采样分析时 profile 记录请求线程的调用栈采样次数。
+    """
+
+    def __init__(self, name: str, **attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.spans: List[dict] = []
+        self.profile: Counter = Counter()
+        self.requested = False
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, end: float = None, **attrs) -> None:
+        """记录一个 span，start/end 为 time.time() 的值，end 默认为当前时间"""
+        if end is None:
+            end = time.time()
+        span = {
+            'name': name,
+            'start_ms': round((start - self.start) * 1000, 2),
+            'duration_ms': round((end - start) * 1000, 2)
+        }
+        if attrs:
+            span['attrs'] = attrs
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self) -> None:
+        if self.duration is None:
+            self.duration = time.time() - self.start
+
+    def elapsed(self) -> float:
+        return self.duration if self.duration is not None else time.time() - self.start
+
+    def to_dict(self, profile_limit: int = 20) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span['start_ms'])
+            profile = self.profile.most_common(profile_limit)
+            samples = sum(self.profile.values())
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'attrs': self.attrs,
+            'start': self.start,
+            'duration_ms': round(self.elapsed() * 1000, 2),
+            'spans': spans
+        }
+        if samples:
+            data['profile'] = {
+                'samples': samples,
+                'stacks': [{'stack': stack, 'samples': count} for stack, count in profile]
+            }
+        return data
+
+
+def current() -> Optional[Trace]:
+    """当前线程（上下文）中正在进行的追踪，未开启追踪时返回None"""
+    return _current.get()
+
+
+@contextmanager
+def activate(trace: Optional[Trace]):
+    """在当前上下文中激活追踪记录"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def run_in(trace: Optional[Trace], fn, *args, **kwargs):
+    """在其他线程（如线程池）中执行 fn，执行期间沿用调用方的追踪记录"""
+    if trace is None:
+        return fn(*args, **kwargs)
+    with activate(trace):
+        return fn(*args, **kwargs)
+
+
+def record(name: str, start: float, end: float = None, **attrs) -> None:
+    """向当前追踪记录添加 span，未开启追踪时不做任何事"""
+    trace = _current.get()
+    if trace is not None:
+        trace.record(name, start, end, **attrs)
+
+
+def event(name: str, **attrs) -> None:
+    """向当前追踪记录添加事件"""
+    trace = _current.get()
+    if trace is not None:
+        now = time.time()
+        trace.record(name, now, now, **attrs)
+
+
+class TraceStore:
+    """保存最近的慢请求追踪记录（SQLite），多个工作进程共享
+
+    每条记录保存完整的追踪数据（JSON），最多保留 size 条，超出后删除最早的记录；
+    任何一个工作进程都能读取其他进程保存的记录。每个线程使用独立的连接。
+    """
+
+    def __init__(self, path: str, size: int = 100):
+        self.path = path
+        self.size = size
+        self._local = threading.local()
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS traces ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'id TEXT NOT NULL UNIQUE, '
+            'data TEXT NOT NULL)'
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def add(self, trace: Trace) -> None:
+        data = json.dumps(trace.to_dict(profile_limit=None), ensure_ascii=False, default=str)
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN')
+            seq = conn.execute('INSERT INTO traces (id, data) VALUES (?, ?)', (trace.id, data)).lastrowid
+            conn.execute('DELETE FROM traces WHERE seq <= ?', (seq - self.size,))
+
+    def list(self) -> List[dict]:
+        """按时间从新到旧返回（不含 span 明细和采样结果）"""
+        rows = self._connect().execute('SELECT data FROM traces ORDER BY seq DESC').fetchall()
+        traces = []
+        for (data,) in rows:
+            trace = json.loads(data)
+            trace['spans'] = len(trace['spans'])
+            trace.pop('profile', None)
+            traces.append(trace)
+        return traces
+
+    def get(self, trace_id: str, profile_limit: int = 20) -> Optional[dict]:
+        """完整的追踪记录，采样结果只返回次数最多的 profile_limit 个调用栈"""
+        row = self._connect().execute('SELECT data FROM traces WHERE id = ?', (trace_id,)).fetchone()
+        if row is None:
+            return None
+        trace = json.loads(row[0])
+        if 'profile' in trace:
+            trace['profile']['stacks'] = trace['profile']['stacks'][:profile_limit]
+        return trace
+
+
+class SamplingProfiler:
+    """请求线程的采样分析器
+
+    后台线程每隔 interval 秒读取已注册线程的当前调用栈（sys._current_frames），
+    按调用栈累计采样次数写入对应追踪记录的 profile；没有注册的线程时后台线程休眠。
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._targets: Dict[int, Trace] = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def register(self, trace: Trace) -> None:
+        """开始采样当前线程，采样结果写入 trace"""
+        with self._lock:
+            self._targets[threading.get_ident()] = trace
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+            self._active.set()
+
+    def unregister(self, trace: Trace) -> None:
+        """停止采样 trace 对应的线程"""
+        with self._lock:
+            for ident, target in list(self._targets.items()):
+                if target is trace:
+                    del self._targets[ident]
+            if not self._targets:
+                self._active.clear()
+
+    def _stack(self, frame) -> str:
+        """调用栈（从外到内，分号分隔），每层为 函数名 (文件名:行号)"""
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(parts))
+
+    def _run(self) -> None:
+        while True:
+            self._active.wait()
+            with self._lock:
+                targets = list(self._targets.items())
+            frames = sys._current_frames()
+            for ident, trace in targets:
+                frame = frames.get(ident)
+                if frame is not None:
+                    stack = self._stack(frame)
+                    with trace._lock:
+                        trace.profile[stack] += 1
+            del frames
+            time.sleep(self.interval)
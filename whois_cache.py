@@ -0,0 +1,383 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 不同类型查询结果的默认缓存时间（秒）
+DEFAULT_TTLS = {
+    'registered': 3600 * 24,   # 查询成功（已注册）
+    'unregistered': 3600,      # 未注册
+    'timeout': 60 * 5,         # 查询超时
+    'failed': 60 * 10,         # 其他查询失败
+}
+
+
+def classify_result(result: dict) -> str:
+    """根据查询结果确定缓存类别"""
+    if result.get('success'):
+        return 'registered'
+    error = result.get('error')
+    if error == '未注册':
+        return 'unregistered'
+    if error == '查询超时':
+        return 'timeout'
+    return 'failed'
+
+
+class SQLiteCacheStore:
+    """基于SQLite(WAL模式)的WHOIS缓存持久化存储
+
+    每个域名单独一行，写入时只更新发生变化的条目；
+    读取时按需查询，启动时无需解析整个缓存文件。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接（每个线程一个连接）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        """创建缓存表"""
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS whois_cache ('
+            'domain TEXT PRIMARY KEY, '
+            'timestamp REAL NOT NULL, '
+            'data TEXT NOT NULL)'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_whois_cache_timestamp '
+            'ON whois_cache (timestamp)'
+        )
+        # 各进程汇总的域名访问次数（热门域名后台刷新使用）
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS whois_hits ('
+            'domain TEXT PRIMARY KEY, '
+            'hits REAL NOT NULL)'
+        )
+
+    def get(self, domain: str) -> Optional[Tuple[float, dict]]:
+        """读取单个域名的缓存，返回 (时间戳, 查询结果)"""
+        row = self._connect().execute(
+            'SELECT timestamp, data FROM whois_cache WHERE domain = ?',
+            (domain,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, domain: str, result: dict, timestamp: float = None) -> None:
+        """写入单个域名的缓存"""
+        self.set_many({domain: (timestamp or time.time(), result)})
+
+    def set_many(self, entries: Dict[str, Tuple[float, dict]], deletes: Iterable[str] = ()) -> None:
+        """在一个事务中批量写入缓存，并删除 deletes 中的域名"""
+        deletes = [(domain,) for domain in deletes]
+        if not entries and not deletes:
+            return
+        rows = [
+            (domain, timestamp, json.dumps(result, ensure_ascii=False))
+            for domain, (timestamp, result) in entries.items()
+        ]
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany(
+                'INSERT OR REPLACE INTO whois_cache (domain, timestamp, data) '
+                'VALUES (?, ?, ?)',
+                rows
+            )
+            conn.executemany('DELETE FROM whois_cache WHERE domain = ?', deletes)
+
+    def delete(self, domain: str) -> None:
+        """删除单个域名的缓存"""
+        self._connect().execute('DELETE FROM whois_cache WHERE domain = ?', (domain,))
+
+    def purge_expired(self, expiry: int) -> int:
+        """清理过期条目，返回删除的数量"""
+        cursor = self._connect().execute(
+            'DELETE FROM whois_cache WHERE timestamp < ?',
+            (time.time() - expiry,)
+        )
+        return cursor.rowcount
+
+    def items(self) -> Iterable[Tuple[str, float, dict]]:
+        """遍历所有缓存条目"""
+        cursor = self._connect().execute('SELECT domain, timestamp, data FROM whois_cache')
+        for domain, timestamp, data in cursor:
+            yield domain, timestamp, json.loads(data)
+
+    def __len__(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM whois_cache').fetchone()[0]
+
+    def add_hits(self, counts: Dict[str, int]) -> None:
+        """累加域名的访问次数"""
+        if not counts:
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany(
+                'INSERT INTO whois_hits (domain, hits) VALUES (?, ?) '
+                'ON CONFLICT(domain) DO UPDATE SET hits = hits + excluded.hits',
+                counts.items()
+            )
+
+    def hot_domains(self, min_hits: float) -> List[str]:
+        """访问次数达到 min_hits 的域名，按访问次数从高到低排列"""
+        rows = self._connect().execute(
+            'SELECT domain FROM whois_hits WHERE hits >= ? ORDER BY hits DESC',
+            (min_hits,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def decay_hits(self, max_tracked: int) -> int:
+        """访问次数减半，只保留计数最高的 max_tracked 个域名，返回保留的域名数"""
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN')
+            conn.execute('DELETE FROM whois_hits WHERE hits < 0.5')
+            conn.execute('UPDATE whois_hits SET hits = hits / 2')
+            conn.execute(
+                'DELETE FROM whois_hits WHERE domain NOT IN '
+                '(SELECT domain FROM whois_hits ORDER BY hits DESC LIMIT ?)',
+                (max_tracked,)
+            )
+            return conn.execute('SELECT COUNT(*) FROM whois_hits').fetchone()[0]
+
+    def import_json(self, json_path: str, expiry: int) -> int:
+        """从旧版JSON缓存文件导入未过期的条目，导入后重命名原文件"""
+        with open(json_path, 'r', encoding='utf-8') as f:
+            cache_data = json.load(f)
+
+        current_time = time.time()
+        entries = {
+            domain: (timestamp, data)
+            for domain, (timestamp, data) in cache_data.items()
+            if current_time - timestamp < expiry
+        }
+        rows = [
+            (domain, timestamp, json.dumps(data, ensure_ascii=False))
+            for domain, (timestamp, data) in entries.items()
+        ]
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN')
+            # 只在旧文件中的条目更新时才覆盖，重复导入不会回退已有缓存
+            conn.executemany(
+                'INSERT INTO whois_cache (domain, timestamp, data) VALUES (?, ?, ?) '
+                'ON CONFLICT(domain) DO UPDATE SET '
+                'timestamp = excluded.timestamp, data = excluded.data '
+                'WHERE excluded.timestamp > whois_cache.timestamp',
+                rows
+            )
+
+        try:
+            os.replace(json_path, json_path + '.migrated')
+        except OSError:
+            # 以单文件方式挂载的卷无法重命名，下次启动会再次（幂等地）导入
+            pass
+        return len(entries)
+
+    def close(self) -> None:
+        """关闭当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _Shard:
+    """内存缓存的一个分片：独立的LRU字典、锁和统计计数"""
+
+    __slots__ = ('entries', 'lock', 'max_size', 'memory_hits', 'store_hits', 'misses', 'evictions', 'expirations')
+
+    def __init__(self, max_size: int):
+        # 域名 -> (查询时间戳, 查询结果, 载入内存的时间)
+        self.entries: 'OrderedDict[str, Tuple[float, dict, float]]' = OrderedDict()
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class WhoisCache:
+    """两级WHOIS缓存：有容量上限的内存LRU缓存 + 持久化存储
+
+    不同类型的结果（已注册、未注册、超时、失败）使用不同的过期时间，
+    内存中超过容量上限时按最近最少使用淘汰。
+
+    内存缓存按域名分成 stripes 个分片，每个分片有自己的锁，多个请求线程和查询线程
+    同时读写不同域名时不会互相等待；LRU淘汰在分片内进行（每个分片的容量为 max_size / stripes）。
+    持久化存储的读写在锁外进行。
+
+    jitter 大于 0 时每个条目的缓存时间在 ±jitter 比例内浮动（由域名和查询时间决定，
+    各进程计算结果一致），避免同一时间写入的大量条目同时过期。
+
+    持久化存储可以是 SQLiteCacheStore 或 RedisCacheStore（接口相同）。
+    多个进程共享存储时，设置 memory_ttl 后内存中的条目超过该时间会重新从存储读取，
+    其他进程的更新（例如刷新WHOIS）最多延迟 memory_ttl 秒可见。
+    """
+
+    def __init__(
+        self,
+        store,
+        max_size: int = 10000,
+        ttls: Dict[str, int] = None,
+        memory_ttl: float = None,
+        jitter: float = 0.0,
+        stripes: int = 16
+    ):
+        self.store = store
+        self.max_size = max_size
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.memory_ttl = memory_ttl
+        self.jitter = jitter
+        stripes = max(1, min(stripes, max_size))
+        shard_size = -(-max_size // stripes)
+        self._shards = tuple(_Shard(shard_size) for _ in range(stripes))
+
+    def _shard(self, domain: str) -> _Shard:
+        return self._shards[hash(domain) % len(self._shards)]
+
+    @property
+    def max_ttl(self) -> int:
+        """最长缓存时间（包含浮动）"""
+        return int(max(self.ttls.values()) * (1 + self.jitter))
+
+    def ttl_for(self, result: dict, domain: str = None, timestamp: float = None) -> float:
+        """获取查询结果对应的缓存时间，提供域名和查询时间时加入浮动"""
+        ttl = self.ttls[classify_result(result)]
+        if self.jitter and domain is not None:
+            # 由域名和查询时间得到 [-1, 1) 之间的固定值
+            fraction = zlib.crc32(f'{domain}:{timestamp}'.encode('utf-8')) / 2 ** 31 - 1
+            ttl *= 1 + self.jitter * fraction
+        return ttl
+
+    def _is_fresh(self, domain: str, timestamp: float, result: dict, now: float) -> bool:
+        return now - timestamp < self.ttl_for(result, domain, timestamp)
+
+    def expires_in(self, domain: str) -> Optional[float]:
+        """缓存条目的剩余有效时间（秒），没有缓存时返回 None
+
+        从持久化存储读取：内存中的副本可能已被其他进程刷新过，按内存副本计算会重复刷新。
+        """
+        entry = self.store.get(domain)
+        if entry is None:
+            return None
+        timestamp, result = entry[0], entry[1]
+        return timestamp + self.ttl_for(result, domain, timestamp) - time.time()
+
+    @staticmethod
+    def _put(shard: _Shard, domain: str, timestamp: float, result: dict) -> None:
+        """写入分片并按LRU淘汰，调用方需持有分片的锁"""
+        shard.entries[domain] = (timestamp, result, time.monotonic())
+        shard.entries.move_to_end(domain)
+        while len(shard.entries) > shard.max_size:
+            shard.entries.popitem(last=False)
+            shard.evictions += 1
+
+    def get(self, domain: str) -> Optional[dict]:
+        """读取未过期的缓存结果，未命中时返回None"""
+        now = time.time()
+        shard = self._shard(domain)
+        with shard.lock:
+            entry = shard.entries.get(domain)
+            if entry is not None:
+                timestamp, result, loaded_at = entry
+                if self.memory_ttl is not None and time.monotonic() - loaded_at > self.memory_ttl:
+                    # 内存副本可能已被其他进程更新，重新从存储读取
+                    del shard.entries[domain]
+                elif self._is_fresh(domain, timestamp, result, now):
+                    shard.entries.move_to_end(domain)
+                    shard.memory_hits += 1
+                    return result
+                else:
+                    del shard.entries[domain]
+                    shard.expirations += 1
+
+        # 内存未命中，查询持久化存储
+        entry = self.store.get(domain)
+        with shard.lock:
+            if entry is not None:
+                timestamp, result = entry
+                if self._is_fresh(domain, timestamp, result, now):
+                    # 查询存储期间其他线程可能写入了更新的结果，不覆盖
+                    current = shard.entries.get(domain)
+                    if current is None or current[0] <= timestamp:
+                        self._put(shard, domain, timestamp, result)
+                    shard.store_hits += 1
+                    return result
+            shard.misses += 1
+        return None
+
+    def set(self, domain: str, result: dict, timestamp: float = None) -> None:
+        """写入单个域名的缓存"""
+        self.set_many({domain: (timestamp or time.time(), result)})
+
+    def set_many(self, entries: Dict[str, Tuple[float, dict]]) -> None:
+        """批量写入缓存（内存和持久化存储）"""
+        if not entries:
+            return
+        for domain, (timestamp, result) in entries.items():
+            shard = self._shard(domain)
+            with shard.lock:
+                self._put(shard, domain, timestamp, result)
+        self.store.set_many(entries)
+
+    def delete(self, domain: str) -> None:
+        """删除单个域名的缓存"""
+        shard = self._shard(domain)
+        with shard.lock:
+            shard.entries.pop(domain, None)
+        self.store.delete(domain)
+
+    def purge_expired(self) -> int:
+        """清理持久化存储中超过最长缓存时间的条目"""
+        return self.store.purge_expired(self.max_ttl)
+
+    def __len__(self) -> int:
+        """内存缓存条目数"""
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def stats(self) -> Dict:
+        """获取缓存统计信息（逐个分片读取，各计数之间不保证是同一时刻的快照）"""
+        totals = dict.fromkeys(('size', 'memory_hits', 'store_hits', 'misses', 'evictions', 'expirations'), 0)
+        for shard in self._shards:
+            with shard.lock:
+                totals['size'] += len(shard.entries)
+                totals['memory_hits'] += shard.memory_hits
+                totals['store_hits'] += shard.store_hits
+                totals['misses'] += shard.misses
+                totals['evictions'] += shard.evictions
+                totals['expirations'] += shard.expirations
+        hits = totals['memory_hits'] + totals['store_hits']
+        lookups = hits + totals['misses']
+        return {
+            'size': totals['size'],
+            'max_size': self.max_size,
+            'stripes': len(self._shards),
+            'memory_hits': totals['memory_hits'],
+            'store_hits': totals['store_hits'],
+            'misses': totals['misses'],
+            'evictions': totals['evictions'],
+            'expirations': totals['expirations'],
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0
+        }
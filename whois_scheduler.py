@@ -0,0 +1,144 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Dict, NamedTuple, TypeVar
+
+T = TypeVar('T')
+
+
+class ThrottledError(Exception):
+    """WHOIS服务器拒绝查询（限流）"""
+
+
+class ServerLimit(NamedTuple):
+    """单个WHOIS服务器的限速配置"""
+    rate: float = 10.0        # 每秒允许的查询数
+    burst: int = 20           # 令牌桶容量
+    max_in_flight: int = 20   # 同时进行的最大查询数
+
+
+class TokenBucket:
+    """令牌桶限速器（只在事件循环线程中使用，无需加锁）"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = None
+
+    def _refill(self, now: float) -> None:
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """获取一个令牌，令牌不足时等待"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self._refill(loop.time())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _ServerState:
+    """单个WHOIS服务器的调度状态"""
+
+    def __init__(self, limit: ServerLimit):
+        self.limit = limit
+        self.bucket = TokenBucket(limit.rate, limit.burst)
+        self.semaphore = asyncio.Semaphore(limit.max_in_flight)
+        self.in_flight = 0
+        self.backoff = 0.0
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.completed = 0
+
+
+class WhoisScheduler:
+    """按WHOIS服务器分组的查询调度器
+
+    每个服务器有独立的令牌桶和最大并发数。服务器返回限流响应时，
+    暂停该服务器的查询并按指数退避重试，同时把速率减半；
+    查询成功后逐步恢复到配置的速率。
+    """
+
+    def __init__(
+        self,
+        default_limit: ServerLimit = ServerLimit(),
+        limits: Dict[str, ServerLimit] = None,
+        max_retries: int = 3,
+        base_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        min_rate: float = 0.5
+    ):
+        self.default_limit = default_limit
+        self.limits = dict(limits or {})
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.min_rate = min_rate
+        self._servers: Dict[str, _ServerState] = {}
+
+    def _state(self, server: str) -> _ServerState:
+        state = self._servers.get(server)
+        if state is None:
+            state = _ServerState(self.limits.get(server, self.default_limit))
+            self._servers[server] = state
+        return state
+
+    def _on_throttled(self, state: _ServerState, now: float) -> None:
+        """收到限流响应：指数退避并降低速率"""
+        state.throttled += 1
+        if now < state.paused_until:
+            # 同一暂停窗口内并发查询收到的限流响应只计一次
+            return
+        state.backoff = min(self.max_backoff, max(self.base_backoff, state.backoff * 2))
+        # 加入随机抖动，避免所有等待中的查询同时恢复
+        state.paused_until = max(state.paused_until, now + state.backoff * random.uniform(0.5, 1.5))
+        state.bucket.rate = max(self.min_rate, state.bucket.rate / 2)
+
+    def _on_success(self, state: _ServerState) -> None:
+        """查询成功：逐步恢复速率"""
+        state.completed += 1
+        state.backoff = 0.0
+        state.bucket.rate = min(state.limit.rate, state.bucket.rate + state.limit.rate * 0.1)
+
+    async def run(self, server: str, request: Callable[[], Awaitable[T]]) -> T:
+        """在服务器的限速和并发限制下执行查询，限流时退避重试"""
+        state = self._state(server)
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            async with state.semaphore:
+                # 等待暂停结束并获取令牌；等待期间可能再次进入暂停
+                while True:
+                    delay = state.paused_until - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    await state.bucket.acquire()
+                    if state.paused_until <= loop.time():
+                        break
+                state.in_flight += 1
+                try:
+                    result = await request()
+                except (ThrottledError, ConnectionResetError):
+                    self._on_throttled(state, loop.time())
+                    continue
+                finally:
+                    state.in_flight -= 1
+            self._on_success(state)
+            return result
+        raise ThrottledError(server)
+
+    def stats(self) -> Dict[str, Dict]:
+        """获取各服务器的调度状态"""
+        return {
+            server: {
+                'rate': round(state.bucket.rate, 2),
+                'in_flight': state.in_flight,
+                'backoff': state.backoff,
+                'throttled': state.throttled,
+                'completed': state.completed
+            }
+            for server, state in list(self._servers.items())
+        }